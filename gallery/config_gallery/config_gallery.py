@@ -9,7 +9,8 @@ Defines :
 """
 
 from enum import Enum
-from typing import Dict, Optional, Union
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
 
 from utils.config import Config
 from utils.functions import get_data_folder
@@ -71,6 +72,16 @@ class ConfigGallery(Config):
     cell_dimension
     cell_width
     cell_height
+    thumbnail_cache_bytes
+    thumbnail_disk_cache_folder
+    thumbnail_disk_cache_bytes
+
+    Methods
+    -------
+    get_cell_size
+    change_cell_dimension
+    has_changed_cell_dimension
+    reset_has_changed_cell_dimension
 
     Error
     -----
@@ -98,14 +109,35 @@ class ConfigGallery(Config):
     @property
     def cell_width(self) -> int:
         """The width of a cell in pixels."""
-        zoom = self.cell_dimension.value
-        return int(self.cell_width_default * zoom)
+        cell_width, unused_cell_height = self.get_cell_size(self.cell_dimension)
+        return cell_width
 
     @property
     def cell_height(self) -> int:
         """The height of a cell in pixels."""
-        zoom = self.cell_dimension.value
-        return int(self.cell_height_default * zoom)
+        unused_cell_width, cell_height = self.get_cell_size(self.cell_dimension)
+        return cell_height
+
+    def get_cell_size(self, cell_dimension: CellDimension) -> Tuple[int, int]:
+        """The (width, height) of a cell in pixels, for the given cell dimension."""
+        zoom = cell_dimension.value
+        return int(self.cell_width_default * zoom), int(self.cell_height_default * zoom)
+
+    @property
+    def thumbnail_cache_bytes(self) -> int:
+        """The memory budget of the thumbnail cache in bytes."""
+        return int(self.thumbnail_cache_megabytes * 1024 * 1024)
+
+    @property
+    def thumbnail_disk_cache_folder(self) -> Optional[Path]:
+        """The folder of the on-disk thumbnail cache, None if it is disabled."""
+        folder = self.thumbnail_disk_cache_folder_name
+        return Path(folder).expanduser() if folder else None
+
+    @property
+    def thumbnail_disk_cache_bytes(self) -> int:
+        """The disk budget of the on-disk thumbnail cache in bytes."""
+        return int(self.thumbnail_disk_cache_megabytes * 1024 * 1024)
 
     def change_cell_dimension(self, cell_dimension: CellDimension) -> None:
         """Changes the cells dimension."""
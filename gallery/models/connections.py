@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The ConnectionManager class.
+
+The database is given by the host application, and is used by the GUI thread. The
+connection manager can tune it with a performance profile (write-ahead log, memory
+mapping, larger page cache...), and gives the worker threads their own read-only
+connections to the same file : in WAL mode, they read the last committed state
+without blocking the GUI thread, nor being blocked by its writes.
+
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import peewee
+
+PragmaValue = Union[str, int]
+
+PERFORMANCE_PRAGMAS: Dict[str, PragmaValue] = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
+}
+"""The performance profile applied to the database. A negative cache_size is in KiB."""
+
+READ_PRAGMAS: Dict[str, PragmaValue] = {
+    "mmap_size": PERFORMANCE_PRAGMAS["mmap_size"],
+    "cache_size": PERFORMANCE_PRAGMAS["cache_size"],
+    "temp_store": PERFORMANCE_PRAGMAS["temp_store"],
+    "query_only": 1,
+}
+"""The pragmas applied to each read-only connection."""
+
+
+class ConnectionManager:
+
+    """
+    Applies the performance profile to the database, and hands out read-only
+    connections to the worker threads.
+
+    Parameters
+    ----------
+    database
+
+    Attributes
+    ----------
+    database
+
+    Properties
+    ----------
+    read_database
+
+    Methods
+    -------
+    apply_profile
+    execute_read
+
+    """
+
+    def __init__(self, database: peewee.SqliteDatabase) -> None:
+        self.database: peewee.SqliteDatabase = database
+        self._read_database: Optional[peewee.SqliteDatabase] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def apply_profile(
+        self, pragmas: Optional[Dict[str, PragmaValue]] = None
+    ) -> None:
+        """
+        Applies the pragmas to the current connection, and to any connection opened
+        later by the database.
+
+        Parameters
+        ----------
+        pragmas
+            The pragmas to apply, the performance profile by default.
+
+        """
+        pragmas = pragmas if pragmas is not None else PERFORMANCE_PRAGMAS
+        for name, value in pragmas.items():
+            self.database.pragma(name, value, permanent=True)
+
+    @property
+    def read_database(self) -> Optional[peewee.SqliteDatabase]:
+        """
+        A read-only database on the same file, holding one connection per thread, or
+        None for an in-memory database, which can't be shared between connections.
+        """
+        with self._lock:
+            if self._read_database is None:
+                self._read_database = _create_read_database(self.database)
+        return self._read_database
+
+    def execute_read(self, query: peewee.Query) -> List[Tuple]:
+        """
+        Runs the query on the calling thread's read-only connection, and returns its
+        rows as tuples.
+
+        The query can be built with the models as usual : it is only compiled and run
+        against the read-only database.
+
+        Parameters
+        ----------
+        query
+
+        Error
+        -----
+        RuntimeError
+            The database is in memory, and can only be read from its own connection.
+
+        """
+        read_database = self.read_database
+        if read_database is None:
+            raise RuntimeError("An in-memory database has no read-only connections.")
+        cursor = read_database.execute(query)
+        rows = cursor.fetchall()
+        return rows
+
+
+def _create_read_database(
+    database: peewee.SqliteDatabase,
+) -> Optional[peewee.SqliteDatabase]:
+    path = _get_database_path(database)
+    if path is None:
+        read_database = None
+    else:
+        uri = f"file:{quote(str(path))}?mode=ro"
+        read_database = peewee.SqliteDatabase(
+            uri, uri=True, pragmas=list(READ_PRAGMAS.items())
+        )
+    return read_database
+
+
+def _get_database_path(database: peewee.SqliteDatabase) -> Optional[Path]:
+    name = database.database
+    is_in_memory = not name or name == ":memory:" or "mode=memory" in name
+    is_uri = name.startswith("file:") if name else False
+    if is_in_memory or is_uri:
+        # The read-only URI can't be derived from another URI reliably.
+        path = None
+    else:
+        path = Path(name).absolute()
+    return path
@@ -4,17 +4,38 @@
 Defines :
  The GalleryModels class.
 
+When created, the GalleryModels creates the missing tables of its models, and the
+missing indexes on the hot paths of the gallery (the my_objects of a tag, the
+children of a tag), and logs their names. The statistics of the query planner are then
+refreshed if they are missing or stale.
+
 """
 
-from typing import Type
+from __future__ import annotations
+
+import logging
+from typing import Callable, Type, Dict, Iterable, List, Set
 
 import peewee
 
-from gallery.models.tags import tag_factory
+import gallery.types as types
+from gallery.models.connections import ConnectionManager
+from gallery.models.result_cache import ResultCache
+from gallery.models.tag_counts import TagCounts
+from gallery.models.tag_hierarchy import TagHierarchy
+from gallery.models.tags import SQLITE_MAX_VARIABLES, Tag, tag_factory
+from gallery.models.tags_adjacency import TagsAdjacency
 from gallery.models.views import View
+from gallery.models.write_notifier import WriteNotifier
+
+logger = logging.getLogger(__name__)
 
+SQLITE_IDS_BATCH_SIZE = SQLITE_MAX_VARIABLES - 16
+"""The number of ids passed to a single statement, leaving room for a few other
+parameters."""
 
-class GalleryModels:  # pylint: disable=too-few-public-methods
+
+class GalleryModels:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
 
     """
     Holds the various peewee models necessary to manage the collection of MyObject.
@@ -25,6 +46,26 @@ class GalleryModels:  # pylint: disable=too-few-public-methods
     MyTag
     MyObjectTag
     MyView
+    connections
+    result_cache
+    tags_adjacency
+    tag_hierarchy
+    tag_counts
+    write_notifier
+        Forwards the writes done through the gallery to the caches above.
+    indexes_added
+        The names of the indexes created when bootstrapping the schema.
+
+    Methods
+    -------
+    ensure_schema
+    get_my_objects_by_ids
+    get_my_objects_ids_among
+    get_tags_ids_by_my_objects_ids
+    get_tags_by_my_objects_ids
+    warm_tags_adjacency
+    rate_my_objects
+    bump_write_generation
 
     """
 
@@ -34,22 +75,300 @@ class GalleryModels:  # pylint: disable=too-few-public-methods
     MyView: Type[peewee.Model]
 
     def __init__(
-        self, database: peewee.SqliteDatabase, MyObject: Type[peewee.Model],
+        self,
+        database: peewee.SqliteDatabase,
+        MyObject: Type[peewee.Model],
+        use_tag_closure_table: bool = False,
+        use_performance_profile: bool = False,
+        use_tags_adjacency: bool = False,
     ):
         self.database = database
+        self.connections: ConnectionManager = ConnectionManager(database)
+        if use_performance_profile:
+            self.connections.apply_profile()
+        self.result_cache: ResultCache = ResultCache()
+        self.tags_adjacency: TagsAdjacency = TagsAdjacency()
+        self.tag_hierarchy: TagHierarchy = TagHierarchy()
+        self.tag_counts: TagCounts = TagCounts()
+        self.write_notifier: WriteNotifier = WriteNotifier()
+        for cache in (
+            self.result_cache,
+            self.tags_adjacency,
+            self.tag_hierarchy,
+            self.tag_counts,
+        ):
+            self.write_notifier.subscribe(cache)
+        self._use_tag_closure_table: bool = use_tag_closure_table
         self._add_attributes_linked_to_my_object(MyObject)
         self._add_view_attribute()
+        self.indexes_added: List[str] = self.ensure_schema()
+        self._use_tags_adjacency: bool = use_tags_adjacency
+        if use_tags_adjacency:
+            self.warm_tags_adjacency()
 
     def _add_attributes_linked_to_my_object(self, MyObject: Type[peewee.Model]) -> None:
         self.MyObject = MyObject
-        MyTag, MyObjectTag = tag_factory(self.database, MyObject)
+        MyTag, MyObjectTag = tag_factory(
+            self.database, MyObject, self._use_tag_closure_table
+        )
         self.MyTag = MyTag
         self.MyObjectTag = MyObjectTag
         self.MyObject.MyTag = self.MyTag
         self.MyObject.MyObjectTag = self.MyObjectTag
+        # Allows the models to notify their writes to the caches.
+        self.MyObject.write_notifier = self.write_notifier
+        self.MyTag.write_notifier = self.write_notifier
+        # Allows the models to read from the caches.
+        self.MyObject.tags_adjacency = self.tags_adjacency
+        self.MyTag.tags_adjacency = self.tags_adjacency
+        self.MyTag.tag_hierarchy = self.tag_hierarchy
 
     def _add_view_attribute(self) -> None:
         self.MyView = View
         self.MyView._meta.database = (  # pylint: disable = no-member, protected-access
             self.database
         )
+
+    def ensure_schema(self) -> List[str]:
+        """
+        Creates the missing tables and indexes of the models, and returns and logs
+        the names of the indexes created.
+
+        ANALYZE is run if indexes were created or if the database has no statistics
+        yet. Otherwise, SQLite only analyzes the tables whose statistics are stale,
+        through PRAGMA optimize.
+
+        """
+        models = [self.MyObject, self.MyTag, self.MyObjectTag, self.MyView]
+        indexes_before = self._get_indexes_names(models)
+        with self.database.atomic():
+            self.database.create_tables(models, safe=True)
+            for model in models:
+                model._schema.create_indexes(  # pylint: disable = protected-access
+                    safe=True
+                )
+        indexes_added = sorted(self._get_indexes_names(models) - indexes_before)
+        if indexes_added:
+            logger.info("Created the indexes %s", ", ".join(indexes_added))
+        has_statistics = self.database.table_exists("sqlite_stat1")
+        if indexes_added or not has_statistics:
+            self.database.execute_sql("ANALYZE")
+        else:
+            self.database.execute_sql("PRAGMA optimize")
+        return indexes_added
+
+    def _get_indexes_names(self, models: List[Type[peewee.Model]]) -> Set[str]:
+        # The indexes created by SQLite itself for the primary keys are ignored.
+        indexes_names = {
+            index.name
+            for model in models
+            for index in self.database.get_indexes(
+                model._meta.table_name  # pylint: disable = protected-access
+            )
+            if not index.name.startswith("sqlite_")
+        }
+        return indexes_names
+
+    def bump_write_generation(self) -> None:
+        """
+        Invalidates the cached results of the widget items and query parameters, the
+        tags adjacency cache and the tag counts.
+
+        The gallery does it by itself for the writes it performs, but it must be
+        called after any write done outside of the gallery that modifies the tags or
+        ratings of the my_objects.
+
+        """
+        self.write_notifier.notify_external_write()
+        if self._use_tags_adjacency:
+            self.warm_tags_adjacency()
+
+    def warm_tags_adjacency(self) -> None:
+        """
+        Loads the links between all my_objects and their tags in memory, in a single
+        query, so that the tags lookups don't query the database anymore.
+
+        The links are then kept up to date when tagging through the gallery, until
+        bump_write_generation is called. With the use_tags_adjacency option, the
+        links are loaded when the models are created, and again by each
+        bump_write_generation.
+
+        """
+        self.tags_adjacency.warm(self.MyObjectTag)
+
+    def get_tags_ids_by_my_objects_ids(
+        self, my_objects_ids: Iterable[types.MyObjectId]
+    ) -> Dict[int, Set[int]]:
+        """
+        The ids of the tags of each my_object, mapped by my_object id.
+
+        The links are read from the tags adjacency cache if it is warm, otherwise
+        with one query per batch of ids. Each my_object id is in the mapping, even
+        without tags.
+
+        Parameters
+        ----------
+        my_objects_ids
+
+        """
+        my_objects_ids = [int(my_object_id) for my_object_id in my_objects_ids]
+        if self.tags_adjacency.is_warm:
+            tags_ids_by_my_objects_ids = {
+                my_object_id: self.tags_adjacency.get_tags_ids(my_object_id)
+                for my_object_id in my_objects_ids
+            }
+        else:
+            tags_ids_by_my_objects_ids = self._select_tags_ids_by_my_objects_ids(
+                my_objects_ids
+            )
+        return tags_ids_by_my_objects_ids  # type: ignore
+
+    def _select_tags_ids_by_my_objects_ids(
+        self, my_objects_ids: List[int]
+    ) -> Dict[int, Set[int]]:
+        MyObjectTag = self.MyObjectTag
+        tags_ids_by_my_objects_ids: Dict[int, Set[int]] = {
+            my_object_id: set() for my_object_id in my_objects_ids
+        }
+        for batch in peewee.chunked(my_objects_ids, SQLITE_IDS_BATCH_SIZE):
+            rows = (
+                MyObjectTag.select(MyObjectTag.my_object, MyObjectTag.tag)
+                .where(MyObjectTag.my_object.in_(batch))
+                .tuples()
+            )
+            for my_object_id, tag_id in rows:
+                tags_ids_by_my_objects_ids[my_object_id].add(tag_id)
+        return tags_ids_by_my_objects_ids
+
+    def get_tags_by_my_objects_ids(
+        self, my_objects_ids: Iterable[types.MyObjectId]
+    ) -> Dict[int, Set[Tag]]:
+        """
+        The tags of each my_object, mapped by my_object id.
+
+        All the tags involved are loaded together, or read from the tags adjacency
+        cache if it is warm, each tag being a single instance shared by all the
+        my_objects tagged with it.
+
+        Parameters
+        ----------
+        my_objects_ids
+
+        """
+        tags_ids_by_my_objects_ids = self.get_tags_ids_by_my_objects_ids(my_objects_ids)
+        tags_ids = set().union(*tags_ids_by_my_objects_ids.values())
+        tags_by_ids = self._get_tags_by_ids(tags_ids)
+        # Links to deleted tags may remain in the database, and are skipped.
+        tags_by_my_objects_ids = {
+            my_object_id: {
+                tags_by_ids[tag_id]
+                for tag_id in my_object_tags_ids
+                if tag_id in tags_by_ids
+            }
+            for my_object_id, my_object_tags_ids in tags_ids_by_my_objects_ids.items()
+        }
+        return tags_by_my_objects_ids
+
+    def _get_tags_by_ids(self, tags_ids: Set[int]) -> Dict[int, Tag]:
+        tags_by_ids: Dict[int, Tag] = {}
+        if self.tags_adjacency.is_warm:
+            for tag_id in tags_ids:
+                tag = self.tags_adjacency.get_tag(tag_id)
+                if tag is not None:
+                    tags_by_ids[tag_id] = tag
+        else:
+            for batch in peewee.chunked(tags_ids, SQLITE_IDS_BATCH_SIZE):
+                tags = self.MyTag.select().where(self.MyTag.id.in_(batch))
+                for tag in tags:  # pylint: disable=not-an-iterable
+                    tags_by_ids[tag.id] = tag
+        return tags_by_ids
+
+    def rate_my_objects(
+        self, my_objects_ids: Iterable[types.MyObjectId], rating: int
+    ) -> None:
+        """
+        Rates all the my_objects with the given ids, with one UPDATE statement per
+        batch of ids, in a single transaction. The tag counts are updated rather than
+        invalidated.
+
+        Parameters
+        ----------
+        my_objects_ids
+        rating
+
+        """
+        MyObject = self.MyObject
+        ratings_counts: Dict[int, int] = {}
+        with self.database.atomic():
+            for batch in peewee.chunked(my_objects_ids, SQLITE_IDS_BATCH_SIZE):
+                if self.tag_counts.is_loaded:
+                    self._count_ratings(batch, ratings_counts)
+                MyObject.update(rating=rating).where(MyObject.id.in_(batch)).execute()
+        # The links between my_objects and tags are left untouched.
+        self.write_notifier.notify_my_objects_rated(ratings_counts, rating)
+
+    def _count_ratings(self, batch: List[int], ratings_counts: Dict[int, int]) -> None:
+        # The ratings of the batch before being rated, counted in the same transaction.
+        MyObject = self.MyObject
+        rows = (
+            MyObject.select(MyObject.rating, peewee.fn.COUNT(MyObject.id))
+            .where(MyObject.id.in_(batch))
+            .group_by(MyObject.rating)
+            .tuples()
+        )
+        for rating_old, count in rows:
+            ratings_counts[rating_old] = ratings_counts.get(rating_old, 0) + count
+
+    def get_my_objects_by_ids(
+        self, my_objects_ids: Iterable[int]
+    ) -> Dict[int, types.MyObjectType]:
+        """
+        The my_objects with the given ids, mapped by id.
+
+        The objects are fetched in batches, so that the number of parameters of each
+        query stays below SQLite's limit. If MyObject defines a cell_fields attribute
+        (a sequence of field names), only those fields and the id are loaded.
+
+        Parameters
+        ----------
+        my_objects_ids
+
+        """
+        my_objects_by_ids: Dict[int, types.MyObjectType] = {}
+        fields = self._get_cell_fields()
+        for batch in peewee.chunked(my_objects_ids, SQLITE_MAX_VARIABLES):
+            query = self.MyObject.select(*fields).where(self.MyObject.id.in_(batch))
+            for my_object in query:
+                my_objects_by_ids[my_object.id] = my_object
+        return my_objects_by_ids
+
+    @staticmethod
+    def get_my_objects_ids_among(
+        my_objects_ids: Iterable[int],
+        select_batch: Callable[[List[int]], peewee.Select],
+    ) -> Set[int]:
+        """
+        Runs a query on batches of my_objects_ids, and returns all the ids returned.
+
+        Parameters
+        ----------
+        my_objects_ids
+        select_batch
+            A function returning the query for a batch of ids. The query must return
+            the ids in its first column, and only among the ids of the batch.
+
+        """
+        my_objects_ids_among: Set[int] = set()
+        for batch in peewee.chunked(my_objects_ids, SQLITE_IDS_BATCH_SIZE):
+            rows = select_batch(batch).tuples()
+            my_objects_ids_among.update(row[0] for row in rows)
+        return my_objects_ids_among
+
+    def _get_cell_fields(self) -> List[peewee.Field]:
+        cell_fields_names = getattr(self.MyObject, "cell_fields", None)
+        if cell_fields_names is None:
+            fields = []
+        else:
+            fields = [self.MyObject.id]
+            fields += [getattr(self.MyObject, name) for name in cell_fields_names]
+        return fields
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The ResultCache class.
+
+ The get_widget_item_key, get_tag_key and get_query_key functions, building the keys
+ of the results.
+
+The results of the widget items and query parameters are cached in memory, so that
+switching tabs or refreshing a tab doesn't query the database again when nothing has
+been written since. Every write affecting the results (tagging, rating...) bumps the
+write generation, which invalidates all results computed before.
+
+A result can also record the keys of the results it depends on, for instance a query
+depends on the widget items of its parameters. A write touching only a few results
+(deleting a tag, a view...) can then invalidate those, and the results depending on
+them, keeping all the other ones.
+
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set, TypeVar
+
+CachedResult = TypeVar("CachedResult")
+
+
+class ResultCache:
+
+    """
+    Cache of the results (collections of my_objects ids), invalidated by writes.
+
+    Attributes
+    ----------
+    write_generation
+        A counter incremented by each invalidation, whole or partial.
+    hits
+    misses
+
+    Methods
+    -------
+    get_or_compute
+    get
+    put
+    invalidate
+    bump_write_generation
+    handle_tag_saved
+    handle_links_added
+    handle_links_removed
+    handle_tag_deleted
+    handle_my_objects_rated
+    handle_view_deleted
+    handle_external_write
+
+    """
+
+    def __init__(self) -> None:
+        self.write_generation: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self._results: Dict[Hashable, object] = {}
+        self._dependents: Dict[Hashable, Set[Hashable]] = {}
+        """The keys of the results depending on each key."""
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], CachedResult],
+        dependencies: Iterable[Hashable] = (),
+    ) -> CachedResult:
+        """
+        Returns the result cached for the key, computing and caching it if it isn't
+        cached or has been invalidated since.
+
+        The result is shared by all callers, and must not be modified.
+
+        Parameters
+        ----------
+        key
+        compute
+            The function computing the result, called without argument.
+        dependencies
+            The keys of the results the result depends on.
+
+        """
+        if key in self._results:
+            self.hits += 1
+            result = self._results[key]
+        else:
+            self.misses += 1
+            result = compute()
+            self.put(key, result, dependencies)
+        return result  # type: ignore
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Returns the result cached for the key, None if it isn't cached or has been
+        invalidated since.
+
+        Parameters
+        ----------
+        key
+
+        """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(
+        self, key: Hashable, result: object, dependencies: Iterable[Hashable] = ()
+    ) -> None:
+        """
+        Caches a result computed for the current write generation, for instance a
+        result updated incrementally after a write.
+
+        Parameters
+        ----------
+        key
+        result
+        dependencies
+            The keys of the results the result depends on.
+
+        """
+        self._results[key] = result
+        for dependency in dependencies:
+            self._dependents.setdefault(dependency, set()).add(key)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        """
+        Invalidates the results of the keys, and all the results depending on them,
+        directly or not. Must be called after a write that could only modify those
+        results.
+
+        Parameters
+        ----------
+        keys
+
+        """
+        keys_to_invalidate = list(keys)
+        while keys_to_invalidate:
+            key = keys_to_invalidate.pop()
+            self._results.pop(key, None)
+            # Popping the dependents also ends the loop on circular dependencies.
+            keys_to_invalidate.extend(self._dependents.pop(key, ()))
+        self.write_generation += 1
+
+    def bump_write_generation(self) -> None:
+        """
+        Invalidates all results. Must be called after any write that could modify the
+        results of a widget item.
+        """
+        self.write_generation += 1
+        self._results.clear()
+        self._dependents.clear()
+
+    def handle_tag_saved(
+        self, unused_tag: Hashable, unused_is_created: bool, is_moved: bool
+    ) -> None:
+        """Invalidates all results if the tag was moved, changing its ancestors."""
+        if is_moved:
+            self.bump_write_generation()
+
+    def handle_links_added(
+        self, unused_tag_id: int, unused_my_objects_ids: Iterable[int]
+    ) -> None:
+        """Invalidates all results, the queries depending on the tags."""
+        self.bump_write_generation()
+
+    def handle_links_removed(
+        self, unused_tag_id: int, unused_my_objects_ids: Iterable[int]
+    ) -> None:
+        """Invalidates all results, the queries depending on the tags."""
+        self.bump_write_generation()
+
+    def handle_tag_deleted(
+        self,
+        unused_tag: Hashable,
+        tags_ids_deleted: Iterable[int],
+        ancestors_ids: Iterable[int],
+    ) -> None:
+        """Invalidates the results of the deleted tags and of their ancestors."""
+        tags_ids_modified = list(tags_ids_deleted) + list(ancestors_ids)
+        self.invalidate(get_tag_key(tag_id) for tag_id in tags_ids_modified)
+
+    def handle_my_objects_rated(
+        self, unused_ratings_counts: Dict[int, int], unused_rating: int
+    ) -> None:
+        """Invalidates all results, the queries depending on the ratings."""
+        self.bump_write_generation()
+
+    def handle_view_deleted(self, widget_item_id: Hashable) -> None:
+        """Invalidates the result of the view, its id being free for a new view."""
+        self.invalidate([get_widget_item_key(widget_item_id)])
+
+    def handle_external_write(self) -> None:
+        """Invalidates all results."""
+        self.bump_write_generation()
+
+
+def get_widget_item_key(widget_item_id: Hashable) -> Hashable:
+    """
+    The key of the result of a widget item.
+
+    Parameters
+    ----------
+    widget_item_id
+
+    """
+    key = ("widget_item", str(widget_item_id))
+    return key
+
+
+def get_tag_key(tag_id: int) -> Hashable:
+    """
+    The key of the result of the widget item of a tag, identified by the tag id.
+
+    Parameters
+    ----------
+    tag_id
+
+    """
+    key = get_widget_item_key(tag_id)
+    return key
+
+
+def get_query_key(query_string: str) -> Hashable:
+    """
+    The key of the result of query parameters.
+
+    Parameters
+    ----------
+    query_string
+
+    """
+    key = ("query", query_string)
+    return key
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The TagCounts class.
+
+The number of my_objects of each tag is counted twice : the my_objects tagged with the
+tag itself (its direct count), and the my_objects tagged with the tag or one of its
+descendants (its total count). A my_object tagged with several tags of the same
+subtree is only counted once in the total count of their common ancestors, so the
+total counts can't be summed from the children : they are rolled up from the tags of
+each my_object to all their ancestors.
+
+The counts are loaded with a single grouped query on the link table, giving the tags
+of each my_object, plus the hierarchy of tags and the number of my_objects of each
+rating. Loading is meant to run on a worker thread, with its own connection. Once
+loaded, the counts are kept up to date by the tagging and rating methods of the
+gallery, and are emptied by any other write they can't follow, until loaded again.
+
+"""
+
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple, Type
+
+import peewee
+
+
+class TagCounts:  # pylint: disable=too-many-instance-attributes
+
+    """
+    In-memory counts of the my_objects of each tag and rating.
+
+    Attributes
+    ----------
+    is_loaded
+    write_generation
+        A counter incremented by each write recorded or invalidating the counts,
+        whether they are loaded or not.
+
+    Methods
+    -------
+    load
+    replace_with
+    invalidate
+    get_counts
+    get_rating_count
+    insert_tag
+    add_links
+    remove_links
+    rate_my_objects
+    handle_tag_saved
+    handle_links_added
+    handle_links_removed
+    handle_tag_deleted
+    handle_my_objects_rated
+    handle_external_write
+
+    """
+
+    def __init__(self) -> None:
+        self.write_generation: int = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        # pylint: disable=attribute-defined-outside-init
+        self.is_loaded: bool = False
+        self._direct_counts: Dict[int, int] = {}
+        self._total_counts: Dict[int, int] = {}
+        self._rating_counts: Dict[int, int] = {}
+        self._parents_ids: Dict[int, Optional[int]] = {}
+        # The ids of each tag and of its ancestors, from the tag up to the root.
+        self._lineages: Dict[int, Tuple[int, ...]] = {}
+        self._tags_ids_by_my_object_id: Dict[int, Set[int]] = {}
+
+    def load(
+        self,
+        database: peewee.SqliteDatabase,
+        MyObject: Type[peewee.Model],
+        MyTag: Type[peewee.Model],
+        MyObjectTag: Type[peewee.Model],
+    ) -> None:
+        """
+        Counts the my_objects of all tags and ratings, replacing the previous counts.
+
+        The queries are built with the models, but run against the given database,
+        for instance a read-only connection of a worker thread.
+
+        Parameters
+        ----------
+        database
+        MyObject
+        MyTag
+        MyObjectTag
+
+        """
+        self._reset()
+        tags_rows = database.execute(MyTag.select(MyTag.id, MyTag.parent)).fetchall()
+        self._parents_ids = dict(tags_rows)
+        links_query = MyObjectTag.select(
+            MyObjectTag.my_object, peewee.fn.GROUP_CONCAT(MyObjectTag.tag)
+        ).group_by(MyObjectTag.my_object)
+        for my_object_id, tags_ids_joined in database.execute(links_query):
+            tags_ids = {int(tag_id) for tag_id in tags_ids_joined.split(",")}
+            # Links to deleted tags may remain in the database, and are skipped.
+            tags_ids &= self._parents_ids.keys()
+            self._tags_ids_by_my_object_id[my_object_id] = tags_ids
+            self._count_my_object(tags_ids)
+        if hasattr(MyObject, "rating"):
+            ratings_query = MyObject.select(
+                MyObject.rating, peewee.fn.COUNT(MyObject.id)
+            ).group_by(MyObject.rating)
+            self._rating_counts = dict(database.execute(ratings_query).fetchall())
+        self.is_loaded = True
+
+    def _count_my_object(self, tags_ids: Set[int]) -> None:
+        for tag_id in tags_ids:
+            self._direct_counts[tag_id] = self._direct_counts.get(tag_id, 0) + 1
+        for tag_id in self._get_covered_tags_ids(tags_ids):
+            self._total_counts[tag_id] = self._total_counts.get(tag_id, 0) + 1
+
+    def _get_covered_tags_ids(self, tags_ids: Set[int]) -> FrozenSet[int]:
+        # The tags whose total count includes a my_object with the given tags.
+        if len(tags_ids) == 1:
+            (tag_id,) = tags_ids
+            covered_tags_ids = frozenset(self._get_lineage(tag_id))
+        else:
+            covered_tags_ids = frozenset().union(
+                *(self._get_lineage(tag_id) for tag_id in tags_ids)
+            )
+        return covered_tags_ids
+
+    def _get_lineage(self, tag_id: int) -> Tuple[int, ...]:
+        lineage = self._lineages.get(tag_id)
+        if lineage is None:
+            parent_id = self._parents_ids.get(tag_id)
+            if parent_id is None:
+                lineage = (tag_id,)
+            else:
+                lineage = (tag_id,) + self._get_lineage(parent_id)
+            self._lineages[tag_id] = lineage
+        return lineage
+
+    def replace_with(self, tag_counts: TagCounts) -> None:
+        """
+        Takes over the counts of another TagCounts, for instance the one loaded on a
+        worker thread.
+
+        Parameters
+        ----------
+        tag_counts
+
+        """
+        # pylint: disable=protected-access
+        self.is_loaded = tag_counts.is_loaded
+        self._direct_counts = tag_counts._direct_counts
+        self._total_counts = tag_counts._total_counts
+        self._rating_counts = tag_counts._rating_counts
+        self._parents_ids = tag_counts._parents_ids
+        self._lineages = tag_counts._lineages
+        self._tags_ids_by_my_object_id = tag_counts._tags_ids_by_my_object_id
+
+    def invalidate(self) -> None:
+        """Empties the counts, until they are loaded again."""
+        self.write_generation += 1
+        self._reset()
+
+    def get_counts(self, tag_id: int) -> Optional[Tuple[int, int]]:
+        """
+        The direct and total counts of the tag, None if the counts aren't loaded.
+
+        Parameters
+        ----------
+        tag_id
+
+        """
+        if not self.is_loaded:
+            counts = None
+        else:
+            counts = (
+                self._direct_counts.get(tag_id, 0),
+                self._total_counts.get(tag_id, 0),
+            )
+        return counts
+
+    def get_rating_count(self, rating: int) -> Optional[int]:
+        """
+        The number of my_objects rated with the rating, None if the counts aren't
+        loaded.
+
+        Parameters
+        ----------
+        rating
+
+        """
+        if not self.is_loaded:
+            rating_count = None
+        else:
+            rating_count = self._rating_counts.get(rating, 0)
+        return rating_count
+
+    def insert_tag(self, tag_id: int, parent_id: Optional[int]) -> None:
+        """
+        Records a new tag, without any my_object yet, if the counts are loaded.
+
+        Parameters
+        ----------
+        tag_id
+        parent_id
+
+        """
+        self.write_generation += 1
+        if self.is_loaded:
+            self._parents_ids[tag_id] = parent_id
+
+    def add_links(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """
+        Records that the my_objects were tagged with the tag, if the counts are
+        loaded. The my_objects already tagged with it are ignored.
+
+        Parameters
+        ----------
+        tag_id
+        my_objects_ids
+
+        """
+        self.write_generation += 1
+        if not self.is_loaded:
+            return
+        for my_object_id in my_objects_ids:
+            tags_ids_by_my_object_id = self._tags_ids_by_my_object_id
+            tags_ids = tags_ids_by_my_object_id.setdefault(int(my_object_id), set())
+            if tag_id not in tags_ids:
+                self._update_my_object_tags(tags_ids, tags_ids | {tag_id})
+
+    def remove_links(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """
+        Records that the tag was removed from the my_objects, if the counts are
+        loaded. The my_objects not tagged with it are ignored.
+
+        Parameters
+        ----------
+        tag_id
+        my_objects_ids
+
+        """
+        self.write_generation += 1
+        if not self.is_loaded:
+            return
+        for my_object_id in my_objects_ids:
+            tags_ids = self._tags_ids_by_my_object_id.get(int(my_object_id), set())
+            if tag_id in tags_ids:
+                self._update_my_object_tags(tags_ids, tags_ids - {tag_id})
+
+    def _update_my_object_tags(
+        self, tags_ids: Set[int], tags_ids_new: Set[int]
+    ) -> None:
+        # Only the tags whose counts change are touched : the tags added or removed,
+        # and their ancestors not covered by the other tags of the my_object.
+        for tag_id in tags_ids_new - tags_ids:
+            self._direct_counts[tag_id] = self._direct_counts.get(tag_id, 0) + 1
+        for tag_id in tags_ids - tags_ids_new:
+            self._direct_counts[tag_id] -= 1
+        covered_tags_ids = self._get_covered_tags_ids(tags_ids)
+        covered_tags_ids_new = self._get_covered_tags_ids(tags_ids_new)
+        for tag_id in covered_tags_ids_new - covered_tags_ids:
+            self._total_counts[tag_id] = self._total_counts.get(tag_id, 0) + 1
+        for tag_id in covered_tags_ids - covered_tags_ids_new:
+            self._total_counts[tag_id] -= 1
+        # The set is updated in place, being the one held for the my_object.
+        tags_ids.clear()
+        tags_ids.update(tags_ids_new)
+
+    def rate_my_objects(self, ratings_counts: Dict[int, int], rating: int) -> None:
+        """
+        Records that my_objects were rated with the rating, if the counts are loaded.
+
+        Parameters
+        ----------
+        ratings_counts
+            The number of my_objects rated, by their rating before being rated.
+        rating
+
+        """
+        self.write_generation += 1
+        if not self.is_loaded:
+            return
+        for rating_old, count in ratings_counts.items():
+            rating_counts = self._rating_counts
+            rating_counts[rating_old] = rating_counts.get(rating_old, 0) - count
+            rating_counts[rating] = rating_counts.get(rating, 0) + count
+
+    def handle_tag_saved(
+        self, tag: peewee.Model, is_created: bool, is_moved: bool
+    ) -> None:
+        """Records the tag created, or empties the counts if the tag was moved."""
+        if is_created:
+            self.insert_tag(tag.id, tag.parent_id)
+        elif is_moved:
+            # The my_objects of the subtree move to other ancestors.
+            self.invalidate()
+
+    def handle_links_added(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """Records the links added, if the counts are loaded."""
+        self.add_links(tag_id, my_objects_ids)
+
+    def handle_links_removed(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """Records the links removed, if the counts are loaded."""
+        self.remove_links(tag_id, my_objects_ids)
+
+    def handle_tag_deleted(
+        self,
+        unused_tag: peewee.Model,
+        unused_tags_ids_deleted: Iterable[int],
+        unused_ancestors_ids: Iterable[int],
+    ) -> None:
+        """Empties the counts, the my_objects of the deleted tags being unknown."""
+        self.invalidate()
+
+    def handle_my_objects_rated(
+        self, ratings_counts: Dict[int, int], rating: int
+    ) -> None:
+        """Records the my_objects rated, if the counts are loaded."""
+        self.rate_my_objects(ratings_counts, rating)
+
+    def handle_external_write(self) -> None:
+        """Empties the counts."""
+        self.invalidate()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The TagHierarchy class.
+
+The whole hierarchy of tags can be loaded in memory with a single scan of the tag
+table, as a mapping from each tag id to its children sorted by name. The tag tree can
+then be built without querying the children of each tag, and the descendants of a tag
+are found without touching the database. Once loaded, the hierarchy is kept up to
+date when a tag is created, renamed or deleted, and is emptied by any other write on
+the tags, until it is loaded again.
+
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set, Type
+
+import peewee
+
+
+class TagHierarchy:
+
+    """
+    In-memory adjacency of the tags, from each parent to its children.
+
+    Attributes
+    ----------
+    is_loaded
+
+    Methods
+    -------
+    load
+    invalidate
+    insert_tag
+    update_tag
+    remove_tag
+    get_children
+    get_descendants
+    get_parents_ids
+    get_tags
+    handle_tag_saved
+    handle_tag_deleted
+
+    """
+
+    def __init__(self) -> None:
+        self._children_by_parent_id: Optional[
+            Dict[Optional[int], List[peewee.Model]]
+        ] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the hierarchy is loaded, and can answer the lookups."""
+        return self._children_by_parent_id is not None
+
+    def load(self, MyTag: Type[peewee.Model]) -> None:
+        """
+        Loads all tags, sorted by name, in a single query.
+
+        Parameters
+        ----------
+        MyTag
+
+        """
+        children_by_parent_id: Dict[Optional[int], List[peewee.Model]] = {}
+        tags = MyTag.select(MyTag.id, MyTag.name, MyTag.parent, MyTag.type).order_by(
+            MyTag.name
+        )
+        for tag in tags:
+            children_by_parent_id.setdefault(tag.parent_id, []).append(tag)
+        self._children_by_parent_id = children_by_parent_id
+
+    def invalidate(self) -> None:
+        """Empties the hierarchy, until it is loaded again."""
+        self._children_by_parent_id = None
+
+    def insert_tag(self, tag: peewee.Model) -> None:
+        """
+        Inserts a new tag among the children of its parent, keeping them sorted.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        assert self._children_by_parent_id is not None
+        siblings = self._children_by_parent_id.setdefault(tag.parent_id, [])
+        index = len(siblings)
+        for sibling_index, sibling in enumerate(siblings):
+            if sibling.name > tag.name:
+                index = sibling_index
+                break
+        siblings.insert(index, tag)
+
+    def update_tag(self, tag: peewee.Model) -> None:
+        """
+        Replaces a tag by its new version with the same parent, for instance after
+        being renamed.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        self._remove_from_siblings(tag)
+        self.insert_tag(tag)
+
+    def remove_tag(self, tag: peewee.Model) -> None:
+        """
+        Removes a tag and all its descendants.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        assert self._children_by_parent_id is not None
+        descendants = self.get_descendants(tag.id)
+        self._remove_from_siblings(tag)
+        for tag_removed in [tag] + descendants:
+            self._children_by_parent_id.pop(tag_removed.id, None)
+
+    def handle_tag_saved(
+        self, tag: peewee.Model, is_created: bool, is_moved: bool
+    ) -> None:
+        """Inserts, moves or updates the tag saved, if the hierarchy is loaded."""
+        if not self.is_loaded:
+            return
+        if is_created:
+            self.insert_tag(tag)
+        elif is_moved:
+            # The former parent isn't known anymore.
+            self.invalidate()
+        else:
+            self.update_tag(tag)
+
+    def handle_tag_deleted(
+        self,
+        tag: peewee.Model,
+        unused_tags_ids_deleted: Iterable[int],
+        unused_ancestors_ids: Iterable[int],
+    ) -> None:
+        """Removes the tag deleted and its descendants, if the hierarchy is loaded."""
+        if self.is_loaded:
+            self.remove_tag(tag)
+
+    def _remove_from_siblings(self, tag: peewee.Model) -> None:
+        assert self._children_by_parent_id is not None
+        siblings = self._children_by_parent_id.get(tag.parent_id, [])
+        siblings[:] = [sibling for sibling in siblings if sibling.id != tag.id]
+        # A tag without children isn't a parent anymore.
+        if not siblings:
+            self._children_by_parent_id.pop(tag.parent_id, None)
+
+    def get_children(self, parent_id: Optional[int]) -> List[peewee.Model]:
+        """
+        The children of the tag, sorted by name, or the tags at the root if parent_id
+        is None.
+
+        Parameters
+        ----------
+        parent_id
+
+        """
+        assert self._children_by_parent_id is not None
+        children = list(self._children_by_parent_id.get(parent_id, ()))
+        return children
+
+    def get_parents_ids(self) -> Set[int]:
+        """The ids of the tags having at least one child."""
+        assert self._children_by_parent_id is not None
+        parents_ids = {
+            parent_id
+            for parent_id in self._children_by_parent_id
+            if parent_id is not None
+        }
+        return parents_ids
+
+    def get_tags(self) -> List[peewee.Model]:
+        """All tags, the children of each parent being sorted by name."""
+        assert self._children_by_parent_id is not None
+        tags = [
+            tag
+            for children in self._children_by_parent_id.values()
+            for tag in children
+        ]
+        return tags
+
+    def get_descendants(self, tag_id: int) -> List[peewee.Model]:
+        """
+        All descendants of the tag, parents before their children.
+
+        Parameters
+        ----------
+        tag_id
+
+        """
+        descendants = self.get_children(tag_id)
+        for descendant in descendants:
+            # The list grows while iterated, adding the children of each descendant.
+            descendants.extend(self.get_children(descendant.id))
+        return descendants
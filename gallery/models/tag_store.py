@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The TagStore class.
+
+The tags are stored in parallel arrays indexed by a row number : the id of the tag,
+the row of its parent, the offset and length of its name in a single UTF-8 buffer, its
+type and its position among its siblings. The children of each parent are kept as an
+array of rows sorted by name. A tag only costs a few machine integers, instead of a
+peewee model and a Qt item, so that a tree of several hundred thousand tags can be
+held in memory.
+
+The store can be loaded from the TagHierarchy of the models when it is loaded,
+instead of scanning the tag table a second time.
+
+The rows are never reused : a new tag is appended at the end of the arrays, and a
+deleted tag is only marked as such, so that the row of a tag identifies it for as long
+as the store lives.
+
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+import peewee
+
+from gallery.models.tag_hierarchy import TagHierarchy
+
+ROOT_ROW: int = -1
+"""The parent row of the tags at the root."""
+
+DELETED_ROW: int = -2
+"""The parent row of the deleted tags."""
+
+TAG_TYPES: Tuple[str, ...] = ("tag", "folder")
+"""The types of tag, stored as their index in this tuple."""
+
+
+class TagStore:  # pylint: disable=too-many-instance-attributes
+
+    """
+    Compact in-memory copy of the tag table, as parallel arrays.
+
+    Methods
+    -------
+    load
+    get_row
+    get_id
+    get_name
+    get_type
+    get_parent_row
+    get_position
+    get_children_count
+    get_child_row
+    get_subtree_rows
+    find_position
+    insert_tag
+    rename_tag
+    remove_tag
+
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        # pylint: disable=attribute-defined-outside-init
+        self._ids: array = array("q")
+        self._parent_rows: array = array("q")
+        self._name_offsets: array = array("q")
+        self._name_lengths: array = array("q")
+        self._types: array = array("b")
+        # The position of each tag among its siblings.
+        self._positions: array = array("q")
+        self._names: bytearray = bytearray()
+        # The rows of the children of each parent row, sorted by name.
+        self._children_rows: Dict[int, array] = {}
+        self._rows_by_id: Dict[int, int] = {}
+
+    def load(
+        self,
+        MyTag: Type[peewee.Model],
+        tag_hierarchy: Optional[TagHierarchy] = None,
+    ) -> None:
+        """
+        Loads all tags in a single query, replacing the previous content of the store.
+
+        If the tag hierarchy is loaded, the tags are copied from it instead, without
+        querying the tag table again.
+
+        Parameters
+        ----------
+        MyTag
+        tag_hierarchy
+
+        """
+        self._reset()
+        if tag_hierarchy is not None and tag_hierarchy.is_loaded:
+            rows: Iterable[Tuple[int, Optional[int], str, str]] = [
+                (tag.id, tag.parent_id, tag.name, tag.type)
+                for tag in tag_hierarchy.get_tags()
+            ]
+        else:
+            # Sorted by parent then name, each parent's children are read in order,
+            # and the whole scan follows the (parent, name) index of the tag table.
+            rows = (
+                MyTag.select(MyTag.id, MyTag.parent, MyTag.name, MyTag.type)
+                .order_by(MyTag.parent, MyTag.name)
+                .tuples()
+            )
+        parents_ids = array("q")
+        for tag_id, parent_id, name, tag_type in rows:
+            self._append_tag(tag_id, name, tag_type)
+            parents_ids.append(-1 if parent_id is None else parent_id)
+        for row, parent_id in enumerate(parents_ids):
+            parent_row = ROOT_ROW if parent_id == -1 else self._rows_by_id[parent_id]
+            siblings_rows = self._children_rows.setdefault(parent_row, array("q"))
+            self._parent_rows[row] = parent_row
+            self._positions[row] = len(siblings_rows)
+            siblings_rows.append(row)
+
+    def _append_tag(self, tag_id: int, name: str, tag_type: str) -> int:
+        row = len(self._ids)
+        name_encoded = name.encode("utf-8")
+        self._ids.append(tag_id)
+        self._parent_rows.append(ROOT_ROW)
+        self._name_offsets.append(len(self._names))
+        self._name_lengths.append(len(name_encoded))
+        self._types.append(TAG_TYPES.index(tag_type))
+        self._positions.append(0)
+        self._names += name_encoded
+        self._rows_by_id[tag_id] = row
+        return row
+
+    def get_row(self, tag_id: int) -> Optional[int]:
+        """
+        The row of the tag, None if it isn't in the store.
+
+        Parameters
+        ----------
+        tag_id
+
+        """
+        row = self._rows_by_id.get(tag_id)
+        return row
+
+    def get_id(self, row: int) -> int:
+        """The id of the tag."""
+        tag_id = self._ids[row]
+        return tag_id
+
+    def get_name(self, row: int) -> str:
+        """The name of the tag."""
+        offset = self._name_offsets[row]
+        name_encoded = self._names[offset : offset + self._name_lengths[row]]
+        name = name_encoded.decode("utf-8")
+        return name
+
+    def get_type(self, row: int) -> str:
+        """The type of the tag, "tag" or "folder"."""
+        tag_type = TAG_TYPES[self._types[row]]
+        return tag_type
+
+    def get_parent_row(self, row: int) -> int:
+        """The row of the parent of the tag, ROOT_ROW for the tags at the root."""
+        parent_row = self._parent_rows[row]
+        return parent_row
+
+    def get_position(self, row: int) -> int:
+        """The position of the tag among its siblings."""
+        position = self._positions[row]
+        return position
+
+    def get_children_count(self, parent_row: int) -> int:
+        """The number of children of the tag, or of tags at the root for ROOT_ROW."""
+        children_rows = self._children_rows.get(parent_row, ())
+        children_count = len(children_rows)
+        return children_count
+
+    def get_child_row(self, parent_row: int, position: int) -> int:
+        """The row of the child of the tag at the given position."""
+        child_row = self._children_rows[parent_row][position]
+        return child_row
+
+    def get_subtree_rows(self, row: int) -> array:
+        """The rows of the tag and of all its descendants, parents first."""
+        subtree_rows = array("q", [row])
+        for subtree_row in subtree_rows:
+            # The array grows while iterated, adding the children of each descendant.
+            subtree_rows.extend(self._children_rows.get(subtree_row, ()))
+        return subtree_rows
+
+    def find_position(
+        self, parent_row: int, name: str, excluded_row: Optional[int] = None
+    ) -> int:
+        """
+        The position of a tag with the given name among the children of the parent,
+        keeping them sorted.
+
+        Parameters
+        ----------
+        parent_row
+        name
+        excluded_row
+            A child ignored while looking for the position, for instance the tag
+            being renamed.
+
+        """
+        siblings_rows = self._children_rows.get(parent_row, array("q"))
+        # The siblings are searched as if the excluded row was already taken out.
+        position_excluded = len(siblings_rows)
+        if excluded_row is not None:
+            position_excluded = self._positions[excluded_row]
+        low = 0
+        high = len(siblings_rows) - (excluded_row is not None)
+        while low < high:
+            middle = (low + high) // 2
+            index = middle + 1 if middle >= position_excluded else middle
+            if self.get_name(siblings_rows[index]) <= name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def insert_tag(
+        self,
+        tag_id: int,
+        parent_row: int,
+        position: int,
+        name: str,
+        tag_type: str,
+    ) -> int:
+        """
+        Appends a new tag, inserted at the given position among its siblings, and
+        returns its row.
+
+        Parameters
+        ----------
+        tag_id
+        parent_row
+        position
+        name
+        tag_type
+
+        """
+        row = self._append_tag(tag_id, name, tag_type)
+        self._parent_rows[row] = parent_row
+        siblings_rows = self._children_rows.setdefault(parent_row, array("q"))
+        siblings_rows.insert(position, row)
+        self._update_positions(siblings_rows, position)
+        return row
+
+    def rename_tag(self, row: int, name: str, position: int) -> None:
+        """
+        Renames the tag, and moves it to the given position among its siblings.
+
+        Parameters
+        ----------
+        row
+        name
+        position
+            The new position, as returned by find_position with the row of the tag as
+            excluded_row.
+
+        """
+        name_encoded = name.encode("utf-8")
+        # The former name is left unused in the buffer.
+        self._name_offsets[row] = len(self._names)
+        self._name_lengths[row] = len(name_encoded)
+        self._names += name_encoded
+        siblings_rows = self._children_rows[self._parent_rows[row]]
+        position_old = self._positions[row]
+        siblings_rows.pop(position_old)
+        siblings_rows.insert(position, row)
+        self._update_positions(siblings_rows, min(position, position_old))
+
+    def remove_tag(self, row: int) -> None:
+        """
+        Marks the tag and all its descendants as deleted.
+
+        Parameters
+        ----------
+        row
+
+        """
+        parent_row = self._parent_rows[row]
+        siblings_rows = self._children_rows[parent_row]
+        position = self._positions[row]
+        siblings_rows.pop(position)
+        self._update_positions(siblings_rows, position)
+        if not siblings_rows:
+            del self._children_rows[parent_row]
+        for subtree_row in self.get_subtree_rows(row):
+            self._children_rows.pop(subtree_row, None)
+            self._rows_by_id.pop(self._ids[subtree_row], None)
+            self._parent_rows[subtree_row] = DELETED_ROW
+
+    def _update_positions(self, siblings_rows: array, position_start: int) -> None:
+        for position in range(position_start, len(siblings_rows)):
+            self._positions[siblings_rows[position]] = position
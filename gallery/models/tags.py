@@ -8,17 +8,37 @@ Defines :
  :class:`MyTag` and :class:`MyObjectTag`, specific to the user defined object and
  its database.
 
+The hierarchy of tags is stored as a parent foreign key on each tag. It can also be
+indexed by an optional closure table, holding a row (ancestor, descendant, depth)
+for each tag and each of its ancestors, itself included at depth 0. The descendants
+of a tag, and the objects tagged with them, are then found by a single indexed
+join whatever the depth of the hierarchy, instead of a recursive query.
+
 """
 
 from __future__ import annotations
 
 from functools import partial
-from typing import Tuple, Type, Set, List, Callable
+from typing import Any, Iterable, Optional, Tuple, Type, Set, List, Callable
 
 import peewee
-from peewee import Model, ForeignKeyField, CharField, AutoField, CompositeKey
+from peewee import (
+    Model,
+    ForeignKeyField,
+    CharField,
+    AutoField,
+    CompositeKey,
+    IntegerField,
+    Value,
+)
 
 import gallery.types as types
+from gallery.models.tag_hierarchy import TagHierarchy
+from gallery.models.tags_adjacency import TagsAdjacency
+from gallery.models.write_notifier import WriteNotifier
+
+SQLITE_MAX_VARIABLES = 999
+"""The maximum number of parameters in a single statement for older SQLite builds."""
 
 
 class Tag(Model):
@@ -32,12 +52,30 @@ class Tag(Model):
     parent
     type
 
+    Class Attributes
+    ----------------
+    closure_table
+        The model of the closure table indexing the hierarchy, None if the hierarchy
+        isn't indexed.
+    MyObject
+        The model of the user defined object, set by :meth:`tag_factory`.
+    MyObjectTag
+        The model of the links between the tags and the objects, set by
+        :meth:`tag_factory`.
+
     Methods
     -------
+    save
+    rebuild_closure_table
     get_my_objects
     get_my_objects_with_descendants
+    add_my_objects
+    remove_my_objects
     delete_self_and_children
     get_descendants
+    select_self_and_descendants_ids
+    select_ancestors_ids
+    select_my_objects_ids_with_descendants
 
     Warning
     -------
@@ -51,39 +89,296 @@ class Tag(Model):
     parent: Tag = ForeignKeyField("self", backref="children", null=True)
     type: str = CharField()
 
+    closure_table: Optional[Type[TagClosure]] = None
+    MyObject: Type[Model]
+    MyObjectTag: Type[ObjectTag]
+
+    def save(self, *args: Any, **kwargs: Any) -> int:
+        """
+        Saves the tag, and updates the closure table when the tag is created or moved
+        to another parent. The save is then notified to the in-memory caches.
+        """
+        closure_table = self.closure_table
+        is_created = self.id is None
+        is_moved = any(field.name == "parent" for field in self.dirty_fields)
+        if closure_table is None:
+            rows_modified = super().save(*args, **kwargs)
+        else:
+            with _get_database(self).atomic():
+                rows_modified = super().save(*args, **kwargs)
+                if is_created:
+                    _insert_closure_rows(closure_table, self)
+                elif is_moved:
+                    _move_closure_rows(closure_table, self)
+        _get_write_notifier(self).notify_tag_saved(self, is_created, is_moved)
+        return rows_modified
+
+    @classmethod
+    def rebuild_closure_table(cls) -> None:
+        """
+        Fills the closure table from the parent foreign keys, for instance for a
+        database created without it, or modified outside of the gallery.
+        """
+        closure_table = cls.closure_table
+        assert closure_table is not None
+        root = cls.alias()
+        paths = root.select(
+            root.id.alias("ancestor"), root.id.alias("descendant"), Value(0)
+        ).cte("paths", recursive=True, columns=("ancestor", "descendant", "depth"))
+        child = cls.alias()
+        children = child.select(paths.c.ancestor, child.id, paths.c.depth + 1).join(
+            paths, on=child.parent == paths.c.descendant
+        )
+        paths = paths.union_all(children)
+        all_paths = paths.select_from(
+            paths.c.ancestor, paths.c.descendant, paths.c.depth
+        )
+        fields = [
+            closure_table.ancestor,
+            closure_table.descendant,
+            closure_table.depth,
+        ]
+        with _get_database(cls).atomic():
+            closure_table.delete().execute()
+            closure_table.insert_from(all_paths, fields).execute()
+
     def get_my_objects(self) -> types.MyObjectSet:
         """A set of the objects tagged with the tag."""
-        # The method uses directly the MyObject class, not defined in the parent Tag
-        # class, only in its derived classes created by the tag_factory function.
-        # The implementation has to be done inside tag_factory.
-        raise NotImplementedError
+        MyObject = self.MyObject
+        MyObjectTag = self.MyObjectTag
+        my_objects = set(
+            MyObject.select().join(MyObjectTag).where(MyObjectTag.tag == self.id)
+        )
+        return my_objects
 
     def get_my_objects_with_descendants(self) -> types.MyObjectSet:
         """A set of the objects tagged with the tag or one of its descendants."""
-        my_objects_with_descendants = self.get_my_objects()
-        # "children" is defined as a backref in the "parent" field
-        for child in self.children:  # pylint: disable=no-member
-            my_objects_with_descendants = my_objects_with_descendants.union(
-                child.get_my_objects_with_descendants()
-            )
+        MyObject = self.MyObject
+        my_objects_ids = self.select_my_objects_ids_with_descendants()
+        my_objects_with_descendants = set(
+            MyObject.select().where(MyObject.id.in_(my_objects_ids))
+        )
         return my_objects_with_descendants
 
+    def select_my_objects_ids_with_descendants(self) -> peewee.Select:
+        """
+        A query returning the ids of the objects tagged with the tag or one of its
+        descendants.
+        """
+        MyObjectTag = self.MyObjectTag
+        closure_table = self.closure_table
+        if closure_table is not None:
+            my_objects_ids = (
+                MyObjectTag.select(MyObjectTag.my_object)
+                .join(closure_table, on=closure_table.descendant == MyObjectTag.tag)
+                .where(closure_table.ancestor == self.id)
+            )
+        else:
+            self_and_descendants_ids = self.select_self_and_descendants_ids()
+            my_objects_ids = MyObjectTag.select(MyObjectTag.my_object).where(
+                MyObjectTag.tag.in_(self_and_descendants_ids)
+            )
+        return my_objects_ids
+
+    def add_my_objects(self, my_objects_ids: Iterable[types.MyObjectId]) -> None:
+        """
+        Tags all the objects with the given ids in a single transaction, ignoring the
+        ones already tagged.
+        """
+        MyObjectTag = self.MyObjectTag
+        my_objects_ids = list(my_objects_ids)
+        rows = [
+            {"my_object": my_object_id, "tag": self.id}
+            for my_object_id in my_objects_ids
+        ]
+        # Each row uses two parameters.
+        with _get_database(self).atomic():
+            for batch in peewee.chunked(rows, SQLITE_MAX_VARIABLES // 2):
+                MyObjectTag.insert_many(batch).on_conflict_ignore().execute()
+        _get_write_notifier(self).notify_links_added(self.id, my_objects_ids)
+
+    def remove_my_objects(self, my_objects_ids: Iterable[types.MyObjectId]) -> None:
+        """
+        Untags all the objects with the given ids in a single transaction, ignoring
+        the ones not tagged.
+        """
+        MyObjectTag = self.MyObjectTag
+        my_objects_ids = list(my_objects_ids)
+        with _get_database(self).atomic():
+            for batch in peewee.chunked(my_objects_ids, SQLITE_MAX_VARIABLES - 1):
+                MyObjectTag.delete().where(
+                    MyObjectTag.tag == self.id, MyObjectTag.my_object.in_(batch)
+                ).execute()
+        _get_write_notifier(self).notify_links_removed(self.id, my_objects_ids)
+
     def delete_self_and_children(self) -> None:
-        """Recursively delete a tag and all his children."""
-        # "children" is defined as backref in the "parent" field
-        for child in self.children:  # pylint: disable=no-member
-            child.delete_self_and_children()
-        self.delete_instance()
+        """
+        Delete a tag and all its descendants, the whole subtree being resolved in a
+        single query.
+
+        Only the results of the deleted tags and of their ancestors are invalidated.
+
+        """
+        MyTag = self.__class__
+        self_and_descendants_ids = [
+            row[0] for row in self.select_self_and_descendants_ids().tuples()
+        ]
+        # Read before the deletion, which removes the tag and its parent key.
+        ancestors_ids = self._get_ancestors_ids()
+        with _get_database(self).atomic():
+            for batch in peewee.chunked(
+                self_and_descendants_ids, SQLITE_MAX_VARIABLES - 1
+            ):
+                if self.closure_table is not None:
+                    closure_table = self.closure_table
+                    closure_table.delete().where(
+                        closure_table.descendant.in_(batch)
+                    ).execute()
+                # delete is a classmethod_only descriptor, which pylint doesn't
+                # understand.
+                MyTag.delete().where(  # pylint: disable=no-value-for-parameter
+                    MyTag.id.in_(batch)
+                ).execute()
+        _get_write_notifier(MyTag).notify_tag_deleted(
+            self, self_and_descendants_ids, ancestors_ids
+        )
+
+    def _get_ancestors_ids(self) -> List[int]:
+        ancestors_ids = [row[0] for row in self.select_ancestors_ids().tuples()]
+        return ancestors_ids
+
+    def select_ancestors_ids(self) -> peewee.Select:
+        """
+        A query returning the ids of all ancestors of the tag.
+
+        Same as the descendants, the ancestors are resolved by SQLite in one recursive
+        CTE, or read from the closure table if there is one.
+
+        """
+        closure_table = self.closure_table
+        if closure_table is not None:
+            return closure_table.select(closure_table.ancestor).where(
+                closure_table.descendant == self.id, closure_table.depth > 0
+            )
+        MyTag = self.__class__
+        ancestors = (
+            MyTag.select(MyTag.parent)
+            .where(MyTag.id == self.id)
+            .cte("ancestors", recursive=True, columns=("id",))
+        )
+        tag_parent = MyTag.alias()
+        parents = tag_parent.select(tag_parent.parent).join(
+            ancestors, on=(tag_parent.id == ancestors.c.id)
+        )
+        ancestors = ancestors.union_all(parents)
+        # The recursion stops at the root, whose parent is null.
+        ancestors_ids = ancestors.select_from(ancestors.c.id).where(
+            ancestors.c.id.is_null(False)
+        )
+        return ancestors_ids
 
     def get_descendants(self) -> List[Tag]:
-        """The list of all descendants of the tag."""
-        descendants = []
-        # "children" is defined as backref in the "parent" field
-        for child in self.children:  # pylint: disable=no-member
-            descendants.append(child)
-            descendants += child.get_descendants()
+        """
+        The list of all descendants of the tag, read from the in-memory hierarchy if
+        it is loaded.
+        """
+        tag_hierarchy = _get_tag_hierarchy(self)
+        if tag_hierarchy is not None and tag_hierarchy.is_loaded:
+            return tag_hierarchy.get_descendants(self.id)
+        MyTag = self.__class__
+        self_and_descendants_ids = self.select_self_and_descendants_ids()
+        descendants = list(
+            MyTag.select().where(
+                MyTag.id.in_(self_and_descendants_ids), MyTag.id != self.id
+            )
+        )
         return descendants
 
+    def select_self_and_descendants_ids(self) -> peewee.Select:
+        """
+        A query returning the ids of the tag and of all its descendants.
+
+        The whole subtree is resolved by SQLite in one recursive CTE, whatever its
+        depth, or read from the closure table if there is one. The query can be used
+        as a subquery (``Tag.id.in_(...)``).
+
+        """
+        closure_table = self.closure_table
+        if closure_table is not None:
+            return closure_table.select(closure_table.descendant).where(
+                closure_table.ancestor == self.id
+            )
+        MyTag = self.__class__
+        root = MyTag.alias()
+        subtree = (
+            root.select(root.id)
+            .where(root.id == self.id)
+            .cte("subtree", recursive=True)
+        )
+        child = MyTag.alias()
+        children = child.select(child.id).join(subtree, on=child.parent == subtree.c.id)
+        subtree = subtree.union_all(children)
+        self_and_descendants_ids = subtree.select_from(subtree.c.id)
+        return self_and_descendants_ids
+
+
+class TagClosure(Model):
+    """
+    Rows of the closure table, linking each tag to itself and to all its ancestors.
+
+    Instance Attributes
+    -------------------
+    ancestor
+    descendant
+    depth
+        The number of generations between the ancestor and the descendant.
+
+    """
+
+    ancestor: Tag
+    descendant: Tag
+    depth: int
+
+
+def _insert_closure_rows(closure_table: Type[TagClosure], tag: Tag) -> None:
+    closure_table.insert(ancestor=tag.id, descendant=tag.id, depth=0).execute()
+    if tag.parent_id is not None:
+        parent_ancestors = closure_table.select(
+            closure_table.ancestor, Value(tag.id), closure_table.depth + 1
+        ).where(closure_table.descendant == tag.parent_id)
+        fields = [closure_table.ancestor, closure_table.descendant, closure_table.depth]
+        closure_table.insert_from(parent_ancestors, fields).execute()
+
+
+def _move_closure_rows(closure_table: Type[TagClosure], tag: Tag) -> None:
+    # The links between the subtree and its former ancestors are replaced by links
+    # to each of the new ancestors.
+    subtree_rows = closure_table.alias()
+    subtree_ids = subtree_rows.select(subtree_rows.descendant).where(
+        subtree_rows.ancestor == tag.id
+    )
+    closure_table.delete().where(
+        closure_table.descendant.in_(subtree_ids),
+        closure_table.ancestor.not_in(subtree_ids),
+    ).execute()
+    if tag.parent_id is not None:
+        ancestor_rows = closure_table.alias()
+        descendant_rows = closure_table.alias()
+        new_links = (
+            ancestor_rows.select(
+                ancestor_rows.ancestor,
+                descendant_rows.descendant,
+                ancestor_rows.depth + descendant_rows.depth + 1,
+            )
+            .from_(ancestor_rows, descendant_rows)
+            .where(
+                ancestor_rows.descendant == tag.parent_id,
+                descendant_rows.ancestor == tag.id,
+            )
+        )
+        fields = [closure_table.ancestor, closure_table.descendant, closure_table.depth]
+        closure_table.insert_from(new_links, fields).execute()
+
 
 class ObjectTag(Model):
     """
@@ -101,7 +396,9 @@ class ObjectTag(Model):
 
 
 def tag_factory(
-    my_database: peewee.SqliteDatabase, MyObject: Type[types.MyObjectType]
+    my_database: peewee.SqliteDatabase,
+    MyObject: Type[types.MyObjectType],
+    with_closure_table: bool = False,
 ) -> Tuple[Type[Tag], Type[ObjectTag]]:
     """
     Creates two classes used to manipulate tags specific to MyObject and the associated
@@ -113,6 +410,11 @@ def tag_factory(
         The database holding the objects.
     MyObject
         Model for the user defined object.
+    with_closure_table
+        Whether the hierarchy of tags is indexed by a closure table, available as
+        MyTag.closure_table. The table is created and filled if it doesn't exist yet.
+        Otherwise, the closure table is dropped if it exists, since it won't be
+        maintained.
 
     Returns
     -------
@@ -140,33 +442,81 @@ def tag_factory(
         # The parent field MUST be redefined in any derived class, so that the
         # "children" attribute returns instances of the derived class. Otherwise, it
         # will return instances of the parent class Tag.
-        parent = ForeignKeyField("self", backref="children", null=True)
+        # Its index is replaced by the (parent, name) index below.
+        parent = ForeignKeyField("self", backref="children", null=True, index=False)
 
         class Meta:  # pylint: disable=missing-class-docstring, too-few-public-methods
             database = my_database
             table_name = "tag"
 
-        def get_my_objects(self) -> Set[Model]:
-            my_objects = set(
-                MyObject.select()
-                .join(MyObjectTag)
-                .join(self.__class__)
-                .where(self.__class__.id == self.id)
-            )
-            return my_objects
-
     class MyObjectTag(Model):  # pylint: disable=missing-class-docstring
-        my_object = ForeignKeyField(MyObject)
-        tag = ForeignKeyField(MyTag)
+        # The primary key already indexes my_object, and the (tag, my_object) index
+        # below indexes tag.
+        my_object = ForeignKeyField(MyObject, index=False)
+        tag = ForeignKeyField(MyTag, index=False)
 
         class Meta:  # pylint: disable=missing-class-docstring, too-few-public-methods
             database = my_database
             table_name = MyObject.__name__.lower() + "_tag"
             primary_key = CompositeKey("my_object", "tag")
 
+    MyTag.MyObject = MyObject
+    MyTag.MyObjectTag = MyObjectTag
+    _add_hot_path_indexes(MyTag, MyObjectTag)
+    _set_up_closure_table(MyTag, with_closure_table)
     return MyTag, MyObjectTag
 
 
+def _add_hot_path_indexes(
+    MyTag: Type[Tag], MyObjectTag: Type[ObjectTag]
+) -> None:
+    # The indexes are named after their tables, several MyObject models possibly
+    # sharing the same database.
+    # The children of a tag (or the tags at the root), sorted by name.
+    MyTag.add_index(MyTag.index(MyTag.parent, MyTag.name, name="tag_parent_id_name"))
+    # The my_objects of a tag, without reading the table itself.
+    my_object_tag_table = _get_table_name(MyObjectTag)
+    MyObjectTag.add_index(
+        MyObjectTag.index(
+            MyObjectTag.tag,
+            MyObjectTag.my_object,
+            name=f"{my_object_tag_table}_tag_id_my_object_id",
+        )
+    )
+
+
+def _set_up_closure_table(MyTag: Type[Tag], with_closure_table: bool) -> None:
+    # Same as in tag_factory, the classes get their documentation from their base
+    # class.
+    class MyTagClosure(TagClosure):  # pylint: disable=missing-class-docstring
+        ancestor = ForeignKeyField(MyTag, backref="+")
+        descendant = ForeignKeyField(MyTag, backref="+")
+        depth = IntegerField()
+
+        class Meta:  # pylint: disable=missing-class-docstring, too-few-public-methods
+            database = _get_database(MyTag)
+            table_name = "tag_closure"
+            primary_key = CompositeKey("ancestor", "descendant")
+            indexes = ((("descendant", "depth"), False),)
+
+    if with_closure_table:
+        _create_closure_table(MyTag, MyTagClosure)
+    else:
+        # The closure table would be out of date once the tags are modified, and is
+        # built again when the option is turned back on.
+        MyTagClosure.drop_table(safe=True)
+
+
+def _create_closure_table(MyTag: Type[Tag], closure_table: Type[TagClosure]) -> None:
+    MyTag.closure_table = closure_table
+    # The closure table only exists while it is maintained, so that the tags are only
+    # indexed when the option is turned on.
+    if not closure_table.table_exists():
+        closure_table.create_table()
+        if MyTag.table_exists():
+            MyTag.rebuild_closure_table()
+
+
 def add_tag_related_method(my_object: Model) -> None:
     """
     Convenience method to bind a get_tags and add_tag method to a used defined object.
@@ -195,7 +545,13 @@ def add_tag_related_method(my_object: Model) -> None:
 
 def _add_add_tag_method(my_object: Model) -> None:
     def add_tag(self, tag: Tag) -> None:
-        self.MyObjectTag.get_or_create(my_object=self.id, tag=tag.id)
+        unused_my_object_tag, is_created = self.MyObjectTag.get_or_create(
+            my_object=self.id, tag=tag.id
+        )
+        # Nothing is written if the my_object is already tagged.
+        if not is_created:
+            return
+        _get_write_notifier(self).notify_links_added(tag.id, [self.id])
 
     _add_method_to_my_object(my_object, add_tag)
 
@@ -204,17 +560,48 @@ def _add_get_tags_method(my_object: Model) -> None:
     my_object_class = type(my_object)
 
     def get_tags(self: Model) -> Set[Tag]:
-        tags = set(
-            self.MyTag.select()
-            .join(self.MyObjectTag)
-            .join(my_object_class)
-            .where(my_object_class.id == self.id)
-        )
+        # Served from the adjacency cache when it is warm, without any query.
+        tags_adjacency = _get_tags_adjacency(self)
+        tags = tags_adjacency.get_tags(self.id) if tags_adjacency else None
+        if tags is None:
+            tags = set(
+                self.MyTag.select()
+                .join(self.MyObjectTag)
+                .join(my_object_class)
+                .where(my_object_class.id == self.id)
+            )
         return tags
 
     _add_method_to_my_object(my_object, get_tags)
 
 
+def _get_database(model: Any) -> peewee.Database:
+    # peewee only exposes the database of a model through its options.
+    return model._meta.database  # pylint: disable=protected-access
+
+
+def _get_table_name(model: Any) -> str:
+    # Same as the database, the table name is only exposed through the options.
+    return model._meta.table_name  # pylint: disable=protected-access
+
+
+def _get_write_notifier(model: Any) -> WriteNotifier:
+    # The notifier is only added by GalleryModels, the models can be used without it,
+    # their writes then being notified to no cache.
+    write_notifier = getattr(model, "write_notifier", None) or WriteNotifier()
+    return write_notifier
+
+
+def _get_tag_hierarchy(model: Any) -> Optional[TagHierarchy]:
+    # Same as the notifier, the hierarchy is only added by GalleryModels.
+    return getattr(model, "tag_hierarchy", None)
+
+
+def _get_tags_adjacency(model: Any) -> Optional[TagsAdjacency]:
+    # Same as the notifier, the adjacency cache is only added by GalleryModels.
+    return getattr(model, "tags_adjacency", None)
+
+
 def _add_method_to_my_object(my_object: Model, method: Callable) -> None:
     _assert_can_add_tag_related_method(my_object)
     method_bound_to_my_object = partial(method, my_object)
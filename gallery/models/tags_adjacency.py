@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The TagsAdjacency class.
+
+The links between my_objects and tags can be kept in memory, as a mapping from each
+my_object id to the ids of its tags, so that the tags of many my_objects can be
+looked up without querying the link table for each of them. The tags themselves are
+kept as well, mapped by id, so that the lookups don't query the tag table either.
+The cache is optional and empty until it is warmed, loading the whole link table and
+tag table in one query each. Once warm, it is kept up to date by the tagging methods
+of the gallery and when a tag is saved or deleted, and is emptied by any other write
+that it can't follow.
+
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional, Set, Type
+
+import peewee
+
+
+class TagsAdjacency:
+
+    """
+    In-memory cache of the ids of the tags of each my_object.
+
+    Attributes
+    ----------
+    is_warm
+
+    Methods
+    -------
+    warm
+    invalidate
+    get_tags_ids
+    get_tag
+    get_tags
+    add_links
+    remove_links
+    update_tag
+    remove_tags
+    handle_tag_saved
+    handle_links_added
+    handle_links_removed
+    handle_tag_deleted
+    handle_external_write
+
+    """
+
+    def __init__(self) -> None:
+        self._tags_ids_by_my_object_id: Optional[Dict[int, Set[int]]] = None
+        self._tags_by_id: Dict[int, peewee.Model] = {}
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether the cache is loaded, and can answer the lookups."""
+        return self._tags_ids_by_my_object_id is not None
+
+    def warm(self, MyObjectTag: Type[peewee.Model]) -> None:
+        """
+        Loads the whole link table between my_objects and tags in a single query,
+        and all the tags in another one.
+
+        Parameters
+        ----------
+        MyObjectTag
+            The model linking the my_objects to their tags.
+
+        """
+        tags_ids_by_my_object_id: Dict[int, Set[int]] = {}
+        rows = MyObjectTag.select(MyObjectTag.my_object, MyObjectTag.tag).tuples()
+        for my_object_id, tag_id in rows:
+            tags_ids_by_my_object_id.setdefault(my_object_id, set()).add(tag_id)
+        MyTag = MyObjectTag.tag.rel_model
+        self._tags_by_id = {tag.id: tag for tag in MyTag.select()}
+        self._tags_ids_by_my_object_id = tags_ids_by_my_object_id
+
+    def invalidate(self) -> None:
+        """Empties the cache, until it is warmed again."""
+        self._tags_ids_by_my_object_id = None
+        self._tags_by_id = {}
+
+    def get_tags_ids(self, my_object_id: int) -> Optional[Set[int]]:
+        """
+        The ids of the tags of the my_object, None if the cache isn't warm.
+
+        The set returned is a copy, and can be modified.
+
+        Parameters
+        ----------
+        my_object_id
+
+        """
+        if self._tags_ids_by_my_object_id is None:
+            tags_ids = None
+        else:
+            tags_ids = set(self._tags_ids_by_my_object_id.get(my_object_id, ()))
+        return tags_ids
+
+    def get_tag(self, tag_id: int) -> Optional[peewee.Model]:
+        """
+        The tag with the given id, None if the cache isn't warm or if the tag doesn't
+        exist anymore.
+
+        Parameters
+        ----------
+        tag_id
+
+        """
+        tag = self._tags_by_id.get(tag_id)
+        return tag
+
+    def get_tags(self, my_object_id: int) -> Optional[Set[peewee.Model]]:
+        """
+        The tags of the my_object, None if the cache isn't warm.
+
+        Parameters
+        ----------
+        my_object_id
+
+        """
+        tags_ids = self.get_tags_ids(my_object_id)
+        if tags_ids is None:
+            tags = None
+        else:
+            # Links to deleted tags may remain in the database, and are skipped.
+            tags = {
+                self._tags_by_id[tag_id]
+                for tag_id in tags_ids
+                if tag_id in self._tags_by_id
+            }
+        return tags
+
+    def add_links(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """
+        Records that the my_objects were tagged with the tag, if the cache is warm.
+
+        Parameters
+        ----------
+        tag_id
+        my_objects_ids
+
+        """
+        if self._tags_ids_by_my_object_id is None:
+            return
+        for my_object_id in my_objects_ids:
+            self._tags_ids_by_my_object_id.setdefault(int(my_object_id), set()).add(
+                tag_id
+            )
+
+    def remove_links(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """
+        Records that the tag was removed from the my_objects, if the cache is warm.
+
+        Parameters
+        ----------
+        tag_id
+        my_objects_ids
+
+        """
+        if self._tags_ids_by_my_object_id is None:
+            return
+        for my_object_id in my_objects_ids:
+            self._tags_ids_by_my_object_id.get(int(my_object_id), set()).discard(tag_id)
+
+    def update_tag(self, tag: peewee.Model) -> None:
+        """
+        Records a tag created or modified, if the cache is warm.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        if self._tags_ids_by_my_object_id is None:
+            return
+        self._tags_by_id[tag.id] = tag
+
+    def remove_tags(self, tags_ids: Iterable[int]) -> None:
+        """
+        Records that the tags were deleted, if the cache is warm. Their links are
+        skipped from then on, as the links to deleted tags remaining in the database.
+
+        Parameters
+        ----------
+        tags_ids
+
+        """
+        for tag_id in tags_ids:
+            self._tags_by_id.pop(tag_id, None)
+
+    def handle_tag_saved(
+        self, tag: peewee.Model, unused_is_created: bool, unused_is_moved: bool
+    ) -> None:
+        """Records the tag saved, if the cache is warm."""
+        self.update_tag(tag)
+
+    def handle_links_added(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """Records the links added, if the cache is warm."""
+        self.add_links(tag_id, my_objects_ids)
+
+    def handle_links_removed(self, tag_id: int, my_objects_ids: Iterable[int]) -> None:
+        """Records the links removed, if the cache is warm."""
+        self.remove_links(tag_id, my_objects_ids)
+
+    def handle_tag_deleted(
+        self,
+        unused_tag: peewee.Model,
+        tags_ids_deleted: Iterable[int],
+        unused_ancestors_ids: Iterable[int],
+    ) -> None:
+        """Records the deleted tag and descendants, if the cache is warm."""
+        self.remove_tags(tags_ids_deleted)
+
+    def handle_external_write(self) -> None:
+        """Empties the cache, the links being unknown."""
+        self.invalidate()
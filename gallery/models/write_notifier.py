@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The WriteNotifier class.
+
+The gallery models keep several caches in memory : the results of the widget items
+and query parameters, the hierarchy of tags, the links between my_objects and tags,
+and the counts of the tags. Rather than each write updating each cache, the writes
+done through the gallery are notified once to the WriteNotifier of the GalleryModels,
+which forwards them to the caches subscribed. Each cache then updates or invalidates
+itself, through the handlers of the writes it follows.
+
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, List
+
+
+class WriteNotifier:
+
+    """
+    Forwards the writes done through the gallery to the caches subscribed.
+
+    The handlers of the caches are optional, a cache only implementing the ones of the
+    writes it follows, among :
+
+    - handle_tag_saved(tag, is_created, is_moved)
+    - handle_links_added(tag_id, my_objects_ids)
+    - handle_links_removed(tag_id, my_objects_ids)
+    - handle_tag_deleted(tag, tags_ids_deleted, ancestors_ids)
+    - handle_my_objects_rated(ratings_counts, rating)
+    - handle_view_deleted(widget_item_id)
+    - handle_external_write()
+
+    Methods
+    -------
+    subscribe
+    notify_tag_saved
+    notify_links_added
+    notify_links_removed
+    notify_tag_deleted
+    notify_my_objects_rated
+    notify_view_deleted
+    notify_external_write
+
+    """
+
+    def __init__(self) -> None:
+        self._caches: List[Any] = []
+
+    def subscribe(self, cache: Any) -> None:
+        """
+        Forwards the writes to the cache, from now on.
+
+        Parameters
+        ----------
+        cache
+
+        """
+        self._caches.append(cache)
+
+    def notify_tag_saved(self, tag: Any, is_created: bool, is_moved: bool) -> None:
+        """
+        Notifies that a tag was created, renamed or moved to another parent.
+
+        Parameters
+        ----------
+        tag
+        is_created
+        is_moved
+
+        """
+        self._notify("handle_tag_saved", tag, is_created, is_moved)
+
+    def notify_links_added(self, tag_id: int, my_objects_ids: List[int]) -> None:
+        """
+        Notifies that the my_objects were tagged with the tag.
+
+        Parameters
+        ----------
+        tag_id
+        my_objects_ids
+
+        """
+        self._notify("handle_links_added", tag_id, my_objects_ids)
+
+    def notify_links_removed(self, tag_id: int, my_objects_ids: List[int]) -> None:
+        """
+        Notifies that the tag was removed from the my_objects.
+
+        Parameters
+        ----------
+        tag_id
+        my_objects_ids
+
+        """
+        self._notify("handle_links_removed", tag_id, my_objects_ids)
+
+    def notify_tag_deleted(
+        self, tag: Any, tags_ids_deleted: List[int], ancestors_ids: List[int]
+    ) -> None:
+        """
+        Notifies that a tag was deleted, along with all its descendants.
+
+        Parameters
+        ----------
+        tag
+        tags_ids_deleted
+            The ids of the tag and of its descendants.
+        ancestors_ids
+            The ids of the ancestors of the tag, whose descendants changed.
+
+        """
+        self._notify("handle_tag_deleted", tag, tags_ids_deleted, ancestors_ids)
+
+    def notify_my_objects_rated(
+        self, ratings_counts: Dict[int, int], rating: int
+    ) -> None:
+        """
+        Notifies that my_objects were given the rating.
+
+        Parameters
+        ----------
+        ratings_counts
+            The number of my_objects rated, by their former rating. It is only
+            counted while the tag counts are loaded.
+        rating
+
+        """
+        self._notify("handle_my_objects_rated", ratings_counts, rating)
+
+    def notify_view_deleted(self, widget_item_id: Hashable) -> None:
+        """
+        Notifies that a view was deleted, its id being free for a new view.
+
+        Parameters
+        ----------
+        widget_item_id
+            The id of the widget item of the view.
+
+        """
+        self._notify("handle_view_deleted", widget_item_id)
+
+    def notify_external_write(self) -> None:
+        """Notifies that the database was written to outside of the gallery."""
+        self._notify("handle_external_write")
+
+    def _notify(self, handler_name: str, *args: Any) -> None:
+        for cache in self._caches:
+            handler = getattr(cache, handler_name, None)
+            if handler is not None:
+                handler(*args)
@@ -4,16 +4,19 @@
 
 from __future__ import annotations
 
-from typing import Union, Set
+from array import array
+from typing import TYPE_CHECKING, Union, Set
 
 import peewee
 
-import gallery.widgets.tag_tree as tag_tree
+if TYPE_CHECKING:
+    # Only used in the annotations, the models importing these types as well.
+    import gallery.widgets.tag_tree as tag_tree
 
 
 WidgetItemId = Union[str, int]
 
-WidgetItemParent = Union[tag_tree.WidgetItem, tag_tree.TagTreeWidget]
+WidgetItemParent = Union["tag_tree.WidgetItem", "tag_tree.TagTreeWidget"]
 """
 A WidgetItem can accept either the TagTreeWidget or another WidgetItem as its parent.
 """
@@ -24,3 +27,8 @@ MyObjectType = Union[peewee.Model]
 """The user defined object must be derived from a peewee Model class."""
 
 MyObjectSet = Set[MyObjectType]
+
+MyObjectIdSet = Set[int]
+
+MyObjectIdArray = array
+"""A sorted array of my_objects ids, of typecode "q" (signed 64 bits integers)."""
@@ -10,7 +10,7 @@ Defines :
 
 from __future__ import annotations
 
-from typing import List, Dict, Union
+from typing import TYPE_CHECKING, List, Dict, Union
 
 from PySide6 import QtGui, QtWidgets, QtCore
 
@@ -20,7 +20,13 @@ import gallery.widgets.main_widget as main_widget
 import gallery.widgets.tag_tree as tag_tree
 import gallery.types as types
 
-DragSource = Union["grid.TabWidget", "tag_tree.TagTreeWidget"]
+if TYPE_CHECKING:
+    # Only used in the annotations.
+    import gallery.widgets.grid_view as grid_view
+
+DragSource = Union[
+    "grid.CellWidget", "grid_view.TabView", "tag_tree.TagTreeWidget"
+]
 Resource = Dict[str, Union[str, bool]]
 
 
@@ -113,8 +119,10 @@ class DragFromGrid(MyDrag):
 
     Parameters
     ----------
-    cell_widget
-        The widget creating the drag object.
+    drag_source
+        The widget creating the drag object (a CellWidget or a TabView).
+    my_object_id
+        The id of the my_object being dragged.
 
     Methods
     -------
@@ -130,9 +138,11 @@ class DragFromGrid(MyDrag):
         "Default": {"cursor_name": "drag",},
     }
 
-    def __init__(self, cell_widget: grid.CellWidget) -> None:
-        super().__init__(cell_widget)
-        self.my_object_id: types.MyObjectId = cell_widget.my_object.id
+    def __init__(
+        self, drag_source: DragSource, my_object_id: types.MyObjectId
+    ) -> None:
+        super().__init__(drag_source)
+        self.my_object_id: types.MyObjectId = my_object_id
 
     def handle_move_on_grid(self, unused_event: QtGui.QDragMoveEvent) -> None:
         """
@@ -177,8 +187,10 @@ class DragFromGrid(MyDrag):
         if widget_item_hovered.accepts_drop:
             my_objects_dragged = self._get_my_objects_dragged()
             remove = self._needs_remove()
-            for my_object_id in my_objects_dragged:
-                widget_item_hovered.handle_drop_on_self(my_object_id, remove)
+            my_main_widget = self._get_main_widget()
+            write_generation = my_main_widget.models.result_cache.write_generation
+            widget_item_hovered.handle_drop_on_self(my_objects_dragged, remove)
+            my_main_widget.refresh_tabs_among(my_objects_dragged, write_generation)
 
     @staticmethod
     def _needs_remove() -> bool:
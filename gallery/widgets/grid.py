@@ -6,12 +6,16 @@ Defines :
 
  The TabWidget class, and its associated TabSignals.
 
+ The GridDropMixin class, handling the drags over a grid.
+
+ The need_start_drag and start_drag_from_grid functions.
+
 """
 
 from __future__ import annotations
 
-import operator
-from typing import List, Callable, Tuple
+from itertools import chain
+from typing import List, Callable, Tuple, Dict, Optional
 
 from PySide6 import QtWidgets, QtCore, QtGui
 
@@ -20,8 +24,89 @@ import gallery.types as types
 import gallery.widgets.drag as drag
 import gallery.widgets.main_widget as main_widget
 from gallery.widgets.my_custom_gallery_widget import MyCustomGalleryWidget
-from gallery.widgets.query import QueryParameters
-from gallery.widgets.widget_parameters import TabParameters
+from gallery.widgets.prefetch import ScrollPrefetcher
+from gallery.widgets.query import QueryParameters, ResultSnapshot
+from gallery.widgets.query_runner import QueryRunner, mark_stale
+from gallery.widgets.redraw_scheduler import RedrawScheduler
+from gallery.widgets.thumbnail_cache import (
+    ThumbnailCache,
+    get_thumbnail_cache,
+    get_thumbnail_disk_cache,
+)
+from gallery.widgets.thumbnails import PRIORITY_PREFETCH, ThumbnailLoader
+from gallery.widgets.widget_parameters import Geometry, LayoutInputs, compute_geometry
+
+
+def need_start_drag(
+    event: QtGui.QMouseEvent,
+    position_at_click: Optional[QtCore.QPoint],
+    config: config_gallery.ConfigGallery,
+) -> bool:
+    """
+    Whether the left button is held and the mouse has moved far enough since it was
+    clicked to start a drag.
+
+    Parameters
+    ----------
+    event
+    position_at_click
+    config
+
+    """
+    if event.buttons() != QtCore.Qt.LeftButton or position_at_click is None:
+        need_start = False
+    else:
+        drag_distance = (event.pos() - position_at_click).manhattanLength()
+        need_start = drag_distance >= config.cell_min_drag_distance
+    return need_start
+
+
+def start_drag_from_grid(grid_widget: QtWidgets.QWidget, my_object_id: int) -> None:
+    """
+    Starts the drag of a my_object of a grid.
+
+    Parameters
+    ----------
+    grid_widget
+        The cell or the view the drag starts from.
+    my_object_id
+
+    """
+    my_drag = drag.DragFromGrid(grid_widget, my_object_id)
+    my_drag.exec_()
+
+
+class GridDropMixin:
+
+    """
+    Handles the drags over a grid, forwarding them to the drag object of the main
+    widget.
+    """
+
+    def _get_main_widget(self) -> main_widget.MainWidget:
+        my_main_widget = self.get_ancestor_by_class(  # type: ignore  # pylint: disable=no-member
+            main_widget.MainWidget
+        )
+        return my_main_widget
+
+    def _get_drag_object(self) -> drag.MyDrag:
+        my_main_widget = self._get_main_widget()
+        drag_object = my_main_widget.drag_object
+        return drag_object
+
+    def dragEnterEvent(self, event: QtGui.QDragEnterEvent) -> None:
+        """Accepts all the drags, the drop is handled by the drag object."""
+        event.accept()
+
+    def dragMoveEvent(self, event: QtGui.QDragMoveEvent) -> None:
+        """Forwards the move to the drag object."""
+        drag_object = self._get_drag_object()
+        drag_object.handle_move_on_grid(event)
+
+    def dropEvent(self, unused_event: QtGui.QDropEvent) -> None:
+        """Forwards the drop to the drag object."""
+        drag_object = self._get_drag_object()
+        drag_object.handle_drop_on_grid()
 
 
 class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
@@ -30,8 +115,9 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
     A single cell in the gallery, representing a user-defined my_object (later referenced
     as my_object).
 
-    If the my_object has a thumbnail_path method, it will be used to give the cell the
-    path to a thumbnail image, displayed on the cell background. The cell widget also
+    If the my_object has a thumbnail_path method, it will be used by the TabWidget to
+    load a thumbnail image asynchronously, which is then displayed on the cell
+    background. Until then, the cell displays its default label. The cell widget also
     has a transparent overlay which can be hidden or shown, to indicate whether
     the cell is selected.
 
@@ -42,6 +128,11 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
     overlay
     position_at_click: QPoint
 
+    Methods
+    -------
+    bind
+    set_thumbnail
+
     Class Method
     ------------
     create_cell_widget
@@ -87,8 +178,8 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         # pylint: disable = protected-access
         cell_widget = cls.create_widget(parent)
         assert isinstance(cell_widget, cls)
-        cell_widget.my_object = my_object
-        cell_widget._init_graphical_aspects()
+        cell_widget._add_overlay()
+        cell_widget.bind(my_object)
         cell_widget.signals.clicked.connect(handle_cell_clicked)  # type: ignore
         # cell_widget._set_mouse_tracking_on_self_and_children()
         return cell_widget
@@ -97,10 +188,27 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         self.deleteLater()
         super().closeEvent(event)
 
+    def bind(self, my_object: types.MyObjectType) -> None:
+        """
+        Makes the cell represent my_object.
+
+        Allows the TabWidget to recycle existing cells when scrolling, instead of
+        creating new ones.
+
+        Parameters
+        ----------
+        my_object
+
+        """
+        self.my_object = my_object
+        self._init_graphical_aspects()
+
     def _init_graphical_aspects(self) -> None:
         cell_width, cell_height = self.config.cell_width, self.config.cell_height
         self.setFixedSize(cell_width, cell_height)
-        self._add_overlay()
+        self.overlay.setFixedSize(self.size())
+        self.overlay.hide()
+        self.label.clear()
         self._add_image()
 
     # def _set_mouse_tracking_on_self_and_children(self) -> None:
@@ -116,15 +224,11 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         self.overlay.setStyleSheet(
             f"background-color: {self.config.cell_overlay_color};"
         )
-        self.overlay.setFixedSize(self.size())
-        self.overlay.hide()
 
     def _add_image(self) -> None:
-        has_thumbnail = self._has_thumbnail()
-        if has_thumbnail:
-            self._set_background_image()
-        else:
-            self._set_default_label()
+        # The default label is used as a placeholder until the thumbnail, loaded
+        # asynchronously by the TabWidget, is received through set_thumbnail.
+        self._set_default_label()
 
     def _set_default_label(self) -> None:
         label_text = self._get_default_label_text()
@@ -138,30 +242,20 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
             label_text = str(self.my_object.id)
         return label_text
 
-    def _set_background_image(self) -> None:
-        background_image_scaled = self._get_background_image_scaled()
-        self.label.setPixmap(background_image_scaled)
-        self.label.setScaledContents(False)
+    def set_thumbnail(self, thumbnail: QtGui.QPixmap) -> None:
+        """
+        Displays the thumbnail on the cell background.
 
-    def _get_background_image_scaled(self) -> QtGui.QPixmap:
-        background_image = self._get_background_image()
-        background_image_scaled = background_image.scaled(
-            self.config.cell_width, self.config.cell_height, QtCore.Qt.KeepAspectRatio,
-        )
-        return background_image_scaled
+        A null thumbnail (the file couldn't be read) leaves the default label.
 
-    def _get_background_image(self) -> QtGui.QPixmap:
-        thumbnail_path = self.my_object.thumbnail_path()
-        background_image = QtGui.QPixmap(str(thumbnail_path))
-        return background_image
+        Parameters
+        ----------
+        thumbnail
 
-    def _has_thumbnail(self) -> bool:
-        if hasattr(self.my_object, "thumbnail_path"):
-            thumbnail_path = self.my_object.thumbnail_path()
-            has_thumbnail = thumbnail_path.exists()
-        else:
-            has_thumbnail = False
-        return has_thumbnail
+        """
+        if not thumbnail.isNull():
+            self.label.setPixmap(thumbnail)
+            self.label.setScaledContents(False)
 
     def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
         if event.button() == QtCore.Qt.LeftButton:
@@ -172,23 +266,8 @@ class CellWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         #     self.my_popup.setParent(None)
         #     self.my_popup = None
         # buttons = event.buttons()
-        need_start_drag = self._need_start_drag(event)
-        if need_start_drag:
-            my_drag = drag.DragFromGrid(self)
-            my_drag.exec_()
-
-    def _need_start_drag(self, event: QtGui.QMouseEvent) -> bool:
-        if event.buttons() != QtCore.Qt.LeftButton:
-            need_start_drag = False
-        else:
-            need_start_drag = self._is_drag_distance_enough(event)
-        return need_start_drag
-
-    def _is_drag_distance_enough(self, event: QtGui.QMouseEvent) -> bool:
-        drag_distance = (event.pos() - self.position_at_click).manhattanLength()
-        min_drag_distance = self.config.cell_min_drag_distance
-        need_start_drag = drag_distance >= min_drag_distance
-        return need_start_drag
+        if need_start_drag(event, self.position_at_click, self.config):
+            start_drag_from_grid(self, self.my_object.id)
 
     # def display_popup(self) -> None:
     #     return
@@ -261,22 +340,43 @@ class CellSignals(QtCore.QObject):  # pylint: disable=too-few-public-methods
         self.cell: CellWidget = cell
 
 
-class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
+class TabWidget(
+    GridDropMixin, QtWidgets.QWidget, MyCustomGalleryWidget
+):  # pylint: disable=too-many-instance-attributes
 
     """
     A tab to be displayed on the right hand side of the Main Widget.
 
     The tabs holds a grid, which my_objects are defined by query parameters.
 
+    The cells are kept in a pool, sized to the viewport. When the grid is scrolled,
+    the cells still displayed are only moved in the grid layout, and the cells leaving
+    the viewport are bound to the my_objects entering it.
+
+    Scrolling and resizing only schedule a redraw, so that all the events received
+    during a frame lead to a single layout and repopulate pass.
+
+    Refreshing the my_objects may run the query on a worker thread. The grid keeps
+    displaying the previous my_objects, dimmed, until the new ones arrive.
+
     Attributes
     ----------
-    my_objects
     cells
     selection
     query_parameters
-    tab_parameters
+    query_runner
+    thumbnail_loader
+    redraw_scheduler
     signals
 
+    Methods
+    -------
+    refresh
+    redraw
+    schedule_redraw
+    get_snapshot
+    select_all
+
     Class methods
     -------------
     create_tab_widget
@@ -293,9 +393,20 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
     def __init__(self, parent: QtWidgets.QWidget):
         super().__init__(parent)
         self.cells: List[CellWidget] = []
+        """The pool of cells, either displayed or hidden, waiting to be recycled."""
+        self._cells_by_index: Dict[int, CellWidget] = {}
+        self._my_objects_displayed: Dict[int, types.MyObjectType] = {}
+        self._my_objects_prefetched: Dict[int, types.MyObjectType] = {}
+        """The my_objects of the cells about to enter the viewport."""
+        self._prefetcher: ScrollPrefetcher
         self.selection: List[types.MyObjectId] = []
         self.query_parameters: QueryParameters
-        self.tab_parameters: TabParameters
+        self._geometry_drawn: Optional[Geometry] = None
+        """The geometry of the last time the grid was drawn."""
+        self._main_widget: Optional[main_widget.MainWidget] = None
+        self.thumbnail_loader: ThumbnailLoader
+        self.query_runner: QueryRunner
+        self.redraw_scheduler: RedrawScheduler = RedrawScheduler(self, self.redraw)
         self.signals: TabSignals = TabSignals()
 
     @classmethod
@@ -316,55 +427,75 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         # pylint: disable = protected-access
         tab_widget = cls.create_widget(parent)
         assert isinstance(tab_widget, cls)
-        tab_widget.tab_parameters = TabParameters(tab_widget)
         tab_widget.query_parameters = query_parameters
+        tab_widget.thumbnail_loader = ThumbnailLoader(
+            tab_widget, get_thumbnail_disk_cache(tab_widget.config)
+        )
+        tab_widget.thumbnail_loader.signals.loaded.connect(  # type: ignore
+            tab_widget._handle_thumbnail_loaded
+        )
+        tab_widget.query_runner = QueryRunner(tab_widget, tab_widget.models.connections)
+        tab_widget.query_runner.signals.refreshed.connect(  # type: ignore
+            tab_widget._handle_refreshed
+        )
+        tab_widget.query_runner.signals.stale_changed.connect(  # type: ignore
+            tab_widget._handle_stale_changed
+        )
+        tab_widget._prefetcher = ScrollPrefetcher(tab_widget.config)
         tab_widget.scroll_area.verticalScrollBar().valueChanged.connect(
-            tab_widget._draw_grid_non_empty
+            tab_widget._prefetcher.update
+        )
+        tab_widget.scroll_area.verticalScrollBar().valueChanged.connect(
+            tab_widget.schedule_redraw
         )
         return tab_widget
 
     def refresh(self) -> None:
-        """Refreshes a tab and the main_widget status bar."""
-        self._refresh_my_objects()
+        """
+        Refreshes a tab and the main_widget status bar, once the my_objects are
+        refreshed.
+        """
+        self.query_runner.refresh(self.query_parameters)
+
+    def _handle_refreshed(self) -> None:
         self._refresh_selection()
         self.redraw()
         # The signal is picked_up by the main_widget and is used to refresh the
         # status bar.
         self.signals.my_objects_modified.emit()  # type: ignore
 
-    def _refresh_my_objects(self) -> None:
-        self.query_parameters.refresh_my_objects()
+    def _handle_stale_changed(self, is_stale: bool) -> None:
+        mark_stale(self.scroll_area, is_stale)
 
     def _refresh_selection(self) -> None:
         self.selection = []
 
-    def get_my_objects_list(self) -> List[types.MyObjectType]:
-        """The list of objects associated with the tab's query parameters."""
-        my_objects_set = self.query_parameters.my_objects
-        my_objects_list = list(my_objects_set)
-        my_objects_list_sorted = sorted(my_objects_list, key=operator.attrgetter("id"))
-        return my_objects_list_sorted
+    def get_snapshot(self) -> ResultSnapshot:
+        """The snapshot of the sorted ids of the objects of the tab's query parameters."""
+        snapshot = self.query_parameters.snapshot
+        return snapshot
 
-    def _get_main_widget(self):
-        return self.get_ancestor_by_class(main_widget.MainWidget)
+    def _get_main_widget(self) -> main_widget.MainWidget:
+        if self._main_widget is None:
+            self._main_widget = self.get_ancestor_by_class(main_widget.MainWidget)
+        return self._main_widget
 
-    def _get_drag_object(self) -> drag.MyDrag:
+    def _get_geometry(self) -> Geometry:
+        # The geometry is memoized on its inputs, so that it can be asked for as
+        # often as needed.
         my_main_widget = self._get_main_widget()
-        drag_object = my_main_widget.drag_object
-        return drag_object
-
-    def dragEnterEvent(  # pylint: disable=no-self-use
-        self, event: QtGui.QDragEnterEvent
-    ) -> None:
-        event.accept()
-
-    def dragMoveEvent(self, event: QtGui.QDragMoveEvent) -> None:
-        drag_object = self._get_drag_object()
-        drag_object.handle_move_on_grid(event)
-
-    def dropEvent(self, unused_event: QtGui.QDropEvent) -> None:
-        drag_object = self._get_drag_object()
-        drag_object.handle_drop_on_grid()
+        inputs = LayoutInputs(
+            main_widget_width=my_main_widget.width(),
+            main_widget_height=my_main_widget.height(),
+            cell_width=self.config.cell_width,
+            cell_height=self.config.cell_height,
+            cells_qty=len(self.get_snapshot()),
+            scroll_offset=-self.grid_widget_container.pos().y(),
+            tag_tree_min_width=self.config.tag_tree_min_width,
+            scrollbar_width=self.config.scrollbar_width,
+            grid_vertical_margin=self.config.grid_vertical_margin,
+        )
+        return compute_geometry(inputs)
 
     def redraw(self) -> None:
         """Repaints the grid."""
@@ -374,6 +505,10 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         else:
             self._draw_grid_non_empty()
 
+    def schedule_redraw(self, *unused_args) -> None:
+        """Repaints the grid once the pending scroll and resize events are processed."""
+        self.redraw_scheduler.schedule()
+
     def _draw_grid_non_empty(self) -> None:
         self._resize_height()
         # _redraw_grid_widget is a more general case, and includes a call to
@@ -384,25 +519,42 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
             self._resize_width()
 
     def _need_resize_grid_widget_container_width(self) -> bool:
-        return self.tab_parameters.need_resize_grid_container_width()
+        # This method is only used in the case where the grid container width is
+        # modified but not the grid itself, which can happen if there aren't enough
+        # cells to fill a single row.
+        geometry_drawn = self._geometry_drawn
+        geometry = self._get_geometry()
+        return (
+            geometry_drawn is None
+            or geometry.grid_container_width != geometry_drawn.grid_container_width
+        )
 
     def _update_has_changed_query_parameters(self) -> None:
         self.query_parameters.reset_has_changed_attribute()
 
-    def _update_tab_parameters(self) -> None:
-        self.tab_parameters.update_current_parameters()
+    def _update_geometry_drawn(self) -> None:
+        self._geometry_drawn = self._get_geometry()
 
     def _update_has_changed_cell_dimension(self) -> None:
         self.config.reset_has_changed_cell_dimension()
 
     def _is_grid_empty(self) -> bool:
-        return len(self.get_my_objects_list()) == 0
+        return len(self.get_snapshot()) == 0
 
     def _need_redraw_grid_widget(self) -> bool:
-        need_from_tab_parameter = self.tab_parameters.need_redraw_cells()
+        need_from_geometry = self._need_redraw_cells()
         need_from_query = self.query_parameters.has_changed
         need_from_config = self.config.has_changed_cell_dimension()
-        return need_from_tab_parameter or need_from_query or need_from_config
+        return need_from_geometry or need_from_query or need_from_config
+
+    def _need_redraw_cells(self) -> bool:
+        geometry_drawn = self._geometry_drawn
+        geometry = self._get_geometry()
+        return (
+            geometry_drawn is None
+            or geometry.cell_range != geometry_drawn.cell_range
+            or geometry.grid_columns != geometry_drawn.grid_columns
+        )
 
     def _draw_grid_empty(self) -> None:
         self._remove_all_cells()
@@ -411,7 +563,7 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
 
     def _resize_width(self) -> None:
         self._resize_all_widgets_width()
-        self._update_tab_parameters()
+        self._update_geometry_drawn()
 
     def _resize_all_widgets_width(self) -> None:
         self._resize_grid_widget_width()
@@ -421,19 +573,19 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
 
     def _resize_tab_widget_width(self) -> None:
         tabs_container = self._get_main_widget().tabs_widget
-        tab_widget_width = self.tab_parameters.width
+        tab_widget_width = self._get_geometry().tab_width
         tabs_container.setFixedWidth(tab_widget_width)
 
     def _resize_scroll_area_width(self) -> None:
-        scroll_area_width = self.tab_parameters.scroll_area.width
+        scroll_area_width = self._get_geometry().scroll_area_width
         self.scroll_area.setFixedWidth(scroll_area_width)
 
     def _resize_grid_widget_container_width(self) -> None:
-        grid_widget_container_width = self.tab_parameters.grid_container.width
+        grid_widget_container_width = self._get_geometry().grid_container_width
         self.grid_widget_container.setFixedWidth(grid_widget_container_width)
 
     def _resize_grid_widget_width(self) -> None:
-        grid_widget_width = self.tab_parameters.grid.width
+        grid_widget_width = self._get_geometry().grid_width
         self.grid_widget.setFixedWidth(grid_widget_width)
 
     def _resize_height(self) -> None:
@@ -442,50 +594,64 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         self._resize_hidden_containers()
 
     def _resize_grid_widget_container_height(self) -> None:
-        grid_container_height = self.tab_parameters.grid_container.height
+        grid_container_height = self._get_geometry().grid_container_height
         self.grid_widget_container.setFixedHeight(grid_container_height)
 
     def _resize_grid_widget_height(self) -> None:
-        grid_height = self.tab_parameters.grid.height
+        grid_height = self._get_geometry().grid_height
         self.grid_widget.setFixedHeight(grid_height)
 
     def _redraw_grid_widget(self) -> None:
-        self._remove_all_cells()
+        if self._need_rebind_all_cells():
+            self._release_all_cells()
         self._repopulate_grid()
         self._resize_width()
         self._update_has_changed_query_parameters()
         self._update_has_changed_cell_dimension()
 
     def _resize_hidden_containers(self) -> None:
-        empty_cells_top_widget_height = self._get_empty_cells_top_widget_height()
-        self._resize_empty_cells_top_widget(empty_cells_top_widget_height)
-        self._resize_empty_cells_bottom_widget(empty_cells_top_widget_height)
-
-    def _resize_empty_cells_bottom_widget(
-        self, empty_cells_top_widget_height: int
-    ) -> None:
-        empty_cells_bottom_height = (
-            self.tab_parameters.grid_container.height
-            - self.tab_parameters.grid.height
-            - empty_cells_top_widget_height
+        geometry = self._get_geometry()
+        self.empty_cells_top_widget.setFixedHeight(geometry.empty_cells_top_height)
+        self.empty_cells_bottom_widget.setFixedHeight(
+            geometry.empty_cells_bottom_height
         )
-        self.empty_cells_bottom_widget.setFixedHeight(empty_cells_bottom_height)
-
-    def _resize_empty_cells_top_widget(
-        self, empty_cells_top_widget_height: int
-    ) -> None:
-        self.empty_cells_top_widget.setFixedHeight(empty_cells_top_widget_height)
 
-    def _get_empty_cells_top_widget_height(self) -> int:
-        rows_hidden_top = self.tab_parameters.get_rows_displayed_first()
-        row_height = self.config.cell_height
-        empty_cells_top_widget_height = rows_hidden_top * row_height
-        return empty_cells_top_widget_height
+    def _need_rebind_all_cells(self) -> bool:
+        # The index of each my_object changes when the results change, and the cells
+        # must be resized and their thumbnail reloaded when the cell dimension changes.
+        need_from_query = self.query_parameters.has_changed
+        need_from_config = self.config.has_changed_cell_dimension()
+        return need_from_query or need_from_config
+
+    def _release_all_cells(self) -> None:
+        self._cells_by_index = {}
+        self._my_objects_displayed = {}
+        self._my_objects_prefetched = {}
+        self._prefetcher.reset()
+        self.thumbnail_loader.cancel_all()
+
+    def _get_cell(self, cell_index: int, cells_free: List[CellWidget]) -> CellWidget:
+        if cell_index in self._cells_by_index:
+            cell = self._cells_by_index[cell_index]
+        else:
+            cell = self._bind_cell(cell_index, cells_free)
+            self._cells_by_index[cell_index] = cell
+        return cell
 
-    def _create_cell(self, cell_index: int) -> CellWidget:
+    def _bind_cell(self, cell_index: int, cells_free: List[CellWidget]) -> CellWidget:
         my_object = self._get_my_object(cell_index)
-        cell = CellWidget.create_cell_widget(self, my_object, self._handle_cell_clicked)
+        if cells_free:
+            cell = cells_free.pop()
+            cell.bind(my_object)
+        else:
+            cell = self._create_cell(my_object)
         self._handle_is_cell_selected(cell)
+        self._request_thumbnail(cell)
+        return cell
+
+    def _create_cell(self, my_object: types.MyObjectType) -> CellWidget:
+        cell = CellWidget.create_cell_widget(self, my_object, self._handle_cell_clicked)
+        self.cells.append(cell)
         return cell
 
     def _handle_is_cell_selected(self, cell: CellWidget) -> None:
@@ -493,27 +659,165 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
             cell.overlay.show()
 
     def _get_my_object(self, my_object_index: int) -> types.MyObjectType:
-        my_objects = self.get_my_objects_list()
-        my_object = my_objects[my_object_index]
+        my_object_id = self.get_snapshot()[my_object_index]
+        my_object = self._my_objects_displayed[my_object_id]
         return my_object
 
     def _repopulate_grid(self) -> None:
         grid_layout = self.grid_layout
         row, column = 0, 0
         cell_range = self._get_cell_range()
+        self._fetch_my_objects_displayed(cell_range)
+        cells_free = self._release_cells_out_of_range(cell_range)
         for cell_index in cell_range:
-            self._add_cell_to_grid_layout(grid_layout, cell_index, row, column)
+            if not self._is_my_object_fetched(cell_index):
+                continue
+            cell = self._get_cell(cell_index, cells_free)
+            self._move_cell_in_grid_layout(grid_layout, cell, row, column)
             row, column = self._move_to_next_cell(row, column)
+        self._hide_cells(grid_layout, cells_free)
+        self._prefetch(cell_range)
+
+    def _is_my_object_fetched(self, my_object_index: int) -> bool:
+        # A my_object deleted after the results were evaluated isn't displayed, until
+        # the results are refreshed.
+        my_object_id = self.get_snapshot()[my_object_index]
+        return my_object_id in self._my_objects_displayed
+
+    def _fetch_my_objects_displayed(self, cell_range: range) -> None:
+        # Only the objects entering the viewport are fetched from the database, in a
+        # single batch.
+        snapshot = self.get_snapshot()
+        my_objects_ids_displayed = snapshot.get_slice(cell_range.start, cell_range.stop)
+        self._my_objects_displayed = self._fetch_my_objects(my_objects_ids_displayed)
+
+    def _fetch_my_objects(
+        self, my_objects_ids: types.MyObjectIdArray
+    ) -> Dict[int, types.MyObjectType]:
+        # The my_objects already displayed or prefetched are reused.
+        my_objects_known = {**self._my_objects_prefetched, **self._my_objects_displayed}
+        my_objects_ids_missing = [
+            my_object_id
+            for my_object_id in my_objects_ids
+            if my_object_id not in my_objects_known
+        ]
+        my_objects_fetched = self.models.get_my_objects_by_ids(my_objects_ids_missing)
+        my_objects_fetched.update(my_objects_known)
+        my_objects = {
+            my_object_id: my_objects_fetched[my_object_id]
+            for my_object_id in my_objects_ids
+            if my_object_id in my_objects_fetched
+        }
+        return my_objects
+
+    def _prefetch(self, cell_range: range) -> None:
+        # The cells about to enter the viewport in the direction of travel are
+        # prepared in advance, and the work queued for the other ones is dropped.
+        prefetch_range = self._prefetcher.get_prefetch_range(
+            cell_range,
+            self._get_geometry().grid_container_columns,
+            len(self.get_snapshot()),
+        )
+        my_objects_ids_prefetched = self.get_snapshot().get_slice(
+            prefetch_range.start, prefetch_range.stop
+        )
+        self._my_objects_prefetched = self._fetch_my_objects(my_objects_ids_prefetched)
+        self.thumbnail_loader.cancel_all_except(
+            chain(self._my_objects_displayed, self._my_objects_prefetched)
+        )
+        for my_object in self._my_objects_prefetched.values():
+            self._prefetch_thumbnail(my_object)
+
+    def _prefetch_thumbnail(self, my_object: types.MyObjectType) -> None:
+        if hasattr(my_object, "thumbnail_path"):
+            thumbnail_path = my_object.thumbnail_path()
+            cell_dimension = self.config.cell_dimension
+            thumbnail_cache = self._get_thumbnail_cache()
+            if not thumbnail_cache.contains(thumbnail_path, cell_dimension):
+                self.thumbnail_loader.request(
+                    my_object.id,
+                    thumbnail_path,
+                    self._get_cell_size(),
+                    PRIORITY_PREFETCH,
+                )
+
+    def _release_cells_out_of_range(self, cell_range: range) -> List[CellWidget]:
+        self._cells_by_index = {
+            cell_index: cell
+            for cell_index, cell in self._cells_by_index.items()
+            if cell_index in cell_range
+        }
+        cells_bound = set(self._cells_by_index.values())
+        cells_free = [cell for cell in self.cells if cell not in cells_bound]
+        return cells_free
+
+    def _request_thumbnail(self, cell: CellWidget) -> None:
+        # Thumbnails already in the cache are displayed right away, the others are
+        # loaded asynchronously.
+        my_object = cell.my_object
+        if hasattr(my_object, "thumbnail_path"):
+            thumbnail_path = my_object.thumbnail_path()
+            cell_dimension = self.config.cell_dimension
+            thumbnail = self._get_thumbnail_cache().get(thumbnail_path, cell_dimension)
+            if thumbnail is not None:
+                cell.set_thumbnail(thumbnail)
+            else:
+                cell_size = self._get_cell_size()
+                self.thumbnail_loader.request(my_object.id, thumbnail_path, cell_size)
+
+    def _handle_thumbnail_loaded(
+        self, my_object_id: int, size: QtCore.QSize, image: QtGui.QImage
+    ) -> None:
+        # Prefetched thumbnails are only added to the cache, to be displayed when
+        # their cell enters the viewport.
+        my_object = self._get_my_object_displayed_or_prefetched(my_object_id)
+        if my_object is not None and size == self._get_cell_size():
+            thumbnail = QtGui.QPixmap.fromImage(image)
+            thumbnail_path = my_object.thumbnail_path()
+            cell_dimension = self.config.cell_dimension
+            self._get_thumbnail_cache().put(thumbnail_path, cell_dimension, thumbnail)
+            cell_index = self.get_snapshot().positions.get(my_object_id)
+            cell = self._cells_by_index.get(cell_index)
+            if cell is not None:
+                cell.set_thumbnail(thumbnail)
+
+    def _get_my_object_displayed_or_prefetched(
+        self, my_object_id: int
+    ) -> Optional[types.MyObjectType]:
+        if my_object_id in self._my_objects_displayed:
+            my_object = self._my_objects_displayed[my_object_id]
+        else:
+            my_object = self._my_objects_prefetched.get(my_object_id)
+        return my_object
+
+    def _get_thumbnail_cache(self) -> ThumbnailCache:
+        return get_thumbnail_cache(self.config.thumbnail_cache_bytes)
+
+    def _get_cell_size(self) -> QtCore.QSize:
+        return QtCore.QSize(self.config.cell_width, self.config.cell_height)
 
-    def _add_cell_to_grid_layout(
-        self, grid_layout: QtWidgets.QGridLayout, cell_index: int, row: int, column: int
+    @staticmethod
+    def _move_cell_in_grid_layout(
+        grid_layout: QtWidgets.QGridLayout, cell: CellWidget, row: int, column: int
     ) -> None:
-        cell = self._create_cell(cell_index)
-        grid_layout.addWidget(cell, row, column)
-        self.cells.append(cell)
+        layout_index = grid_layout.indexOf(cell)
+        if layout_index == -1:
+            grid_layout.addWidget(cell, row, column)
+        elif grid_layout.getItemPosition(layout_index)[:2] != (row, column):
+            grid_layout.removeWidget(cell)
+            grid_layout.addWidget(cell, row, column)
+        cell.show()
+
+    @staticmethod
+    def _hide_cells(
+        grid_layout: QtWidgets.QGridLayout, cells: List[CellWidget]
+    ) -> None:
+        for cell in cells:
+            grid_layout.removeWidget(cell)
+            cell.hide()
 
     def _move_to_next_cell(self, row: int, column: int) -> Tuple[int, int]:
-        if column == self.tab_parameters.grid_container.columns - 1:
+        if column == self._get_geometry().grid_container_columns - 1:
             column = 0
             row += 1
         else:
@@ -521,16 +825,13 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         return row, column
 
     def _get_cell_range(self) -> range:
-        cell_range = range(
-            self.tab_parameters.get_cells_displayed_first(),
-            self.tab_parameters.get_cells_displayed_last() + 1,
-        )
-        return cell_range
+        return self._get_geometry().cell_range
 
     def _remove_all_cells(self) -> None:
         grid_widget = self.grid_widget
         self._close_all_grid_children(grid_widget)
         self.cells = []
+        self._release_all_cells()
 
     @staticmethod
     def _close_all_grid_children(grid_widget: QtWidgets.QWidget) -> None:
@@ -582,9 +883,7 @@ class TabWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
 
     def select_all(self) -> None:
         """Select all objects in the grid."""
-        self.selection = [
-            my_object.id for my_object in self.query_parameters.my_objects
-        ]
+        self.selection = list(self.get_snapshot())
         for cell in self.cells:
             cell.overlay.show()
 
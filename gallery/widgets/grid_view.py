@@ -0,0 +1,564 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The GridModel class, a list model over the result of a QueryParameters.
+
+ The CellDelegate class, painting the cells of a TabView.
+
+ The TabView class, a virtualized alternative to the TabWidget.
+
+Contrary to the TabWidget, which creates a CellWidget for each cell displayed, the
+TabView is a single QListView. Cells are only painted by the CellDelegate, and the
+my_objects are fetched from the database in small batches, when they first need to be
+painted. Scrolling therefore never creates nor destroys any widget, whatever the size
+of the collection.
+
+"""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from itertools import chain
+from typing import List, Dict, Optional, Any, Set
+
+from PySide6 import QtWidgets, QtCore, QtGui
+
+import gallery.config_gallery.config_gallery as config_gallery
+import gallery.types as types
+from gallery.models.gallery_models import GalleryModels
+
+# The view needs the same helpers as the TabWidget it replaces.
+# pylint: disable=duplicate-code
+from gallery.widgets.grid import (
+    GridDropMixin,
+    TabSignals,
+    need_start_drag,
+    start_drag_from_grid,
+)
+from gallery.widgets.my_custom_gallery_widget import MyCustomGalleryWidget
+from gallery.widgets.prefetch import ScrollPrefetcher
+from gallery.widgets.query import QueryParameters, ResultSnapshot
+from gallery.widgets.query_runner import QueryRunner, mark_stale
+from gallery.widgets.redraw_scheduler import RedrawScheduler
+from gallery.widgets.thumbnail_cache import (
+    ThumbnailCache,
+    get_thumbnail_cache,
+    get_thumbnail_disk_cache,
+)
+from gallery.widgets.thumbnails import PRIORITY_PREFETCH, ThumbnailLoader
+
+# pylint: enable=duplicate-code
+
+MY_OBJECT_ROLE = QtCore.Qt.UserRole
+"""The role used to get the my_object of a given index from the GridModel."""
+
+HYDRATION_BATCH_SIZE = 256
+"""The number of consecutive my_objects fetched at once from the database."""
+
+HYDRATION_BATCHES_MAX = 16
+"""The number of batches of my_objects kept in memory by the GridModel."""
+
+
+class GridModel(QtCore.QAbstractListModel):
+
+    """
+    A list model, with one row per my_object of a ResultSnapshot.
+
+    The my_objects are fetched by batches of consecutive rows, the first time one of
+    the rows of the batch is requested. Only the last batches used are kept in
+    memory. Thumbnails are taken from the process-wide ThumbnailCache, or loaded
+    asynchronously, in which case the view is notified through dataChanged when they
+    arrive.
+
+    Parameters
+    ----------
+    models
+    config
+    parent
+
+    Methods
+    -------
+    set_snapshot
+    clear_pixmaps
+    prefetch
+    get_my_object
+    get_my_object_id
+
+    """
+
+    def __init__(
+        self,
+        models: GalleryModels,
+        config: config_gallery.ConfigGallery,
+        parent: QtCore.QObject,
+    ) -> None:
+        super().__init__(parent)
+        self._models: GalleryModels = models
+        self._config: config_gallery.ConfigGallery = config
+        self._snapshot: ResultSnapshot = ResultSnapshot()
+        self._batches: OrderedDict[int, Dict[int, types.MyObjectType]] = OrderedDict()
+        self._thumbnails_unavailable: Set[int] = set()
+        """The ids of the my_objects without thumbnail, or whose thumbnail couldn't
+        be read."""
+        self._thumbnail_loader: ThumbnailLoader = ThumbnailLoader(
+            self, get_thumbnail_disk_cache(config)
+        )
+        self._thumbnail_loader.signals.loaded.connect(  # type: ignore
+            self._handle_thumbnail_loaded
+        )
+
+    def set_snapshot(self, snapshot: ResultSnapshot) -> None:
+        """Replaces the rows of the model by the ones of the snapshot."""
+        self.beginResetModel()
+        self._snapshot = snapshot
+        self._batches.clear()
+        self.clear_pixmaps()
+        self.endResetModel()
+
+    def clear_pixmaps(self) -> None:
+        """Forgets the thumbnails, for instance when the cell dimension changes."""
+        self._thumbnail_loader.cancel_all()
+        self._thumbnails_unavailable.clear()
+
+    def prefetch(self, rows_displayed: range, rows_prefetched: range) -> None:
+        """
+        Prepares the rows about to be displayed : their my_objects are fetched and
+        their thumbnails loaded. The loading of the thumbnails of the other rows is
+        cancelled.
+
+        Parameters
+        ----------
+        rows_displayed
+        rows_prefetched
+
+        """
+        for row in rows_prefetched:
+            self._prefetch_thumbnail(self.get_my_object(row))
+        my_objects_ids_kept = chain(
+            self._snapshot.get_slice(rows_displayed.start, rows_displayed.stop),
+            self._snapshot.get_slice(rows_prefetched.start, rows_prefetched.stop),
+        )
+        self._thumbnail_loader.cancel_all_except(my_objects_ids_kept)
+
+    def _prefetch_thumbnail(self, my_object: types.MyObjectType) -> None:
+        if self._is_thumbnail_unavailable(my_object):
+            return
+        thumbnail_path = my_object.thumbnail_path()
+        cell_dimension = self._config.cell_dimension
+        if not self._get_thumbnail_cache().contains(thumbnail_path, cell_dimension):
+            self._thumbnail_loader.request(
+                my_object.id, thumbnail_path, self._get_cell_size(), PRIORITY_PREFETCH
+            )
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            row_count = 0
+        else:
+            row_count = len(self._snapshot)
+        return row_count
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            data = None
+        elif role == MY_OBJECT_ROLE:
+            data = self.get_my_object(index.row())
+        elif role == QtCore.Qt.DisplayRole:
+            data = self._get_label_text(index.row())
+        elif role == QtCore.Qt.DecorationRole:
+            data = self._get_thumbnail(index.row())
+        else:
+            data = None
+        return data
+
+    def get_my_object_id(self, row: int) -> int:
+        """The id of the my_object displayed at the given row."""
+        return self._snapshot[row]
+
+    def get_my_object(self, row: int) -> types.MyObjectType:
+        """The my_object displayed at the given row, fetched from the database if
+        necessary."""
+        batch = self._get_batch(row // HYDRATION_BATCH_SIZE)
+        my_object = batch[self.get_my_object_id(row)]
+        return my_object
+
+    def _get_batch(self, batch_index: int) -> Dict[int, types.MyObjectType]:
+        if batch_index in self._batches:
+            self._batches.move_to_end(batch_index)
+        else:
+            self._add_batch(batch_index)
+        return self._batches[batch_index]
+
+    def _add_batch(self, batch_index: int) -> None:
+        start = batch_index * HYDRATION_BATCH_SIZE
+        stop = start + HYDRATION_BATCH_SIZE
+        my_objects_ids = self._snapshot.get_slice(start, stop)
+        self._batches[batch_index] = self._models.get_my_objects_by_ids(my_objects_ids)
+        if len(self._batches) > HYDRATION_BATCHES_MAX:
+            self._batches.popitem(last=False)
+
+    def _get_label_text(self, row: int) -> str:
+        my_object = self.get_my_object(row)
+        if hasattr(my_object, "name"):
+            label_text = my_object.name
+        else:
+            label_text = str(my_object.id)
+        return label_text
+
+    def _get_thumbnail(self, row: int) -> Optional[QtGui.QPixmap]:
+        # None is returned while the thumbnail is being loaded, and the delegate
+        # paints the label as a placeholder.
+        my_object = self.get_my_object(row)
+        if self._is_thumbnail_unavailable(my_object):
+            thumbnail = None
+        elif self._thumbnail_loader.is_pending(my_object.id):
+            thumbnail = None
+        else:
+            thumbnail = self._get_thumbnail_from_cache(my_object)
+            if thumbnail is None:
+                cell_size = self._get_cell_size()
+                self._thumbnail_loader.request(
+                    my_object.id, my_object.thumbnail_path(), cell_size
+                )
+        return thumbnail
+
+    def _is_thumbnail_unavailable(self, my_object: types.MyObjectType) -> bool:
+        if not hasattr(my_object, "thumbnail_path"):
+            self._thumbnails_unavailable.add(my_object.id)
+        return my_object.id in self._thumbnails_unavailable
+
+    def _get_thumbnail_from_cache(
+        self, my_object: types.MyObjectType
+    ) -> Optional[QtGui.QPixmap]:
+        thumbnail_cache = self._get_thumbnail_cache()
+        thumbnail_path = my_object.thumbnail_path()
+        return thumbnail_cache.get(thumbnail_path, self._config.cell_dimension)
+
+    def _handle_thumbnail_loaded(
+        self, my_object_id: int, size: QtCore.QSize, image: QtGui.QImage
+    ) -> None:
+        row = self._snapshot.positions.get(my_object_id)
+        if row is not None and size == self._get_cell_size():
+            if image.isNull():
+                self._thumbnails_unavailable.add(my_object_id)
+            else:
+                thumbnail_path = self.get_my_object(row).thumbnail_path()
+                self._get_thumbnail_cache().put(
+                    thumbnail_path,
+                    self._config.cell_dimension,
+                    QtGui.QPixmap.fromImage(image),
+                )
+            index = self.index(row)
+            self.dataChanged.emit(  # pylint: disable=no-member
+                index, index, [QtCore.Qt.DecorationRole]
+            )
+
+    def _get_thumbnail_cache(self) -> ThumbnailCache:
+        return get_thumbnail_cache(self._config.thumbnail_cache_bytes)
+
+    def _get_cell_size(self) -> QtCore.QSize:
+        return QtCore.QSize(self._config.cell_width, self._config.cell_height)
+
+
+class CellDelegate(QtWidgets.QStyledItemDelegate):
+
+    """
+    Paints a cell : its thumbnail (or its label if it has none), a frame, and the
+    selection overlay if the cell is selected.
+
+    Parameters
+    ----------
+    config
+    parent
+
+    """
+
+    def __init__(
+        self, config: config_gallery.ConfigGallery, parent: QtCore.QObject
+    ) -> None:
+        super().__init__(parent)
+        self._config: config_gallery.ConfigGallery = config
+        self._overlay_color: QtGui.QColor = _get_color_from_css(
+            config.cell_overlay_color
+        )
+
+    def sizeHint(
+        self,
+        unused_option: QtWidgets.QStyleOptionViewItem,
+        unused_index: QtCore.QModelIndex,
+    ) -> QtCore.QSize:
+        return QtCore.QSize(self._config.cell_width, self._config.cell_height)
+
+    def paint(
+        self,
+        painter: QtGui.QPainter,
+        option: QtWidgets.QStyleOptionViewItem,
+        index: QtCore.QModelIndex,
+    ) -> None:
+        painter.save()
+        cell_rect = option.rect
+        thumbnail = index.data(QtCore.Qt.DecorationRole)
+        if thumbnail is not None:
+            self._paint_thumbnail(painter, cell_rect, thumbnail)
+        else:
+            label_text = index.data(QtCore.Qt.DisplayRole)
+            painter.drawText(cell_rect, QtCore.Qt.AlignCenter, label_text)
+        painter.drawRect(cell_rect.adjusted(0, 0, -1, -1))
+        if option.state & QtWidgets.QStyle.State_Selected:
+            painter.fillRect(cell_rect, self._overlay_color)
+        painter.restore()
+
+    @staticmethod
+    def _paint_thumbnail(
+        painter: QtGui.QPainter, cell_rect: QtCore.QRect, thumbnail: QtGui.QPixmap
+    ) -> None:
+        thumbnail_rect = QtCore.QRect(QtCore.QPoint(0, 0), thumbnail.size())
+        thumbnail_rect.moveCenter(cell_rect.center())
+        painter.drawPixmap(thumbnail_rect, thumbnail)
+
+
+def _get_color_from_css(css_color: str) -> QtGui.QColor:
+    # QColor doesn't understand the css "rgba(r, g, b, a)" syntax used in the config
+    # file for the stylesheets.
+    match = re.fullmatch(r"\s*rgba?\(([^)]*)\)\s*", css_color)
+    if match is None:
+        color = QtGui.QColor(css_color)
+    else:
+        components = [int(component) for component in match.group(1).split(",")]
+        color = QtGui.QColor(*components)
+    return color
+
+
+# The QListView already has 8 ancestors itself, but not subclassing it is not an
+# option here...
+class TabView(
+    GridDropMixin, QtWidgets.QListView, MyCustomGalleryWidget
+):  # pylint: disable = too-many-ancestors, too-many-instance-attributes
+
+    """
+    A tab to be displayed on the right hand side of the Main Widget, based on a
+    virtualized QListView.
+
+    It offers the same interface as the TabWidget, and can be used instead of it by
+    setting the "grid_engine" option to "view".
+
+    Attributes
+    ----------
+    selection
+    query_parameters
+    query_runner
+    grid_model
+    redraw_scheduler
+    signals
+    position_at_click: QPoint
+
+    Class methods
+    -------------
+    create_tab_widget
+
+    Warning
+    -------
+    The TabView should not be instantiated directly, but one should rather use
+    the create_tab_widget factory method.
+
+    """
+
+    config: config_gallery.ConfigGallery
+
+    def __init__(self, parent: QtWidgets.QWidget):
+        super().__init__(parent)
+        self.selection: List[types.MyObjectId] = []
+        self.query_parameters: QueryParameters
+        self.grid_model: GridModel
+        self.query_runner: QueryRunner
+        self.redraw_scheduler: RedrawScheduler = RedrawScheduler(self, self.redraw)
+        self.signals: TabSignals = TabSignals()
+        self._prefetcher: ScrollPrefetcher
+        self.position_at_click: Optional[QtCore.QPoint] = None
+        """Coordinates of the mouse at the moment it is clicked."""
+
+    @classmethod
+    def create_tab_widget(
+        cls, parent: QtWidgets.QWidget, query_parameters: QueryParameters
+    ) -> TabView:
+        """
+        Factory method to create tab views.
+
+        Parameters
+        ----------
+        parent
+        query_parameters
+
+        """
+        # create_tab_widget is a factory method, and should therefore be allowed
+        # to access protected members of the class.
+        # pylint: disable = protected-access
+        tab_view = cls.create_widget(parent)
+        assert isinstance(tab_view, cls)
+        tab_view.query_parameters = query_parameters
+        tab_view.query_runner = QueryRunner(tab_view, tab_view.models.connections)
+        tab_view.query_runner.signals.refreshed.connect(  # type: ignore
+            tab_view._handle_refreshed
+        )
+        tab_view.query_runner.signals.stale_changed.connect(  # type: ignore
+            tab_view._handle_stale_changed
+        )
+        tab_view._prefetcher = ScrollPrefetcher(tab_view.config)
+        tab_view._init_model_and_delegate()
+        tab_view._init_view_mode()
+        return tab_view
+
+    def _init_model_and_delegate(self) -> None:
+        self.grid_model = GridModel(self.models, self.config, self)
+        self.setModel(self.grid_model)
+        self.setItemDelegate(CellDelegate(self.config, self))
+        self.selectionModel().selectionChanged.connect(self._update_selection)
+        self.verticalScrollBar().valueChanged.connect(self._prefetcher.update)
+        self.verticalScrollBar().valueChanged.connect(self._prefetch)
+
+    def _init_view_mode(self) -> None:
+        self.setViewMode(QtWidgets.QListView.IconMode)
+        self.setMovement(QtWidgets.QListView.Static)
+        self.setResizeMode(QtWidgets.QListView.Adjust)
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+        self.setUniformItemSizes(True)
+        self.setSpacing(0)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.setDragEnabled(False)
+        self.setAcceptDrops(True)
+        self._update_grid_size()
+
+    def _update_grid_size(self) -> None:
+        self.setGridSize(QtCore.QSize(self.config.cell_width, self.config.cell_height))
+
+    def _prefetch(self) -> None:
+        rows_displayed = self._get_rows_displayed()
+        rows_prefetched = self._prefetcher.get_prefetch_range(
+            rows_displayed, self._get_columns(), self.grid_model.rowCount()
+        )
+        self.grid_model.prefetch(rows_displayed, rows_prefetched)
+
+    def _get_columns(self) -> int:
+        columns = max(self.viewport().width() // self.gridSize().width(), 1)
+        return columns
+
+    def _get_rows_displayed(self) -> range:
+        # Computed from the grid rather than with indexAt, as the corners of the
+        # viewport usually fall outside of any cell, for instance in the spare width
+        # on the right of the last column.
+        grid_height = self.gridSize().height()
+        offset = self.verticalOffset()
+        grid_row_first = offset // grid_height
+        grid_row_last = (offset + self.viewport().height() - 1) // grid_height
+        columns = self._get_columns()
+        first_row = grid_row_first * columns
+        last_row = min((grid_row_last + 1) * columns, self.grid_model.rowCount()) - 1
+        return range(first_row, last_row + 1)
+
+    def refresh(self) -> None:
+        """
+        Refreshes a tab and the main_widget status bar, once the my_objects are
+        refreshed.
+        """
+        self.query_runner.refresh(self.query_parameters)
+
+    def _handle_refreshed(self) -> None:
+        self.redraw()
+        # The signal is picked_up by the main_widget and is used to refresh the
+        # status bar.
+        self.signals.my_objects_modified.emit()  # type: ignore
+
+    def redraw(self) -> None:
+        """Updates the model if the query results or the cell dimension changed."""
+        if self.query_parameters.has_changed:
+            self._reset_model()
+        if self.config.has_changed_cell_dimension():
+            self._handle_cell_dimension_changed()
+
+    def _handle_stale_changed(self, is_stale: bool) -> None:
+        mark_stale(self.viewport(), is_stale)
+
+    def schedule_redraw(self, *unused_args) -> None:
+        """Redraws once the pending resize events are processed."""
+        self.redraw_scheduler.schedule()
+
+    def _reset_model(self) -> None:
+        # A reset of the model clears the selection without emitting selectionChanged
+        self.grid_model.set_snapshot(self.query_parameters.snapshot)
+        self._prefetcher.reset()
+        self.selection = []
+        self.query_parameters.reset_has_changed_attribute()
+
+    def _handle_cell_dimension_changed(self) -> None:
+        self.grid_model.clear_pixmaps()
+        self._update_grid_size()
+        self.scheduleDelayedItemsLayout()
+        self.config.reset_has_changed_cell_dimension()
+
+    def get_snapshot(self) -> ResultSnapshot:
+        """The snapshot of the sorted ids of the objects of the tab's query parameters."""
+        snapshot = self.query_parameters.snapshot
+        return snapshot
+
+    def _update_selection(self) -> None:
+        selected_rows = self.selectionModel().selectedRows()
+        self.selection = [
+            self.grid_model.get_my_object_id(index.row()) for index in selected_rows
+        ]
+
+    def select_all(self) -> None:
+        """Select all objects in the grid."""
+        self.selectAll()
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
+        if event.button() == QtCore.Qt.LeftButton:
+            self.position_at_click = event.pos()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:
+        index_at_click = self._get_index_at_click()
+        if index_at_click.isValid() and need_start_drag(
+            event, self.position_at_click, self.config
+        ):
+            my_object_id = self.grid_model.get_my_object_id(index_at_click.row())
+            start_drag_from_grid(self, my_object_id)
+        else:
+            super().mouseMoveEvent(event)
+
+    def _get_index_at_click(self) -> QtCore.QModelIndex:
+        if self.position_at_click is None:
+            index_at_click = QtCore.QModelIndex()
+        else:
+            index_at_click = self.indexAt(self.position_at_click)
+        return index_at_click
+
+    def mouseDoubleClickEvent(self, event: QtGui.QMouseEvent) -> None:
+        my_object = self._get_my_object_at(event.pos())
+        if hasattr(my_object, "action_double_click"):
+            my_object.action_double_click()
+
+    def contextMenuEvent(self, event: QtGui.QContextMenuEvent) -> None:
+        my_object = self._get_my_object_at(event.pos())
+        menu = QtWidgets.QMenu(self)
+        self._add_actions_to_context_menu(menu, my_object)
+        menu_position = self.viewport().mapToGlobal(event.pos())
+        menu.exec_(menu_position)
+
+    @staticmethod
+    def _add_actions_to_context_menu(
+        menu: QtWidgets.QMenu, my_object: Optional[types.MyObjectType]
+    ) -> None:
+        if hasattr(my_object, "actions"):
+            for name, func in my_object.actions:
+                menu.addAction(name).triggered.connect(func)
+
+    def _get_my_object_at(
+        self, position: QtCore.QPoint
+    ) -> Optional[types.MyObjectType]:
+        index = self.indexAt(position)
+        if index.isValid():
+            my_object = self.grid_model.get_my_object(index.row())
+        else:
+            my_object = None
+        return my_object
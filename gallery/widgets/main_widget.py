@@ -11,7 +11,7 @@ Defines :
 
 from __future__ import annotations
 
-from typing import List, Dict, Optional, Type
+from typing import Iterable, List, Dict, Optional, Type
 
 import peewee
 from PySide6 import QtWidgets, QtGui
@@ -22,6 +22,7 @@ from gallery.config_gallery.config_gallery import ConfigGallery, CellDimension
 from gallery.models.views import View
 from gallery.widgets.drag import MyDrag
 from gallery.widgets.grid import TabWidget
+from gallery.widgets.grid_view import TabView
 from gallery.widgets.my_custom_gallery_widget import MyCustomGalleryWidget
 from gallery.widgets.query import QueryParameters
 from gallery.widgets.tag_tree import (
@@ -29,6 +30,8 @@ from gallery.widgets.tag_tree import (
     WidgetItem,
     WidgetItemView,
 )
+from gallery.widgets.tag_tree_view import TagTreeView
+from gallery.widgets.thumbnail_cache import get_thumbnail_cache
 from gallery.models.gallery_models import GalleryModels
 
 KEYS: Dict[str, int] = {
@@ -39,6 +42,18 @@ KEYS: Dict[str, int] = {
 }
 """A dictionary mapping description to their code as :class:`QKeyPressed` event."""
 
+TAB_CLASSES: Dict[str, Type[QtWidgets.QWidget]] = {
+    "widgets": TabWidget,
+    "view": TabView,
+}
+"""A dictionary mapping the grid_engine option to the class used to create tabs."""
+
+TAG_TREE_CLASSES: Dict[str, Type[QtWidgets.QWidget]] = {
+    "widgets": TagTreeWidget,
+    "view": TagTreeView,
+}
+"""A dictionary mapping the tag_tree_engine option to the class of the tag tree."""
+
 
 class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
     """
@@ -55,6 +70,11 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
     Methods
     -------
     create_main_widget
+    add_tab_from_widget_item
+    refresh_tabs_among
+    save_view
+    update_status_bar
+    modify_cell_zoom
 
     Warning
     -------
@@ -96,7 +116,13 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         main_widget = cls.create_widget(parent)
         assert isinstance(main_widget, cls)
         main_widget.config = ConfigGallery(options)
-        main_widget.models = GalleryModels(database, MyObject)
+        main_widget.models = GalleryModels(
+            database,
+            MyObject,
+            use_tag_closure_table=main_widget.config.use_tag_closure_table,
+            use_performance_profile=main_widget.config.use_sqlite_performance_profile,
+            use_tags_adjacency=main_widget.config.use_tags_adjacency,
+        )
         main_widget._add_subwidgets()
         main_widget.update_status_bar()
         return main_widget
@@ -120,6 +146,13 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         self.tabs_widget.removeTab(tab_index)
 
     def _handle_tab_change(self, unused_tab_index: int) -> None:
+        # The refresh of a tab that is left is not needed anymore. Its results stay
+        # stale, until it is displayed again.
+        current_tab = self.tabs_widget.currentWidget()
+        for tab_index in range(self.tabs_widget.count()):
+            tab_widget = self.tabs_widget.widget(tab_index)
+            if tab_widget is not current_tab:
+                tab_widget.query_runner.cancel()
         self._refresh_current_tab()
         self.update_status_bar()
 
@@ -139,19 +172,29 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
 
     def _create_tab_from_widget_item(self, widget_item: WidgetItem) -> TabWidget:
         query_parameters = QueryParameters.create_from_widget_item(widget_item)
-        tab_widget = TabWidget.create_tab_widget(self, query_parameters)
+        tab_class = TAB_CLASSES[self.config.grid_engine]
+        tab_widget = tab_class.create_tab_widget(self, query_parameters)
         tab_widget.name = widget_item.name
         tab_widget.signals.my_objects_modified.connect(  # type: ignore
             self.update_status_bar
         )
+        tab_widget.query_runner.signals.stale_changed.connect(  # type: ignore
+            self._handle_stale_changed
+        )
         return tab_widget
 
+    def _handle_stale_changed(self, unused_is_stale: bool) -> None:
+        self.update_status_bar()
+
     def _add_tag_tree_widget(self) -> None:
-        self.tag_tree_widget = TagTreeWidget.create_tag_tree_widget(self)
+        tag_tree_class = TAG_TREE_CLASSES[self.config.tag_tree_engine]
+        self.tag_tree_widget = tag_tree_class.create_tag_tree_widget(self)
         self.tree_and_grid_container.layout().insertWidget(0, self.tag_tree_widget)
 
     def resizeEvent(self, event: QtGui.QResizeEvent) -> None:
-        self.tabs_widget.currentWidget().redraw()
+        # The redraw is only scheduled, so that a drag-resize of the window leads to
+        # at most one redraw per frame.
+        self.tabs_widget.currentWidget().schedule_redraw()
         super().resizeEvent(event)
 
     def _clear_status_bar(self) -> None:
@@ -171,11 +214,50 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         self._key_pressed.append(event.key())
         if event.key() == KEYS["F5"]:
             self._refresh_current_tab()
+            self.tag_tree_widget.refresh_counts()
         if all(key in self._key_pressed for key in [KEYS["CTRL"], KEYS["S"]]):
             print("saving")
         if all(key in self._key_pressed for key in [KEYS["CTRL"], KEYS["A"]]):
             self.tabs_widget.currentWidget().select_all()
 
+    def refresh_tabs_among(
+        self, my_objects_ids: Iterable[types.MyObjectId], write_generation: int
+    ) -> None:
+        """
+        Updates the results of all tabs after a write on the given my_objects only,
+        and redraws the current tab.
+
+        Only those my_objects are evaluated again by each tab, instead of its whole
+        query parameters. The tabs whose results were already out of date before the
+        write are left as they are, and refreshed as a whole when displayed.
+
+        Parameters
+        ----------
+        my_objects_ids
+        write_generation
+            The write generation of the result cache right before the write.
+
+        """
+        my_objects_ids = list(my_objects_ids)
+        current_tab = self.tabs_widget.currentWidget()
+        is_current_tab_refreshed = False
+        for tab_index in range(self.tabs_widget.count()):
+            tab_widget = self.tabs_widget.widget(tab_index)
+            # The results of a tab waiting for its refresh are the previous ones.
+            is_refreshed = (
+                not tab_widget.query_runner.is_stale
+                and tab_widget.query_parameters.refresh_my_objects_among(
+                    my_objects_ids, write_generation
+                )
+            )
+            if tab_widget is current_tab:
+                is_current_tab_refreshed = is_refreshed
+        if is_current_tab_refreshed:
+            current_tab.redraw()
+        else:
+            current_tab.refresh()
+        self.update_status_bar()
+
     def _refresh_current_tab(self) -> None:
         current_tab: TabWidget = self.tabs_widget.currentWidget()
         current_tab.refresh()
@@ -190,7 +272,7 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         """Saves the current view in the database."""
         view = self._create_view()
         view.save()
-        self.tag_tree_widget.redraw_tree()
+        self.tag_tree_widget.insert_widget_item_view(view)
 
     def _create_view(self) -> View:
         current_tab = self.tabs_widget.currentWidget()
@@ -200,7 +282,10 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         return view
 
     def update_status_bar(self) -> None:
-        """Displays the current query and the number of objects in the status bar."""
+        """
+        Displays the current query and the number of objects in the status bar, along
+        with the statistics of the thumbnail cache.
+        """
         has_main_window_status_bar = self._has_main_window_status_bar()
         if has_main_window_status_bar:
             self._update_status_bar()
@@ -223,6 +308,9 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         message = self._get_status_bar_message()
         widget = QtWidgets.QPushButton(message, status_bar)
         status_bar.addWidget(widget)
+        thumbnail_cache_message = self._get_thumbnail_cache_message()
+        thumbnail_cache_widget = QtWidgets.QLabel(thumbnail_cache_message, status_bar)
+        status_bar.addPermanentWidget(thumbnail_cache_widget)
 
     def _has_main_window_status_bar(self) -> bool:
         return hasattr(self.get_main_window(), "status_bar")
@@ -231,8 +319,16 @@ class MainWidget(QtWidgets.QWidget, MyCustomGalleryWidget):
         current_tab = self.tabs_widget.currentWidget()
         query_parameters = current_tab.query_parameters
         query_as_string = str(query_parameters)
-        results = len(query_parameters.my_objects)
-        return f"{query_as_string} : {results}"
+        results = len(query_parameters.snapshot)
+        message = f"{query_as_string} : {results}"
+        if current_tab.query_runner.is_stale:
+            message += " (refreshing...)"
+        return message
+
+    def _get_thumbnail_cache_message(self) -> str:
+        thumbnail_cache = get_thumbnail_cache(self.config.thumbnail_cache_bytes)
+        message = f"Thumbnails : {thumbnail_cache.get_statistics()}"
+        return message
 
     def modify_cell_zoom(self, cell_dimension: CellDimension) -> None:
         """
@@ -49,22 +49,13 @@ class TagMenu(QtWidgets.QMenu):  # pylint: disable=too-few-public-methods
     def _create_widget_item(self, tag_type: str) -> None:
         new_tag = self._create_tag(tag_type)
         new_tag.save()
-        self._redraw_tag_tree()
-        self._start_rename_new_widget_item(new_tag)
-
-    def _redraw_tag_tree(self) -> None:
+        new_widget_item = self.parent().insert_widget_item_tag(new_tag)
         self._expand_widget_item()
-        self.parent().redraw_tree()
-
-    def _start_rename_new_widget_item(self, new_tag: tag.Tag) -> None:
-        new_widget_item = self.parent().widget_items[str(new_tag.id)]
         self.parent().start_rename_tag(new_widget_item)
 
     def _expand_widget_item(self) -> None:
         if self._widget_item is not None:
-            widget_items_expanded = self.parent().widget_items_expanded
-            widget_item_id = self._widget_item.widget_item_id
-            widget_items_expanded.add(widget_item_id)
+            self._widget_item.setExpanded(True)
 
     def _create_tag(self, tag_type: str) -> tag.Tag:
         widget_item_tag = self._get_widget_item_tag()
@@ -82,4 +73,4 @@ class TagMenu(QtWidgets.QMenu):  # pylint: disable=too-few-public-methods
     def _delete_widget_item(self) -> None:
         if self._widget_item is not None:
             self._widget_item.my_delete()
-            self.parent().redraw_tree()
+            self.parent().remove_widget_item(self._widget_item)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The ScrollPrefetcher class.
+
+While scrolling, the cells about to enter the viewport are prepared in advance : their
+my_objects are fetched from the database and their thumbnails decoded. The number of
+rows prepared grows with the scroll velocity, and only the rows in the direction of
+travel are prepared.
+
+"""
+
+from __future__ import annotations
+
+import math
+import time
+
+from gallery.config_gallery.config_gallery import ConfigGallery
+
+SCROLL_PAUSE_SECONDS: float = 0.3
+"""Above this delay between two scroll events, the velocity is measured anew."""
+
+VELOCITY_SMOOTHING: float = 0.5
+"""The weight of the last measure in the velocity, between 0 and 1."""
+
+
+class ScrollPrefetcher:
+
+    """
+    Tracks the scroll velocity and direction, and gives the cells to prefetch.
+
+    The prefetcher doesn't depend on Qt, and is fed with the values of the vertical
+    scroll bar.
+
+    Parameters
+    ----------
+    config
+
+    Attributes
+    ----------
+    velocity
+        The scroll velocity, in pixels per second, positive when scrolling down.
+
+    Methods
+    -------
+    update
+    reset
+    get_prefetch_range
+
+    """
+
+    def __init__(self, config: ConfigGallery) -> None:
+        self.config: ConfigGallery = config
+        self.velocity: float = 0.0
+        self._is_scrolling_down: bool = True
+        self._last_value: int = 0
+        self._last_time: float = 0.0
+
+    def update(self, scroll_value: int) -> None:
+        """
+        Updates the velocity with a new position of the scroll bar.
+
+        Parameters
+        ----------
+        scroll_value
+
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        distance = scroll_value - self._last_value
+        if distance:
+            self._is_scrolling_down = distance > 0
+        if elapsed > SCROLL_PAUSE_SECONDS:
+            self.velocity = 0.0
+        elif elapsed > 0:
+            instant_velocity = distance / elapsed
+            self.velocity = (
+                VELOCITY_SMOOTHING * instant_velocity
+                + (1 - VELOCITY_SMOOTHING) * self.velocity
+            )
+        self._last_value = scroll_value
+        self._last_time = now
+
+    def reset(self) -> None:
+        """Forgets the velocity, for instance when the grid is redrawn from scratch."""
+        self.velocity = 0.0
+        self._is_scrolling_down = True
+
+    def get_prefetch_range(
+        self, cell_range: range, columns: int, cells_qty: int
+    ) -> range:
+        """
+        The indexes of the cells to prefetch, next to the ones displayed in the
+        direction of travel.
+
+        Parameters
+        ----------
+        cell_range
+            The indexes of the cells displayed.
+        columns
+            The number of cells in a row.
+        cells_qty
+            The total number of cells.
+
+        """
+        cells_ahead = self._get_rows_ahead() * max(columns, 1)
+        if self._is_scrolling_down:
+            prefetch_range = range(
+                cell_range.stop, min(cell_range.stop + cells_ahead, cells_qty)
+            )
+        else:
+            prefetch_range = range(max(cell_range.start - cells_ahead, 0), cell_range.start)
+        return prefetch_range
+
+    def _get_rows_ahead(self) -> int:
+        distance_ahead = abs(self.velocity) * self.config.prefetch_lookahead_seconds
+        rows_ahead = math.ceil(distance_ahead / self.config.cell_height)
+        rows_ahead = max(rows_ahead, self.config.prefetch_rows_min)
+        rows_ahead = min(rows_ahead, self.config.prefetch_rows_max)
+        return rows_ahead
@@ -7,15 +7,104 @@ Defines :
 
  The QueryParameters class, representing a sequence of QueryParameter.
 
+ The ResultSnapshot class, an immutable view of the result of a QueryParameters.
+
+A sequence of parameters is evaluated by compiling it into a single SQL statement
+(UNION / EXCEPT / INTERSECT of the widget items' queries) whenever all its widget items
+define a select_my_objects_ids method. Otherwise, it falls back to applying the set
+operations in Python, one parameter at a time.
+
+The results of the widget items and of the whole sequences are cached in the
+ResultCache of the GalleryModels, until the next write. The result of a sequence
+depends on the results of its widget items, and is invalidated with any of them.
+
 """
 
 from __future__ import annotations
 
-from functools import partial
-from typing import List, Type, Dict, Callable, Tuple
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from functools import cached_property, partial
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Type,
+    Dict,
+    Callable,
+    Tuple,
+    Optional,
+    FrozenSet,
+    Hashable,
+    Iterable,
+)
+
+import peewee
 
 import gallery.types as types
-import gallery.widgets.tag_tree as tag_tree
+from gallery.models.result_cache import get_query_key, get_widget_item_key
+
+if TYPE_CHECKING:
+    # Only used in the annotations.
+    import gallery.widgets.tag_tree as tag_tree
+
+
+# Compared and hashed by identity, the array of ids being neither hashable nor worth
+# comparing element by element.
+@dataclass(frozen=True, eq=False)
+class ResultSnapshot:
+
+    """
+    A snapshot of the result of a QueryParameters, which is never modified.
+
+    A new snapshot is created each time the results are refreshed, with an incremented
+    version. The ids are sorted once and for all, so that any index lookup or length
+    is O(1), and the snapshot can be shared between the grid and the layout code.
+
+    The attributes can't be reassigned, but the array of ids itself is mutable : it
+    is shared with the result cache, and must not be modified.
+
+    Attributes
+    ----------
+    version
+    my_objects_ids
+
+    Properties
+    ----------
+    positions
+
+    """
+
+    version: int = 0
+    my_objects_ids: types.MyObjectIdArray = field(default_factory=lambda: array("q"))
+
+    def __len__(self) -> int:
+        return len(self.my_objects_ids)
+
+    def __getitem__(self, index: int) -> int:
+        return self.my_objects_ids[index]
+
+    def __iter__(self):
+        return iter(self.my_objects_ids)
+
+    def __contains__(self, my_object_id: object) -> bool:
+        return my_object_id in self.positions
+
+    def get_slice(self, start: int, stop: int) -> types.MyObjectIdArray:
+        """The ids of the my_objects between indexes start and stop (excluded)."""
+        return self.my_objects_ids[start:stop]
+
+    # The dictionary is only built the first time it is needed, and written directly
+    # into the instance __dict__ by cached_property, which is compatible with a frozen
+    # dataclass.
+    @cached_property
+    def positions(self) -> Dict[int, int]:
+        """A dictionary mapping each my_object id to its index in the snapshot."""
+        positions = {
+            my_object_id: index
+            for index, my_object_id in enumerate(self.my_objects_ids)
+        }
+        return positions
 
 
 class QueryParameter:
@@ -37,21 +126,109 @@ class QueryParameter:
         widget_item_id = self._widget_item.widget_item_id
         return widget_item_id
 
+    def get_result_dependencies(self) -> List[Hashable]:
+        """
+        The keys of the results on which the result of the widget item depends, its
+        own included.
+        """
+        dependencies = [get_widget_item_key(self.widget_item_id)]
+        dependencies += self._get_widget_item_result_dependencies()
+        return dependencies
+
     @property
     def _widget_item_name(self) -> str:
         widget_item = self._widget_item
         widget_item_name = widget_item.name
         return widget_item_name
 
-    def _get_widget_item_objects(self) -> types.MyObjectSet:
+    def _get_widget_item_objects_ids(
+        self, among: Optional[types.MyObjectIdSet] = None
+    ) -> types.MyObjectIdSet:
+        if among is None:
+            widget_item_objects_ids = self._get_all_widget_item_objects_ids()
+        else:
+            widget_item_objects_ids = self._get_widget_item_objects_ids_among(among)
+        return widget_item_objects_ids
+
+    def _get_widget_item_objects_ids_among(
+        self, among: types.MyObjectIdSet
+    ) -> types.MyObjectIdSet:
         widget_item = self._widget_item
-        widget_item_objects = widget_item.get_my_objects()
-        return widget_item_objects
+        if hasattr(widget_item, "get_my_objects_ids_among"):
+            widget_item_objects_ids = widget_item.get_my_objects_ids_among(among)
+        else:
+            widget_item_objects_ids = self._get_all_widget_item_objects_ids() & among
+        return widget_item_objects_ids
+
+    def _get_all_widget_item_objects_ids(self) -> types.MyObjectIdSet:
+        result_cache = self._widget_item.models.result_cache
+        widget_item_objects_ids = result_cache.get_or_compute(
+            get_widget_item_key(self.widget_item_id),
+            self._compute_widget_item_objects_ids,
+            self._get_widget_item_result_dependencies(),
+        )
+        return widget_item_objects_ids
+
+    def _get_widget_item_result_dependencies(self) -> List[Hashable]:
+        widget_item = self._widget_item
+        if hasattr(widget_item, "get_result_dependencies"):
+            dependencies = widget_item.get_result_dependencies()
+        else:
+            dependencies = []
+        return dependencies
+
+    def _compute_widget_item_objects_ids(self) -> FrozenSet[int]:
+        widget_item = self._widget_item
+        if hasattr(widget_item, "get_my_objects_ids"):
+            widget_item_objects_ids = widget_item.get_my_objects_ids()
+        else:
+            widget_item_objects = widget_item.get_my_objects()
+            widget_item_objects_ids = {my_object.id for my_object in widget_item_objects}
+        return frozenset(widget_item_objects_ids)
+
+    def _select_widget_item_objects_ids(self) -> Optional[peewee.Select]:
+        widget_item = self._widget_item
+        if hasattr(widget_item, "select_my_objects_ids"):
+            widget_item_objects_ids = widget_item.select_my_objects_ids()
+        else:
+            widget_item_objects_ids = None
+        return widget_item_objects_ids
+
+    def _combine_queries(
+        self, query: Optional[peewee.Select], set_operation_name: str
+    ) -> Optional[peewee.Select]:
+        widget_item_objects_ids = self._select_widget_item_objects_ids()
+        if query is None or widget_item_objects_ids is None:
+            combined_query = None
+        else:
+            set_operation = getattr(query, set_operation_name)
+            combined_query = set_operation(widget_item_objects_ids)
+        return combined_query
+
+    def get_modified_ids(
+        self,
+        unused_my_objects_ids: types.MyObjectIdSet,
+        unused_among: Optional[types.MyObjectIdSet] = None,
+    ) -> types.MyObjectIdSet:
+        """
+        Must be implemented in derived classes.
+
+        If among is given, only the my_objects with those ids are taken into account,
+        which allows to evaluate a sequence of parameters for a few my_objects only.
 
-    def get_modified_objects(
-        self, unused_my_objects: types.MyObjectSet
-    ) -> types.MyObjectSet:
-        """Must be implemented in derived classes."""
+        """
+        raise NotImplementedError
+
+    def get_modified_query(
+        self, unused_query: Optional[peewee.Select]
+    ) -> Optional[peewee.Select]:
+        """
+        Must be implemented in derived classes.
+
+        The SQL counterpart of get_modified_ids, working on queries returning
+        my_objects ids. Returns None if the parameter can't be compiled into SQL.
+
+        """
         raise NotImplementedError
 
 
@@ -67,12 +244,21 @@ class QueryParameterBase(QueryParameter):
     def __str__(self) -> str:
         return self._widget_item_name
 
-    def get_modified_objects(
-        self, unused_my_objects: types.MyObjectSet
-    ) -> types.MyObjectSet:
-        """Gets the complete list of my_objects associated with its widget_item."""
-        new_objects = self._get_widget_item_objects()
-        return new_objects
+    def get_modified_ids(
+        self,
+        unused_my_objects_ids: types.MyObjectIdSet,
+        among: Optional[types.MyObjectIdSet] = None,
+    ) -> types.MyObjectIdSet:
+        """Gets the ids of all the my_objects associated with its widget_item."""
+        new_objects_ids = self._get_widget_item_objects_ids(among)
+        return new_objects_ids
+
+    def get_modified_query(
+        self, unused_query: Optional[peewee.Select]
+    ) -> Optional[peewee.Select]:
+        """Gets the query returning the ids of the my_objects of its widget_item."""
+        new_query = self._select_widget_item_objects_ids()
+        return new_query
 
 
 class QueryParameterAdd(QueryParameter):
@@ -81,12 +267,23 @@ class QueryParameterAdd(QueryParameter):
     def __str__(self) -> str:
         return f" + {self._widget_item_name}"
 
-    def get_modified_objects(self, my_objects: types.MyObjectSet) -> types.MyObjectSet:
-        """Gets the existing list of my_objects plus the ones associated with its
+    def get_modified_ids(
+        self,
+        my_objects_ids: types.MyObjectIdSet,
+        among: Optional[types.MyObjectIdSet] = None,
+    ) -> types.MyObjectIdSet:
+        """Gets the existing my_objects ids plus the ones associated with its
          widget_item."""
-        new_objects = self._get_widget_item_objects()
-        my_objects = my_objects.union(new_objects)
-        return my_objects
+        new_objects_ids = self._get_widget_item_objects_ids(among)
+        my_objects_ids = my_objects_ids.union(new_objects_ids)
+        return my_objects_ids
+
+    def get_modified_query(
+        self, query: Optional[peewee.Select]
+    ) -> Optional[peewee.Select]:
+        """The existing query UNION the one associated with its widget_item."""
+        new_query = self._combine_queries(query, "union")
+        return new_query
 
 
 class QueryParameterRemove(QueryParameter):
@@ -97,12 +294,23 @@ class QueryParameterRemove(QueryParameter):
     def __str__(self) -> str:
         return f" - {self._widget_item_name}"
 
-    def get_modified_objects(self, my_objects: types.MyObjectSet) -> types.MyObjectSet:
-        """Gets the existing list of my_objects minus the ones associated with its
+    def get_modified_ids(
+        self,
+        my_objects_ids: types.MyObjectIdSet,
+        among: Optional[types.MyObjectIdSet] = None,
+    ) -> types.MyObjectIdSet:
+        """Gets the existing my_objects ids minus the ones associated with its
          widget_item."""
-        new_objects = self._get_widget_item_objects()
-        my_objects = my_objects.difference(new_objects)
-        return my_objects
+        new_objects_ids = self._get_widget_item_objects_ids(among)
+        my_objects_ids = my_objects_ids.difference(new_objects_ids)
+        return my_objects_ids
+
+    def get_modified_query(
+        self, query: Optional[peewee.Select]
+    ) -> Optional[peewee.Select]:
+        """The existing query EXCEPT the one associated with its widget_item."""
+        new_query = self._combine_queries(query, "except_")
+        return new_query
 
 
 class QueryParameterFilter(QueryParameter):
@@ -113,22 +321,41 @@ class QueryParameterFilter(QueryParameter):
     def __str__(self) -> str:
         return f" ∩ {self._widget_item_name}"
 
-    def get_modified_objects(self, my_objects: types.MyObjectSet) -> types.MyObjectSet:
-        """Gets the my_objects present both in the existing collection and in the
+    def get_modified_ids(
+        self,
+        my_objects_ids: types.MyObjectIdSet,
+        among: Optional[types.MyObjectIdSet] = None,
+    ) -> types.MyObjectIdSet:
+        """Gets the my_objects ids present both in the existing collection and in the
         set associated with its widget item"""
-        new_objects = self._get_widget_item_objects()
-        my_objects = my_objects.intersection(new_objects)
-        return my_objects
+        new_objects_ids = self._get_widget_item_objects_ids(among)
+        my_objects_ids = my_objects_ids.intersection(new_objects_ids)
+        return my_objects_ids
+
+    def get_modified_query(
+        self, query: Optional[peewee.Select]
+    ) -> Optional[peewee.Select]:
+        """The existing query INTERSECT the one associated with its widget_item."""
+        new_query = self._combine_queries(query, "intersect")
+        return new_query
 
 
 class QueryParameters:
     """
     A collection of QueryParameter.
 
+    The result of the sequence is stored in snapshot, as a sorted array of integer
+    ids. The my_objects themselves are only fetched when needed, through
+    GalleryModels.get_my_objects_by_ids.
+
     Parameters
     ----------
     tag_tree_widget
 
+    Instance Attributes
+    -------------------
+    snapshot
+
     """
 
     class_to_method_dict: Dict[Type[QueryParameter], str] = {
@@ -142,7 +369,10 @@ class QueryParameters:
         self._parameters: List[QueryParameter] = []
         self._tag_tree_widget: tag_tree.TagTreeWidget = tag_tree_widget
         self._has_changed: bool = False
-        self.my_objects: types.MyObjectSet = set()
+        self.snapshot: ResultSnapshot = ResultSnapshot()
+        self._snapshot_write_generation: Optional[int] = None
+        """The write generation for which the snapshot is the result of the
+        parameters, None if it isn't known to be."""
         self._add_handle_parameter_methods()
 
     def _add_handle_parameter_methods(self):
@@ -187,6 +417,7 @@ class QueryParameters:
             widget_item = widget_items[widget_item_id]
             new_parameter = parameter_type(widget_item)
             query_parameters._parameters.append(new_parameter)
+            query_parameters._snapshot_write_generation = None
 
         return _handle_parameter
 
@@ -199,19 +430,197 @@ class QueryParameters:
         method_bound_to_self = partial(handle_parameter, self)
         setattr(self, method_name, method_bound_to_self)
 
-    def get_my_objects(self) -> types.MyObjectSet:
-        """The result of the sequence of parameters."""
-        my_objects: types.MyObjectSet = set()
+    def get_my_objects_ids(self) -> types.MyObjectIdArray:
+        """
+        The result of the sequence of parameters, as a sorted array of ids.
+
+        The result is cached until the next write, and must not be modified.
+
+        """
+        result_cache = self._tag_tree_widget.models.result_cache
+        my_objects_ids = result_cache.get_or_compute(
+            self.get_result_key(),
+            self._compute_my_objects_ids,
+            self.get_result_dependencies(),
+        )
+        return my_objects_ids
+
+    def get_cached_my_objects_ids(self) -> Optional[types.MyObjectIdArray]:
+        """The result of the sequence of parameters if it is cached, None otherwise."""
+        result_cache = self._tag_tree_widget.models.result_cache
+        my_objects_ids = result_cache.get(self.get_result_key())
+        return my_objects_ids  # type: ignore
+
+    def get_result_key(self) -> Hashable:
+        """The key of the result of the sequence of parameters in the result cache."""
+        result_key = get_query_key(self.get_query_string())
+        return result_key
+
+    def get_result_dependencies(self) -> List[Hashable]:
+        """
+        The keys of the results of the widget items of the parameters, and of the
+        results they depend on themselves.
+        """
+        dependencies = [
+            dependency
+            for parameter in self._parameters
+            for dependency in parameter.get_result_dependencies()
+        ]
+        return dependencies
+
+    def get_write_generation(self) -> int:
+        """The write generation of the result cache, changing after each write."""
+        return self._tag_tree_widget.models.result_cache.write_generation
+
+    def _compute_my_objects_ids(self) -> types.MyObjectIdArray:
+        query = self.select_my_objects_ids_sorted()
+        if query is None:
+            my_objects_ids = self._get_my_objects_ids_in_python()
+        else:
+            my_objects_ids = array("q", (row[0] for row in query.tuples()))
+        return my_objects_ids
+
+    def select_my_objects_ids_sorted(self) -> Optional[peewee.Select]:
+        """
+        A query returning the sorted ids of the result of the sequence of parameters,
+        or None if it can't be compiled into SQL.
+
+        The query can be run on any connection to the database, for instance on a
+        worker thread.
+
+        """
+        compiled_query = self.compile_query()
+        if compiled_query is None:
+            query = None
+        else:
+            MyObject = self._tag_tree_widget.models.MyObject
+            query = (
+                MyObject.select(MyObject.id)
+                .where(MyObject.id.in_(compiled_query))
+                .order_by(MyObject.id)
+            )
+        return query
+
+    def compile_query(self) -> Optional[peewee.Select]:
+        """
+        The sequence of parameters compiled into a single query returning the ids of
+        the resulting my_objects.
+
+        Returns None if the sequence is empty or if one of its widget items can't be
+        compiled into SQL.
+
+        """
+        query = None
+        for parameter in self._parameters:
+            query = parameter.get_modified_query(query)
+            if query is None:
+                break
+        return query
+
+    def _get_my_objects_ids_in_python(self) -> types.MyObjectIdArray:
+        my_objects_ids: types.MyObjectIdSet = set()
         for parameter in self._parameters:
-            my_objects = parameter.get_modified_objects(my_objects)
-        return my_objects
+            my_objects_ids = parameter.get_modified_ids(my_objects_ids)
+        my_objects_ids_sorted = array("q", sorted(my_objects_ids))
+        return my_objects_ids_sorted
+
+    def get_my_objects_ids_among(
+        self, among: types.MyObjectIdSet
+    ) -> types.MyObjectIdSet:
+        """
+        The ids of the result of the sequence of parameters, among the given ids only.
+
+        Each widget item only has to check the given ids, which is much faster than
+        evaluating the whole sequence when only a few my_objects have been modified.
+
+        """
+        my_objects_ids: types.MyObjectIdSet = set()
+        for parameter in self._parameters:
+            my_objects_ids = parameter.get_modified_ids(my_objects_ids, among)
+        return my_objects_ids
 
     def refresh_my_objects(self) -> None:
         """Refreshes the results and check if it has been modified."""
-        my_objects_new = self.get_my_objects()
-        my_objects_old = self.my_objects
-        self.my_objects = my_objects_new
-        self._has_changed = my_objects_new != my_objects_old
+        my_objects_ids_new = self.get_my_objects_ids()
+        my_objects_ids_old = self.snapshot.my_objects_ids
+        self._set_snapshot(my_objects_ids_new, my_objects_ids_new != my_objects_ids_old)
+        self._snapshot_write_generation = self.get_write_generation()
+
+    def set_my_objects_ids(self, my_objects_ids: types.MyObjectIdArray) -> None:
+        """
+        Sets the results computed elsewhere for the current write generation, for
+        instance on a worker thread, and caches them.
+
+        Parameters
+        ----------
+        my_objects_ids
+            The sorted ids of the result of the sequence of parameters.
+
+        """
+        result_cache = self._tag_tree_widget.models.result_cache
+        result_cache.put(
+            self.get_result_key(), my_objects_ids, self.get_result_dependencies()
+        )
+        my_objects_ids_old = self.snapshot.my_objects_ids
+        self._set_snapshot(my_objects_ids, my_objects_ids != my_objects_ids_old)
+        self._snapshot_write_generation = self.get_write_generation()
+
+    def refresh_my_objects_among(
+        self, my_objects_ids: Iterable[int], write_generation: int
+    ) -> bool:
+        """
+        Refreshes the results for the given my_objects only, the other ones being
+        known as unmodified, and returns whether the results could be refreshed.
+
+        This is used after a write on a few my_objects (for instance a drop on a
+        tag), so that only those are evaluated again, and spliced into the sorted
+        result. The new result is also put back into the result cache.
+
+        The results can only be refreshed if the snapshot was up to date right before
+        the write. Otherwise, nothing is modified, and the results must be refreshed
+        as a whole.
+
+        Parameters
+        ----------
+        my_objects_ids
+        write_generation
+            The write generation of the result cache right before the write.
+
+        """
+        if self._snapshot_write_generation != write_generation:
+            return False
+        among = set(my_objects_ids)
+        my_objects_ids_in_result = self.get_my_objects_ids_among(among)
+        my_objects_ids_old = self.snapshot.my_objects_ids
+        ids_removed, ids_added = [], []
+        for my_object_id in among:
+            was_in_result = _contains_sorted(my_objects_ids_old, my_object_id)
+            is_in_result = my_object_id in my_objects_ids_in_result
+            if was_in_result and not is_in_result:
+                ids_removed.append(my_object_id)
+            elif is_in_result and not was_in_result:
+                ids_added.append(my_object_id)
+        if ids_removed or ids_added:
+            my_objects_ids_new = _splice_sorted(
+                my_objects_ids_old, ids_removed, ids_added
+            )
+            self._set_snapshot(my_objects_ids_new, True)
+        result_cache = self._tag_tree_widget.models.result_cache
+        result_cache.put(
+            self.get_result_key(),
+            self.snapshot.my_objects_ids,
+            self.get_result_dependencies(),
+        )
+        self._snapshot_write_generation = self.get_write_generation()
+        return True
+
+    def _set_snapshot(
+        self, my_objects_ids: types.MyObjectIdArray, has_changed: bool
+    ) -> None:
+        # The modification is kept until the next reset, even if the results are
+        # refreshed again in the meantime.
+        self.snapshot = ResultSnapshot(self.snapshot.version + 1, my_objects_ids)
+        self._has_changed = self._has_changed or has_changed
 
     @property
     def has_changed(self) -> bool:
@@ -281,7 +690,8 @@ class QueryParameters:
         original view parameters (instead of simply having a QueryParameterBase for
         that view).
         """
-        if isinstance(widget_item, tag_tree.WidgetItemView):
+        # The items of a TagTreeView are adapters, not WidgetItemView.
+        if hasattr(widget_item, "view"):
             query_parameters = QueryParameters._create_from_widget_item_view(
                 widget_item
             )
@@ -314,3 +724,37 @@ class QueryParameters:
             query_string, tag_tree_widget
         )
         return query_parameters
+
+
+def _contains_sorted(my_objects_ids: types.MyObjectIdArray, my_object_id: int) -> bool:
+    index = bisect_left(my_objects_ids, my_object_id)
+    return index < len(my_objects_ids) and my_objects_ids[index] == my_object_id
+
+
+def _splice_sorted(
+    my_objects_ids: types.MyObjectIdArray,
+    ids_removed: Iterable[int],
+    ids_added: Iterable[int],
+) -> types.MyObjectIdArray:
+    # The unmodified runs between two modifications are copied as whole slices, so
+    # that the cost mostly depends on the number of modifications.
+    modifications = [
+        (bisect_left(my_objects_ids, my_object_id), my_object_id, False)
+        for my_object_id in ids_removed
+    ]
+    modifications += [
+        (bisect_left(my_objects_ids, my_object_id), my_object_id, True)
+        for my_object_id in ids_added
+    ]
+    modifications.sort()
+    my_objects_ids_new = array("q")
+    start = 0
+    for index, my_object_id, is_added in modifications:
+        my_objects_ids_new.extend(my_objects_ids[start:index])
+        if is_added:
+            my_objects_ids_new.append(my_object_id)
+            start = index
+        else:
+            start = index + 1
+    my_objects_ids_new.extend(my_objects_ids[start:])
+    return my_objects_ids_new
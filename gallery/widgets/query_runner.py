@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The QueryRunner class, refreshing the results of a QueryParameters off the GUI
+ thread, and its associated QueryRunnerSignals.
+
+ The QueryJob class, running a single query on a worker thread.
+
+ The mark_stale function, dimming a tab while its results are stale.
+
+When the results of a tab are not cached and its query parameters can be compiled into
+SQL, the query is run on the global QThreadPool, on a read-only connection to the
+database, and the results are sent back to the GUI thread through a signal. In the
+meantime, the tab keeps its previous results, marked as stale.
+
+A new refresh supersedes the pending one : the pending job is taken back from the pool
+if it hasn't started yet, or interrupted and ignored otherwise. Results computed while
+the database was written to are ignored as well, and computed again.
+
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from array import array
+from typing import Optional
+
+import peewee
+from PySide6 import QtCore, QtWidgets
+
+import gallery.types as types
+from gallery.models.connections import ConnectionManager
+from gallery.widgets.query import QueryParameters
+from gallery.widgets.worker_runner import WorkerJob, WorkerJobSignals, WorkerRunner
+
+PRIORITY_QUERY: int = 2
+"""The thread pool priority of the queries, above the thumbnails' ones."""
+
+STALE_OPACITY: float = 0.5
+"""The opacity of the grid of a tab while its results are stale."""
+
+
+class QueryRunner(WorkerRunner):
+
+    """
+    Refreshes the results of query parameters asynchronously when possible. Cancelling
+    the pending refresh leaves the results stale.
+
+    Parameters
+    ----------
+    parent
+    connections
+
+    Attributes
+    ----------
+    signals
+    is_stale
+        Whether a refresh is pending, the results shown being the previous ones.
+
+    Methods
+    -------
+    refresh
+    cancel
+
+    """
+
+    def __init__(self, parent: QtCore.QObject, connections: ConnectionManager) -> None:
+        super().__init__(parent)
+        self.signals: QueryRunnerSignals = QueryRunnerSignals()
+        self.is_stale: bool = False
+        self._connections: ConnectionManager = connections
+        self._query_parameters: Optional[QueryParameters] = None
+
+    def refresh(self, query_parameters: QueryParameters) -> None:
+        """
+        Refreshes the results of the query parameters, cancelling the pending refresh.
+
+        Cached results, and query parameters that can't be compiled into SQL, are
+        refreshed right away. Otherwise, the query is run on a worker thread, and
+        signals.refreshed is emitted once the results are set.
+
+        Parameters
+        ----------
+        query_parameters
+
+        """
+        self.cancel()
+        query = None
+        if query_parameters.get_cached_my_objects_ids() is None:
+            query = query_parameters.select_my_objects_ids_sorted()
+        if query is None or self._connections.read_database is None:
+            self._refresh_now(query_parameters)
+        else:
+            write_generation = query_parameters.get_write_generation()
+            job = QueryJob(
+                query, write_generation, self._connections, self._jobs_signals
+            )
+            self._query_parameters = query_parameters
+            self._start_job(job, PRIORITY_QUERY)
+            self._set_stale(True)
+
+    def _refresh_now(self, query_parameters: QueryParameters) -> None:
+        query_parameters.refresh_my_objects()
+        self._set_stale(False)
+        self.signals.refreshed.emit()  # type: ignore
+
+    def _handle_result(
+        self, job: WorkerJob, result: Optional[types.MyObjectIdArray]
+    ) -> None:
+        query_parameters = self._query_parameters
+        assert query_parameters is not None
+        # The results of a query run while the database was written to may miss the
+        # last modifications.
+        if result is None:
+            # The query failed on the read-only connection.
+            self._refresh_now(query_parameters)
+        elif job.write_generation != query_parameters.get_write_generation():
+            self.refresh(query_parameters)
+        else:
+            query_parameters.set_my_objects_ids(result)
+            self._set_stale(False)
+            self.signals.refreshed.emit()  # type: ignore
+
+    def _set_stale(self, is_stale: bool) -> None:
+        if is_stale != self.is_stale:
+            self.is_stale = is_stale
+            self.signals.stale_changed.emit(is_stale)  # type: ignore
+
+
+class QueryJob(WorkerJob):
+
+    """
+    Runs the query returning the sorted ids of a QueryParameters, on the read-only
+    connection of the worker thread.
+
+    Parameters
+    ----------
+    query
+    write_generation
+        The write generation of the result cache when the job was created.
+    connections
+    signals
+
+    Methods
+    -------
+    cancel
+
+    """
+
+    def __init__(
+        self,
+        query: peewee.Select,
+        write_generation: int,
+        connections: ConnectionManager,
+        signals: WorkerJobSignals,
+    ) -> None:
+        super().__init__(write_generation, signals)
+        self._query: peewee.Select = query
+        self._connections: ConnectionManager = connections
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def _compute(self) -> Optional[types.MyObjectIdArray]:
+        read_database = self._connections.read_database
+        assert read_database is not None
+        try:
+            with self._lock:
+                self._connection = read_database.connection()
+            rows = self._connections.execute_read(self._query)
+        except peewee.OperationalError:
+            # Interrupted by a cancellation, or the database can't be read from
+            # this connection.
+            my_objects_ids = None
+        else:
+            my_objects_ids = array("q", (row[0] for row in rows))
+        finally:
+            with self._lock:
+                self._connection = None
+        return my_objects_ids
+
+    def cancel(self) -> None:
+        """Interrupts the query if it is running, and discards its results."""
+        with self._lock:
+            self.is_cancelled = True
+            if self._connection is not None:
+                self._connection.interrupt()
+
+
+class QueryRunnerSignals(QtCore.QObject):  # pylint: disable=too-few-public-methods
+
+    """
+    Collection of signals used by the QueryRunner.
+
+    Class Attributes
+    ----------------
+    refreshed
+    stale_changed
+
+    """
+
+    refreshed: QtCore.Signal = QtCore.Signal()
+    """A signal emitted when the results of the query parameters have been refreshed."""
+
+    stale_changed: QtCore.Signal = QtCore.Signal(bool)
+    """A signal emitted when the results become stale, or up to date again."""
+
+
+def mark_stale(widget: QtWidgets.QWidget, is_stale: bool) -> None:
+    """
+    Dims the widget while its results are stale, and restores it once they are up to
+    date.
+
+    Parameters
+    ----------
+    widget
+    is_stale
+
+    """
+    if is_stale:
+        effect = QtWidgets.QGraphicsOpacityEffect(widget)
+        effect.setOpacity(STALE_OPACITY)
+        widget.setGraphicsEffect(effect)
+    else:
+        widget.setGraphicsEffect(None)  # type: ignore
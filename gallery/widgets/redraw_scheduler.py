@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The RedrawScheduler class.
+
+Scroll and resize events can be emitted many times per frame. Rather than redrawing
+the grid for each of them, the redraw is scheduled with a zero-delay timer, which only
+fires once the pending events have been processed : all the requests received in the
+meantime are merged into a single redraw, based on the latest scroll position and
+size, and the intermediate ones are skipped.
+
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from PySide6 import QtCore
+
+
+class RedrawScheduler(QtCore.QObject):
+
+    """
+    Merges the redraw requests received before the event loop gets back control into
+    a single call of the redraw function.
+
+    Parameters
+    ----------
+    parent
+    redraw
+        The function actually redrawing, called without argument.
+
+    Methods
+    -------
+    schedule
+
+    """
+
+    def __init__(self, parent: QtCore.QObject, redraw: Callable[[], None]) -> None:
+        super().__init__(parent)
+        self._redraw: Callable[[], None] = redraw
+        self._timer: QtCore.QTimer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._redraw)  # type: ignore
+
+    def schedule(self, *unused_args: Any) -> None:
+        """
+        Schedules a redraw, if none is pending already.
+
+        The arguments are ignored, so that the method can be connected to any signal.
+
+        """
+        if not self._timer.isActive():
+            self._timer.start()
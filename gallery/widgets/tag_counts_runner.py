@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The TagCountsRunner class, loading the tag counts of the gallery models off the GUI
+ thread, and its associated TagCountsRunnerSignals.
+
+ The TagCountsJob class, loading the tag counts on a worker thread.
+
+The counts are loaded on the global QThreadPool, on a read-only connection to the
+database, and sent back to the GUI thread through a signal. Counts loaded while the
+gallery wrote to the database are ignored, and loaded again. For an in-memory
+database, which has no read-only connections, or if the read-only connection fails,
+the counts are loaded right away on the GUI thread.
+
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import peewee
+from PySide6 import QtCore
+
+from gallery.models.gallery_models import GalleryModels
+from gallery.models.tag_counts import TagCounts
+from gallery.widgets.worker_runner import WorkerJob, WorkerJobSignals, WorkerRunner
+
+PRIORITY_TAG_COUNTS: int = 1
+"""The thread pool priority of the tag counts, below the queries' one."""
+
+
+class TagCountsRunner(WorkerRunner):
+
+    """
+    Loads the tag counts of the gallery models asynchronously when possible.
+
+    Parameters
+    ----------
+    parent
+    models
+
+    Attributes
+    ----------
+    signals
+
+    Methods
+    -------
+    refresh
+    cancel
+
+    """
+
+    def __init__(self, parent: QtCore.QObject, models: GalleryModels) -> None:
+        super().__init__(parent)
+        self.signals: TagCountsRunnerSignals = TagCountsRunnerSignals()
+        self._models: GalleryModels = models
+
+    def refresh(self) -> None:
+        """
+        Loads the tag counts if they aren't loaded, nor being loaded. Once they are,
+        signals.refreshed is emitted.
+        """
+        models = self._models
+        if models.tag_counts.is_loaded or self._job is not None:
+            return
+        read_database = models.connections.read_database
+        if read_database is None:
+            self._refresh_now()
+        else:
+            write_generation = models.tag_counts.write_generation
+            job = TagCountsJob(
+                models, read_database, write_generation, self._jobs_signals
+            )
+            self._start_job(job, PRIORITY_TAG_COUNTS)
+
+    def _refresh_now(self) -> None:
+        models = self._models
+        models.tag_counts.load(
+            models.database, models.MyObject, models.MyTag, models.MyObjectTag
+        )
+        self.signals.refreshed.emit()  # type: ignore
+
+    def _handle_result(self, job: WorkerJob, result: Optional[TagCounts]) -> None:
+        models = self._models
+        # The counts loaded while the database was written to may miss the last
+        # modifications.
+        if result is None:
+            # The counts failed to load on the read-only connection.
+            self._refresh_now()
+        elif job.write_generation != models.tag_counts.write_generation:
+            self.refresh()
+        else:
+            models.tag_counts.replace_with(result)
+            self.signals.refreshed.emit()  # type: ignore
+
+
+class TagCountsJob(WorkerJob):
+
+    """
+    Loads the tag counts on the read-only connection of the worker thread.
+
+    Parameters
+    ----------
+    models
+    read_database
+    write_generation
+        The write generation of the tag counts when the job was created.
+    signals
+
+    """
+
+    def __init__(
+        self,
+        models: GalleryModels,
+        read_database: peewee.SqliteDatabase,
+        write_generation: int,
+        signals: WorkerJobSignals,
+    ) -> None:
+        super().__init__(write_generation, signals)
+        self._models: GalleryModels = models
+        self._read_database: peewee.SqliteDatabase = read_database
+
+    def _compute(self) -> Optional[TagCounts]:
+        models = self._models
+        tag_counts = TagCounts()
+        try:
+            tag_counts.load(
+                self._read_database, models.MyObject, models.MyTag, models.MyObjectTag
+            )
+        except peewee.OperationalError:
+            # The database can't be read from this connection.
+            return None
+        return tag_counts
+
+
+class TagCountsRunnerSignals(QtCore.QObject):  # pylint: disable=too-few-public-methods
+
+    """
+    Collection of signals used by the TagCountsRunner.
+
+    Class Attributes
+    ----------------
+    refreshed
+
+    """
+
+    refreshed: QtCore.Signal = QtCore.Signal()
+    """A signal emitted when the tag counts have been loaded."""
@@ -3,7 +3,9 @@
 Defines :
  The TagTreeWidget class, and its associated TagTreeWidgetSignals.
 
- The WidgetItem base class for all tag tree widget items.
+ The WidgetItem base class for all tag tree widget items, whose behaviour is
+ shared with the adapters of the TagTreeView through the mixins of
+ widget_item_mixins.
 
  The WidgetItemTagBase base class for tag related widget items, and its two derived
  classes WidgetItemTag and WidgetItemTagFolder
@@ -16,13 +18,37 @@ Defines :
 
  TheWidgetItemFolder, a basic folder, used to organise widget items in the tree.
 
+ The WidgetItems dictionary, mapping widget_item_id to the widget items of the tree.
+
+ The TagTreeCountsMixin class, showing the counts of the items of a tag tree, shared
+ with the TagTreeView.
+
+ The get_counts_text function, formatting the counts of a tag.
+
+The widget items of the tags are loaded lazily by default : only the tags at the root
+and the children of the expanded tags are created, the children of a tag being loaded
+when it is expanded. The widget item of any other tag is loaded with its ancestors the
+first time it is looked up in the WidgetItems dictionary.
+
+With the "eager" tag_tree_loading option, the whole tag table is read in a single
+query into the TagHierarchy of the GalleryModels, and all the widget items are built
+from it at once.
+
+Creating, renaming or deleting a tag or a view only updates the widget items
+concerned, in place, without redrawing the tree.
+
+The number of objects of each tag and rating is shown in a second column, next to
+its name : the objects tagged with the tag itself, and the ones tagged with the tag or
+one of its descendants. The counts are loaded in the background by a TagCountsRunner,
+and then updated by the drops on the tree rather than loaded again.
+
 """
 
 
 from __future__ import annotations
 
 import time
-from typing import List, Set, Dict, Optional, Type
+from typing import Callable, List, Set, Dict, Optional, Tuple, Type
 
 from PySide6 import QtWidgets, QtGui, QtCore
 
@@ -36,10 +62,21 @@ from gallery.models.views import View
 from gallery.widgets import icons
 from gallery.widgets.menus import TagMenu
 from gallery.widgets.my_custom_gallery_widget import MyCustomGalleryWidget
-from gallery.widgets.query import QueryParameters
+from gallery.widgets.tag_counts_runner import TagCountsRunner
+from gallery.widgets.widget_item_mixins import (
+    WidgetItemAllMixin,
+    WidgetItemMixin,
+    WidgetItemRatingMixin,
+    WidgetItemTagDropMixin,
+    WidgetItemTagMixin,
+    WidgetItemViewMixin,
+)
 
+COUNTS_COLUMN: int = 1
+"""The column of the tree showing the counts of the widget items."""
 
-class WidgetItem(QtWidgets.QTreeWidgetItem):
+
+class WidgetItem(WidgetItemMixin, QtWidgets.QTreeWidgetItem):
 
     """
     A widget item of the tag tree.
@@ -48,9 +85,20 @@ class WidgetItem(QtWidgets.QTreeWidgetItem):
     corresponding to different roles (tag, view, folder...). All items can accept
     drops (via handle_drop_on_self) and/or be droppable (via get_objects), and must
     implement the corresponding methods only if necessary.
+    Droppable widget items can also define a select_my_objects_ids method, returning
+    the ids of their objects as a peewee query, which allows QueryParameters to
+    compile a whole sequence of parameters into a single SQL statement, and a
+    get_my_objects_ids_among method, returning the ids of their objects among a
+    few given ones, used to update the results after a write.
+    Widget items whose result depends on other cached results can define a
+    get_result_dependencies method, returning the keys of those results in the
+    ResultCache, so that their own result is invalidated with them.
     Widget items can also define a rename method, in which case a double click on
     themselves will start the renaming process.
 
+    Those methods are implemented by the mixins of widget_item_mixins, shared with
+    the adapters of the TagTreeView.
+
     Instance Attributes
     -------------------
     widget_item_id
@@ -72,24 +120,16 @@ class WidgetItem(QtWidgets.QTreeWidgetItem):
         self.name = name
         self.setText(0, name)
 
+    def _set_count_text(self, count_text: str) -> None:
+        self.setText(COUNTS_COLUMN, count_text)
+        self.setTextAlignment(COUNTS_COLUMN, QtCore.Qt.AlignRight)
+
     def _set_icon(self, icon_name: str) -> None:
         icon = icons.get_icon(icon_name)
         self.setIcon(0, icon)
 
-    @property
-    def is_droppable(self) -> bool:
-        """Whether the widget item can be dropped on the grid."""
-        is_droppable = hasattr(self, "get_my_objects")
-        return is_droppable
-
-    @property
-    def accepts_drop(self) -> bool:
-        """Whether the widget item accepts a drop from the grid."""
-        accepts_drop = hasattr(self, "handle_drop_on_self")
-        return accepts_drop
-
 
-class WidgetItemTagBase(WidgetItem):
+class WidgetItemTagBase(WidgetItemTagMixin, WidgetItem):
 
     """
     Base class for tag tree widget items based on a tag (either a "real" tag or a
@@ -106,29 +146,19 @@ class WidgetItemTagBase(WidgetItem):
         super().__init__(parent)
         self.tag = tag
         self.widget_item_id = str(tag.id)
+        self.are_children_loaded: bool = False
+        """Whether the widget items of the tag's children have been created."""
         self._set_name(tag.name)
+        self.refresh_count()
 
-    def get_my_objects(self) -> types.MyObjectSet:
-        """Gets the objects tagged with the widget item tag."""
-        my_objects = self.tag.get_my_objects_with_descendants()
-        return my_objects
-
-    def rename(self, name: str) -> None:
-        """
-        Renames the widget item and its tag.
-
-        Parameters
-        ----------
-        name
-
-        """
-        self.name = name
-        self.tag.name = name
-        self.tag.save()
+    def refresh_count(self) -> None:
+        """Shows the counts of the tag, or nothing if they aren't loaded yet."""
+        counts = self.models.tag_counts.get_counts(self.tag.id)
+        self._set_count_text(get_counts_text(counts))
 
     def my_delete(self) -> None:
         """Deletes the widget item, as well as its tag and all its descendants."""
-        self.tag.delete_self_and_children()
+        super().my_delete()
         self._remove_from_widget_items_expanded()
 
     def _remove_from_widget_items_expanded(self) -> None:
@@ -138,7 +168,7 @@ class WidgetItemTagBase(WidgetItem):
             widget_items_expanded.remove(self.widget_item_id)
 
 
-class WidgetItemTag(WidgetItemTagBase):
+class WidgetItemTag(WidgetItemTagDropMixin, WidgetItemTagBase):
 
     """
     Widget item base on a "real" tag.
@@ -149,32 +179,6 @@ class WidgetItemTag(WidgetItemTagBase):
 
     """
 
-    def handle_drop_on_self(self, my_object_id: types.MyObjectId, remove: bool) -> None:
-        """
-        Adds or removes a tag from the my_object with the id my_object_id.
-
-        Whether the tag is added or removed is based on whether the Shift key is
-        being pressed at the moment of the drop.
-
-        Parameters
-        ----------
-        my_object_id
-        remove
-
-        """
-        if remove:
-            self._remove_tag(my_object_id)
-        else:
-            self._add_tag(my_object_id)
-
-    def _add_tag(self, my_object_id: types.MyObjectId) -> None:
-        self.models.MyObjectTag.get_or_create(my_object=my_object_id, tag=self.tag.id)
-
-    def _remove_tag(self, my_object_id: types.MyObjectId) -> None:
-        self.models.MyObjectTag.get(
-            my_object=my_object_id, tag=self.tag.id
-        ).delete_instance()
-
 
 class WidgetItemTagFolder(WidgetItemTagBase):
 
@@ -190,7 +194,7 @@ class WidgetItemTagFolder(WidgetItemTagBase):
         self._set_icon("folder")
 
 
-class WidgetItemRating(WidgetItem):
+class WidgetItemRating(WidgetItemRatingMixin, WidgetItem):
 
     """
     Widget item based on a rating, if the MyObject model has such a field.
@@ -211,56 +215,19 @@ class WidgetItemRating(WidgetItem):
         self.widget_item_id = f"rating_{rating}"
         self.rating = rating
         self._set_name_from_rating(rating)
+        self.refresh_count()
+
+    def refresh_count(self) -> None:
+        """Shows the count of the rating, or nothing if it isn't loaded yet."""
+        count = self.models.tag_counts.get_rating_count(self.rating)
+        self._set_count_text("" if count is None else str(count))
 
     def _set_name_from_rating(self, rating: int) -> None:
         name = self._get_name_from_rating(rating)
         self._set_name(name)
 
-    @staticmethod
-    def _get_name_from_rating(rating: int) -> str:
-        name = WidgetItemRating._get_base_name_from_rating(rating)
-        name = WidgetItemRating._add_s_to_plural(name, rating)
-        return name
-
-    @staticmethod
-    def _get_base_name_from_rating(rating: int) -> str:
-        if rating == 0:
-            name = "Non noté"
-        else:
-            name = f"{rating} étoile"
-        return name
-
-    @staticmethod
-    def _add_s_to_plural(name: str, rating: int) -> str:
-        if rating > 1:
-            name += "s"
-        return name
-
-    def get_my_objects(self) -> types.MyObjectSet:
-        """Gets all objects rated with its rating."""
-        my_objects = set(
-            self.models.MyObject.select().where(
-                self.models.MyObject.rating == self.rating
-            )
-        )
-        return my_objects
-
-    def handle_drop_on_self(
-        self, object_id: types.MyObjectId, unused_remove: bool
-    ) -> None:
-        """
-        Rates the my_object with its rating.
 
-        The remove parameter is not used. To "unrate" a my_object, it must instead be
-        dropped on the widget item corresponding to the rating 0.
-
-        """
-        my_object = self.models.MyObject.get(id=object_id)
-        my_object.rating = self.rating
-        my_object.save()
-
-
-class WidgetItemAll(WidgetItem):
+class WidgetItemAll(WidgetItemAllMixin, WidgetItem):
 
     """
     Widget item associated with all objects in the database.
@@ -280,13 +247,8 @@ class WidgetItemAll(WidgetItem):
         self.widget_item_id = "all"
         self._set_name("Tout")
 
-    def get_my_objects(self) -> types.MyObjectSet:
-        """Gets all objects from the database."""
-        my_objects = set(self.models.MyObject.select())
-        return my_objects
-
 
-class WidgetItemView(WidgetItem):
+class WidgetItemView(WidgetItemViewMixin, WidgetItem):
     """
     Widget item associated with a view.
 
@@ -305,54 +267,13 @@ class WidgetItemView(WidgetItem):
         super().__init__(parent)
         self.view = view
         self.widget_item_id = self.get_id(view)
-        self._query_parameters: QueryParameters
         self._set_name(view.name)
 
-    def _create_query_parameters(self) -> QueryParameters:
-        # my_main_widget = self._get_main_widget()
-        tag_tree_widget = self.treeWidget()
-        query_string = self.view.query_string
-        query_parameters = QueryParameters.create_from_string(
-            query_string, tag_tree_widget
-        )
-        return query_parameters
-
     def _get_main_widget(self) -> main_widget.MainWidget:
         tag_tree = self.treeWidget()
         my_main_widget = tag_tree.get_main_widget()
         return my_main_widget
 
-    def _get_query_parameters(self) -> QueryParameters:
-        if not hasattr(self, "_query_parameters"):
-            self._set_query_parameters()
-        return self._query_parameters
-
-    def _set_query_parameters(self) -> None:
-        query_parameters = self._create_query_parameters()
-        query_parameters.refresh_my_objects()
-        self._query_parameters = query_parameters
-
-    def get_my_objects(self) -> types.MyObjectSet:
-        """Gets objects associated with the view's query parameters."""
-        query_parameters = self._get_query_parameters()
-        my_objects = query_parameters.my_objects
-        return my_objects
-
-    def rename(self, name: str) -> None:
-        """Rename the view."""
-        self.name = name
-        self.view.name = name
-        self.view.save()
-
-    @staticmethod
-    def get_id(view: View) -> str:
-        """The view's id is view_{view.id}."""
-        return f"view_{view.id}"
-
-    def my_delete(self):
-        """Deletes the view."""
-        self.view.delete_instance()
-
 
 class WidgetItemFolder(WidgetItem):
     """
@@ -376,8 +297,70 @@ class WidgetItemFolder(WidgetItem):
 
 # The QTreeWidget already have 7 ancestors itself, but not subclassing it is not an
 # option here...
+class WidgetItems(dict):
+
+    """
+    A dictionary mapping widget_item_id to their corresponding WidgetItem, loading the
+    widget items of the tags not created yet when they are looked up with [].
+
+    Parameters
+    ----------
+    load_widget_item
+        The function creating the missing widget item for an id, raising a KeyError
+        if there is none.
+
+    """
+
+    def __init__(
+        self, load_widget_item: Callable[[types.WidgetItemId], WidgetItem]
+    ) -> None:
+        super().__init__()
+        self._load_widget_item = load_widget_item
+
+    def __missing__(self, widget_item_id: types.WidgetItemId) -> WidgetItem:
+        return self._load_widget_item(widget_item_id)
+
+
+class TagTreeCountsMixin:  # pylint: disable=too-few-public-methods
+
+    """
+    Shows the counts of the items of a tag tree in its second column, loaded in the
+    background by a TagCountsRunner.
+    """
+
+    models: GalleryModels
+    _tag_counts_runner: TagCountsRunner
+
+    def _init_columns(self) -> None:
+        # The names are edited in the first column, the counts fit the second one.
+        header = self.header()  # type: ignore  # pylint: disable=no-member
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        header.setSectionResizeMode(
+            COUNTS_COLUMN, QtWidgets.QHeaderView.ResizeToContents
+        )
+
+    def _init_tag_counts_runner(self, show_counts: Callable[[], None]) -> None:
+        self._tag_counts_runner = TagCountsRunner(self, self.models)  # type: ignore
+        self._tag_counts_runner.signals.refreshed.connect(  # type: ignore
+            show_counts
+        )
+
+    def _reload_counts(self) -> None:
+        # The counts being loaded may predate the writes the tree is redrawn for.
+        self._tag_counts_runner.cancel()
+        self.refresh_counts()
+
+    def refresh_counts(self) -> None:
+        """
+        Loads the counts of the items in the background if they aren't loaded, for
+        instance after a write invalidating them, and shows them once loaded.
+        """
+        self._tag_counts_runner.refresh()
+
+
 class TagTreeWidget(
-    QtWidgets.QTreeWidget, MyCustomGalleryWidget
+    TagTreeCountsMixin, QtWidgets.QTreeWidget, MyCustomGalleryWidget
 ):  # pylint: disable = too-many-ancestors
     """
     The TagTreeWidget holds the tag's tree, as well as some special additional items.
@@ -386,11 +369,25 @@ class TagTreeWidget(
     MyObject. If MyObject has a rating attribute, then a folder is also created holding
     widget items for rating from 1 to 5, with 0 being assimilated to unrated tags.
 
+    The widget items of the tags are created lazily, when their parent is expanded or
+    when they are looked up in widget_items, unless the tag_tree_loading option is
+    "eager".
+
     Attributes
     ----------
     widget_items
     widget_items_expanded
 
+    Methods
+    -------
+    redraw_tree
+    insert_widget_item_tag
+    insert_widget_item_view
+    remove_widget_item
+    rename_widget_item
+    start_rename_tag
+    refresh_counts
+
     """
 
     _brushes: Dict[str, QtGui.QBrush] = {}
@@ -406,8 +403,9 @@ class TagTreeWidget(
         self._timer_click: float = 0
         self._tag_widget_hovered: Optional[WidgetItem] = None
         self._tag_widget_being_edited: Optional[WidgetItem] = None
-        self.widget_items: Dict[types.WidgetItemId, WidgetItem] = {}
+        self.widget_items: WidgetItems = WidgetItems(self._load_widget_item_tag)
         """A dictionary mapping widget_item_id to their corresponding WidgetItem."""
+        self._tags_ids_with_children: Set[int] = set()
 
         self.widget_items_expanded: Set[types.WidgetItemId] = set()
         """A list of the widget items being expanded.."""
@@ -429,11 +427,17 @@ class TagTreeWidget(
         # pylint: disable = protected-access
         tag_tree_widget = cls.create_widget(parent)
         assert isinstance(tag_tree_widget, cls)
+        tag_tree_widget._init_columns()
+        tag_tree_widget._init_tag_counts_runner(tag_tree_widget._show_counts)
         tag_tree_widget.redraw_tree()
         tag_tree_widget._init_brushes()
         tag_tree_widget._connect_events()
         return tag_tree_widget
 
+    def _init_columns(self) -> None:
+        self.setColumnCount(2)
+        super()._init_columns()
+
     def _init_brushes(self):
         self._brushes["background_color"] = self.palette().base()
         widget_hovered_background_color = QtGui.QColor(
@@ -464,6 +468,8 @@ class TagTreeWidget(
             widget_item.setBackground(0, self._brushes["background_color"])
 
     def _handle_tag_widget_expanded(self, item: WidgetItem) -> None:
+        if isinstance(item, WidgetItemTagBase):
+            self._load_children(item)
         self.widget_items_expanded.add(item.widget_item_id)
 
     def _handle_tag_widget_collapsed(self, item: WidgetItem) -> None:
@@ -477,10 +483,174 @@ class TagTreeWidget(
         self.clear()
         self._tag_widget_hovered = None
         self._create_tag_tree()
+        self._reload_counts()
+
+    def _show_counts(self) -> None:
+        for widget_item in self.widget_items.values():
+            if hasattr(widget_item, "refresh_count"):
+                widget_item.refresh_count()
+
+    def _refresh_counts_after_drop(self, widget_item: WidgetItem) -> None:
+        # A drop updates the counts of the widget item and of its ancestors, and
+        # those of the other ratings when rating my_objects.
+        widget_items_dropped_on = [widget_item]
+        parent_item = widget_item.parent()
+        if isinstance(widget_item, WidgetItemRating):
+            widget_items_dropped_on = [
+                parent_item.child(child_index)
+                for child_index in range(parent_item.childCount())
+            ]
+        while parent_item is not None:
+            widget_items_dropped_on.append(parent_item)
+            parent_item = parent_item.parent()
+        for widget_item_dropped_on in widget_items_dropped_on:
+            if hasattr(widget_item_dropped_on, "refresh_count"):
+                widget_item_dropped_on.refresh_count()
+        self.refresh_counts()
 
     def clear(self):
         super().clear()
-        self.widget_items = {}
+        self.widget_items = WidgetItems(self._load_widget_item_tag)
+
+    def insert_widget_item_tag(self, tag: Tag) -> WidgetItemTagBase:
+        """
+        Inserts the widget item of a new tag among its siblings, without redrawing the
+        tree.
+
+        Only the ancestors of the tag are loaded if needed, as well as its siblings if
+        they weren't.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        if tag.parent_id is None:
+            widget_item_tag = self._insert_widget_item_tag(self, tag)
+        else:
+            parent = self.widget_items[str(tag.parent_id)]
+            assert isinstance(parent, WidgetItemTagBase)
+            self._tags_ids_with_children.add(tag.parent_id)
+            parent.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
+            if parent.are_children_loaded:
+                widget_item_tag = self._insert_widget_item_tag(parent, tag)
+            else:
+                # Loading the children also creates the widget item of the new tag.
+                self._load_children(parent)
+                widget_item_tag = self.widget_items[str(tag.id)]
+        return widget_item_tag
+
+    def _insert_widget_item_tag(
+        self, parent: types.WidgetItemParent, tag: Tag
+    ) -> WidgetItemTagBase:
+        widget_item_class = self._widget_item_class_from_type[tag.type]
+        self._add_widget_item_tag_by_type(parent, tag, widget_item_class)
+        widget_item_tag = self.widget_items[str(tag.id)]
+        self._move_to_sorted_position(widget_item_tag)
+        return widget_item_tag
+
+    def _move_to_sorted_position(self, widget_item_tag: WidgetItemTagBase) -> None:
+        parent_item = self._get_parent_item(widget_item_tag)
+        parent_item.takeChild(parent_item.indexOfChild(widget_item_tag))
+        index = self._get_sorted_index(parent_item, widget_item_tag.name)
+        parent_item.insertChild(index, widget_item_tag)
+        # Qt forgets the expanded state of the items taken out of the tree.
+        self._restore_expanded(widget_item_tag)
+
+    def _get_parent_item(self, widget_item: WidgetItem) -> QtWidgets.QTreeWidgetItem:
+        parent_item = widget_item.parent()
+        if parent_item is None:
+            parent_item = self.invisibleRootItem()
+        return parent_item
+
+    def _get_sorted_index(
+        self, parent_item: QtWidgets.QTreeWidgetItem, name: str
+    ) -> int:
+        # At the root, the tags come after the "All" widget item.
+        index = 1 if parent_item is self.invisibleRootItem() else 0
+        for child_index in range(parent_item.childCount()):
+            sibling = parent_item.child(child_index)
+            if isinstance(sibling, WidgetItemTagBase):
+                if sibling.name > name:
+                    index = child_index
+                    break
+                index = child_index + 1
+        return index
+
+    def _restore_expanded(self, widget_item: QtWidgets.QTreeWidgetItem) -> None:
+        if widget_item.widget_item_id in self.widget_items_expanded:
+            widget_item.setExpanded(True)
+        for child_index in range(widget_item.childCount()):
+            self._restore_expanded(widget_item.child(child_index))
+
+    def insert_widget_item_view(self, view: View) -> WidgetItemView:
+        """
+        Inserts the widget item of a new view in the views folder, without redrawing
+        the tree.
+
+        Parameters
+        ----------
+        view
+
+        """
+        views_folder = self.widget_items["folder_Views"]
+        widget_item_view = WidgetItemView(views_folder, view)
+        self._add_to_widget_items_dict(widget_item_view)
+        return widget_item_view
+
+    def remove_widget_item(self, widget_item: WidgetItem) -> None:
+        """
+        Removes the widget item and the widget items below it, without redrawing the
+        tree.
+
+        The widget item must have been deleted beforehand with its my_delete method.
+
+        Parameters
+        ----------
+        widget_item
+
+        """
+        parent_item = self._get_parent_item(widget_item)
+        parent_item.removeChild(widget_item)
+        self._forget_widget_item(widget_item)
+        is_parent_empty = (
+            isinstance(parent_item, WidgetItemTagBase)
+            and parent_item.are_children_loaded
+            and parent_item.childCount() == 0
+        )
+        if is_parent_empty:
+            self._tags_ids_with_children.discard(parent_item.tag.id)
+            parent_item.setChildIndicatorPolicy(
+                QtWidgets.QTreeWidgetItem.DontShowIndicator
+            )
+        # Deleting a tag invalidates the counts.
+        self.refresh_counts()
+
+    def _forget_widget_item(self, widget_item: QtWidgets.QTreeWidgetItem) -> None:
+        widget_item_id = widget_item.widget_item_id
+        self.widget_items.pop(widget_item_id, None)
+        self.widget_items_expanded.discard(widget_item_id)
+        if self._tag_widget_hovered is widget_item:
+            self._tag_widget_hovered = None
+        if self._tag_widget_being_edited is widget_item:
+            self._tag_widget_being_edited = None
+        for child_index in range(widget_item.childCount()):
+            self._forget_widget_item(widget_item.child(child_index))
+
+    def rename_widget_item(self, widget_item: WidgetItem, name: str) -> None:
+        """
+        Renames the widget item, and moves it to its new place among its siblings if
+        they are sorted by name.
+
+        Parameters
+        ----------
+        widget_item
+        name
+
+        """
+        widget_item.rename(name)
+        if isinstance(widget_item, WidgetItemTagBase):
+            self._move_to_sorted_position(widget_item)
 
     def contextMenuEvent(self, event: QtGui.QContextMenuEvent) -> None:
         tag_hovered = self.itemAt(event.pos())
@@ -493,6 +663,9 @@ class TagTreeWidget(
 
     def _create_tag_tree(self) -> None:
         # The structure is : all / tags / views / ratings
+        if self._is_loading_eager():
+            self.models.tag_hierarchy.load(self.models.MyTag)
+        self._tags_ids_with_children = self._get_tags_ids_with_children()
         self._add_widget_item_all()
         self._add_widget_items_tag(self)
         self._add_widget_items_view()
@@ -500,9 +673,23 @@ class TagTreeWidget(
         self._expand_widget_items()
 
     def _expand_widget_items(self) -> None:
-        for widget_item_id in self.widget_items_expanded:
+        # Expanding a widget item loads its children, and looking up an expanded tag
+        # not loaded yet loads its ancestors.
+        for widget_item_id in list(self.widget_items_expanded):
+            widget_item = self._try_load_widget_item_tag(widget_item_id)
+            if widget_item is not None:
+                widget_item.setExpanded(True)
+
+    def _try_load_widget_item_tag(
+        self, widget_item_id: types.WidgetItemId
+    ) -> Optional[WidgetItem]:
+        try:
             widget_item = self.widget_items[widget_item_id]
-            widget_item.setExpanded(True)
+        except KeyError:
+            # The tag was deleted in the meantime.
+            self.widget_items_expanded.discard(widget_item_id)
+            widget_item = None
+        return widget_item
 
     def _add_widget_item_all(self) -> None:
         widget_item_all = WidgetItemAll(self)
@@ -522,10 +709,61 @@ class TagTreeWidget(
     ) -> None:
         widget_item_tag = widget_item_class(parent, tag)
         self._add_to_widget_items_dict(widget_item_tag)
-        self._add_widget_items_tag(widget_item_tag)
+        # The children are only loaded when the widget item is expanded, the
+        # indicator showing whether there are some.
+        if tag.id in self._tags_ids_with_children:
+            policy = QtWidgets.QTreeWidgetItem.ShowIndicator
+        else:
+            policy = QtWidgets.QTreeWidgetItem.DontShowIndicator
+        widget_item_tag.setChildIndicatorPolicy(policy)
+        if self._is_loading_eager():
+            self._load_children(widget_item_tag)
+
+    def _is_loading_eager(self) -> bool:
+        return self.config.tag_tree_loading == "eager"
+
+    def _load_children(self, widget_item_tag: WidgetItemTagBase) -> None:
+        if not widget_item_tag.are_children_loaded:
+            widget_item_tag.are_children_loaded = True
+            self._add_widget_items_tag(widget_item_tag)
+
+    def _load_widget_item_tag(self, widget_item_id: types.WidgetItemId) -> WidgetItem:
+        # Only the widget items of tags below the root can be missing : they are
+        # created by loading the children of their parent, itself loaded if needed.
+        MyTag = self.models.MyTag
+        tag_id = int(widget_item_id) if str(widget_item_id).isdigit() else None
+        tag = MyTag.get_or_none(MyTag.id == tag_id) if tag_id is not None else None
+        if tag is None or tag.parent_id is None:
+            raise KeyError(widget_item_id)
+        parent_widget_item = self.widget_items[str(tag.parent_id)]
+        assert isinstance(parent_widget_item, WidgetItemTagBase)
+        self._load_children(parent_widget_item)
+        widget_item = self.widget_items.get(widget_item_id)
+        if widget_item is None:
+            raise KeyError(widget_item_id)
+        return widget_item
+
+    def _get_tags_ids_with_children(self) -> Set[int]:
+        tag_hierarchy = self.models.tag_hierarchy
+        if tag_hierarchy.is_loaded:
+            tags_ids_with_children = tag_hierarchy.get_parents_ids()
+        else:
+            MyTag = self.models.MyTag
+            rows = (
+                MyTag.select(MyTag.parent)
+                .where(MyTag.parent.is_null(False))
+                .distinct()
+                .tuples()
+            )
+            tags_ids_with_children = {row[0] for row in rows}
+        return tags_ids_with_children
 
     def _get_tags_from_parent(self, parent: types.WidgetItemParent) -> List[Tag]:
-        if isinstance(parent, WidgetItemTagBase):
+        tag_hierarchy = self.models.tag_hierarchy
+        if tag_hierarchy.is_loaded:
+            parent_id = parent.tag.id if isinstance(parent, WidgetItemTagBase) else None
+            tags = tag_hierarchy.get_children(parent_id)
+        elif isinstance(parent, WidgetItemTagBase):
             tags = self._get_tags_from_widget_item_tag(parent)
         else:
             tags = self._get_tags_at_root()
@@ -640,6 +878,7 @@ class TagTreeWidget(
             assert drag_object is not None
             drag_object.handle_drop_on_tree(self._tag_widget_hovered)
             self._set_default_background(self._tag_widget_hovered)
+            self._refresh_counts_after_drop(self._tag_widget_hovered)
 
     def _set_default_background(self, tag_widget):
         tag_widget.setBackground(0, self._brushes["background_color"])
@@ -697,7 +936,7 @@ class TagTreeWidget(
             pass
         else:
             new_name = self._tag_widget_being_edited.text(0)
-            self._tag_widget_being_edited.rename(new_name)
+            self.rename_widget_item(self._tag_widget_being_edited, new_name)
 
     def get_main_widget(self):
         """Gets the main widget."""
@@ -728,3 +967,25 @@ class TagTreeWidgetSignals(QtCore.QObject):  # pylint: disable=too-few-public-me
     dropped: QtCore.Signal = QtCore.Signal(int, str, bool)
     """A signal emited when something is dropped on the tree. The parameters are
     (my_object_id, tag_widget.widget_item_id, remove)."""
+
+
+def get_counts_text(counts: Optional[Tuple[int, int]]) -> str:
+    """
+    The text showing the counts of a tag : its total count, preceded by its direct
+    count when they differ, or nothing if the counts aren't loaded.
+
+    Parameters
+    ----------
+    counts
+        The direct and total counts of the tag, as given by TagCounts.get_counts.
+
+    """
+    if counts is None:
+        counts_text = ""
+    else:
+        direct_count, total_count = counts
+        if direct_count == total_count:
+            counts_text = str(total_count)
+        else:
+            counts_text = f"{direct_count} / {total_count}"
+    return counts_text
@@ -0,0 +1,944 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The TagTreeModel class, an item model over the TagStore of the tag tree.
+
+ The TagTreeDelegate class, painting the items of a TagTreeView.
+
+ The TagTreeView class, a model-based alternative to the TagTreeWidget.
+
+ The WidgetItemAdapter base class, giving the items of a TagTreeView the same
+ interface as the widget items of a TagTreeWidget, and its derived classes
+ WidgetItemAdapterTag, WidgetItemAdapterTagFolder, WidgetItemAdapterAll,
+ WidgetItemAdapterView, WidgetItemAdapterRating and WidgetItemAdapterFolder.
+
+Contrary to the TagTreeWidget, which creates a QTreeWidgetItem for each tag, the
+TagTreeView is a single QTreeView over a TagTreeModel. The tags are read from the
+compact arrays of a TagStore, loaded in a single query or copied from the
+TagHierarchy of the models when it is loaded, and only painted by the delegate,
+which also highlights the item hovered during a drag. The adapters are only created
+for the few items actually used by a drag, a menu or a query. They share the
+behaviour of the widget items of the TagTreeWidget through the mixins of
+widget_item_mixins.
+
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Type
+
+from PySide6 import QtCore, QtGui, QtWidgets
+
+# The view needs the same modules as the TagTreeWidget it replaces.
+# pylint: disable=duplicate-code
+import gallery.types as types
+import gallery.widgets.drag as drag
+import gallery.widgets.main_widget as main_widget
+from gallery.config_gallery.config_gallery import ConfigGallery
+from gallery.models.gallery_models import GalleryModels
+from gallery.models.tag_store import ROOT_ROW, TagStore
+from gallery.models.tags import Tag
+from gallery.models.views import View
+from gallery.widgets import icons
+from gallery.widgets.menus import TagMenu
+from gallery.widgets.my_custom_gallery_widget import MyCustomGalleryWidget
+from gallery.widgets.tag_tree import (
+    COUNTS_COLUMN,
+    TagTreeCountsMixin,
+    WidgetItems,
+    get_counts_text,
+)
+from gallery.widgets.widget_item_mixins import (
+    WidgetItemAllMixin,
+    WidgetItemMixin,
+    WidgetItemRatingMixin,
+    WidgetItemTagDropMixin,
+    WidgetItemTagMixin,
+    WidgetItemViewMixin,
+)
+
+# pylint: enable=duplicate-code
+
+ADAPTER_INTERNAL_ID_BASE: int = 1 << 48
+"""The internal ids of the indexes of the adapters start from there, the ones below
+being the rows of the tags in the TagStore."""
+
+
+class WidgetItemAdapter(WidgetItemMixin):  # pylint: disable=too-many-instance-attributes
+
+    """
+    An item of the TagTreeView, offering the same interface as the WidgetItem of the
+    TagTreeWidget, whose behaviour it shares through the mixins of
+    widget_item_mixins.
+
+    Parameters
+    ----------
+    tag_tree_view
+    widget_item_id
+    name
+
+    Instance Attributes
+    -------------------
+    widget_item_id
+    name
+    config
+    models
+    accepts_drop
+    is_droppable
+    children
+        The adapters below this one, for the items which are not tags.
+    parent_adapter
+    internal_id
+        The internal id of the index of the adapter in the TagTreeModel.
+
+    """
+
+    def __init__(
+        self, tag_tree_view: TagTreeView, widget_item_id: types.WidgetItemId, name: str
+    ) -> None:
+        self._tag_tree_view: TagTreeView = tag_tree_view
+        self.widget_item_id: types.WidgetItemId = widget_item_id
+        self.name: str = name
+        self.config: ConfigGallery = tag_tree_view.config
+        self.models: GalleryModels = tag_tree_view.models
+        self.children: List[WidgetItemAdapter] = []
+        self.parent_adapter: Optional[WidgetItemAdapter] = None
+        self.internal_id: int = 0
+
+    def treeWidget(self) -> TagTreeView:
+        """The TagTreeView holding the item, named after QTreeWidgetItem's method."""
+        return self._tag_tree_view
+
+    def setExpanded(self, is_expanded: bool) -> None:
+        """Expands or collapses the item, named after QTreeWidgetItem's method."""
+        tag_tree_view = self._tag_tree_view
+        index = tag_tree_view.tag_tree_model.get_index(self)
+        tag_tree_view.setExpanded(index, is_expanded)
+
+
+class WidgetItemAdapterTagBase(WidgetItemTagMixin, WidgetItemAdapter):
+
+    """
+    Base class for the adapters based on a tag, identified by its row in the
+    TagStore. The tag itself is only read from the database when needed.
+
+    Parameters
+    ----------
+    tag_tree_view
+    row
+
+    """
+
+    def __init__(self, tag_tree_view: TagTreeView, row: int) -> None:
+        store = tag_tree_view.tag_tree_model.store
+        super().__init__(tag_tree_view, str(store.get_id(row)), store.get_name(row))
+        self.row: int = row
+
+    @cached_property
+    def tag(self) -> Tag:
+        """The tag of the item."""
+        MyTag = self.models.MyTag
+        tag = MyTag.get_by_id(int(self.widget_item_id))
+        return tag
+
+
+class WidgetItemAdapterTag(WidgetItemTagDropMixin, WidgetItemAdapterTagBase):
+
+    """Adapter of a "real" tag, accepting drops and droppable."""
+
+
+class WidgetItemAdapterTagFolder(WidgetItemAdapterTagBase):
+
+    """Adapter of a "folder" tag, droppable but not accepting drops."""
+
+
+class WidgetItemAdapterAll(WidgetItemAllMixin, WidgetItemAdapter):
+
+    """
+    Adapter associated with all objects in the database, droppable but not accepting
+    drops.
+
+    Parameters
+    ----------
+    tag_tree_view
+
+    """
+
+    def __init__(self, tag_tree_view: TagTreeView) -> None:
+        super().__init__(tag_tree_view, "all", "Tout")
+
+
+class WidgetItemAdapterRating(WidgetItemRatingMixin, WidgetItemAdapter):
+
+    """
+    Adapter based on a rating, accepting drops and droppable.
+
+    Parameters
+    ----------
+    tag_tree_view
+    rating
+
+    """
+
+    def __init__(self, tag_tree_view: TagTreeView, rating: int) -> None:
+        name = self._get_name_from_rating(rating)
+        super().__init__(tag_tree_view, f"rating_{rating}", name)
+        self.rating = rating
+
+
+class WidgetItemAdapterView(WidgetItemViewMixin, WidgetItemAdapter):
+
+    """
+    Adapter associated with a view, droppable but not accepting drops.
+
+    Parameters
+    ----------
+    tag_tree_view
+    view
+
+    """
+
+    def __init__(self, tag_tree_view: TagTreeView, view: View) -> None:
+        super().__init__(tag_tree_view, self.get_id(view), view.name)
+        self.view = view
+
+
+class WidgetItemAdapterFolder(WidgetItemAdapter):
+
+    """
+    Adapter of a basic folder, neither droppable nor accepting drops.
+
+    Parameters
+    ----------
+    tag_tree_view
+    name
+
+    """
+
+    def __init__(self, tag_tree_view: TagTreeView, name: str) -> None:
+        super().__init__(tag_tree_view, f"folder_{name}", name)
+
+
+class TagTreeModel(QtCore.QAbstractItemModel):
+
+    """
+    An item model over the tags of a TagStore, and the adapters of the other items.
+
+    At the root, the "All" item comes first, then the tags at the root, then the
+    folders of the views and ratings. The internal id of the index of a tag is its row
+    in the store, the internal id of the index of another item is the internal_id of
+    its adapter.
+
+    The adapters of the tags are created on demand, when looked up in widget_items.
+
+    Parameters
+    ----------
+    tag_tree_view
+
+    Attributes
+    ----------
+    store
+    widget_items
+
+    Methods
+    -------
+    reload
+    get_index
+    get_widget_item
+    insert_tag
+    insert_adapter
+    remove_widget_item
+    rename_widget_item
+
+    """
+
+    _adapter_class_from_type: Dict[str, Type[WidgetItemAdapterTagBase]] = {
+        "tag": WidgetItemAdapterTag,
+        "folder": WidgetItemAdapterTagFolder,
+    }
+
+    def __init__(self, tag_tree_view: TagTreeView) -> None:
+        super().__init__(tag_tree_view)
+        self._tag_tree_view: TagTreeView = tag_tree_view
+        self.store: TagStore = TagStore()
+        self.widget_items: WidgetItems = WidgetItems(self._load_widget_item_tag)
+        self._adapters: List[WidgetItemAdapter] = []
+        """All adapters other than the tags', indexed by internal id."""
+        self._adapters_before_tags: List[WidgetItemAdapter] = []
+        self._adapters_after_tags: List[WidgetItemAdapter] = []
+        self._folder_icon: QtGui.QIcon = icons.get_icon("folder")
+
+    def reload(self) -> None:
+        """Reloads all tags and views, resetting the model."""
+        self.beginResetModel()
+        models = self._tag_tree_view.models
+        self.store.load(models.MyTag, models.tag_hierarchy)
+        self.widget_items = WidgetItems(self._load_widget_item_tag)
+        self._adapters = []
+        self._adapters_before_tags = []
+        self._adapters_after_tags = []
+        self._add_adapters()
+        self.endResetModel()
+
+    def _add_adapters(self) -> None:
+        tag_tree_view = self._tag_tree_view
+        self._adapters_before_tags.append(
+            self._register_adapter(WidgetItemAdapterAll(tag_tree_view))
+        )
+        views_folder = WidgetItemAdapterFolder(tag_tree_view, "Views")
+        self._adapters_after_tags.append(self._register_adapter(views_folder))
+        for view in tag_tree_view.models.MyView.select():
+            views_folder.children.append(
+                self._register_adapter(
+                    WidgetItemAdapterView(tag_tree_view, view), views_folder
+                )
+            )
+        if hasattr(tag_tree_view.models.MyObject, "rating"):
+            ratings_folder = WidgetItemAdapterFolder(tag_tree_view, "Ratings")
+            self._adapters_after_tags.append(self._register_adapter(ratings_folder))
+            for rating in range(5, -1, -1):
+                ratings_folder.children.append(
+                    self._register_adapter(
+                        WidgetItemAdapterRating(tag_tree_view, rating), ratings_folder
+                    )
+                )
+
+    def _register_adapter(
+        self,
+        adapter: WidgetItemAdapter,
+        parent_adapter: Optional[WidgetItemAdapter] = None,
+    ) -> WidgetItemAdapter:
+        adapter.internal_id = ADAPTER_INTERNAL_ID_BASE + len(self._adapters)
+        adapter.parent_adapter = parent_adapter
+        self._adapters.append(adapter)
+        self.widget_items[adapter.widget_item_id] = adapter
+        return adapter
+
+    def _load_widget_item_tag(
+        self, widget_item_id: types.WidgetItemId
+    ) -> WidgetItemAdapter:
+        tag_id = int(widget_item_id) if str(widget_item_id).isdigit() else None
+        row = self.store.get_row(tag_id) if tag_id is not None else None
+        if row is None:
+            raise KeyError(widget_item_id)
+        adapter_class = self._adapter_class_from_type[self.store.get_type(row)]
+        adapter = adapter_class(self._tag_tree_view, row)
+        self.widget_items[widget_item_id] = adapter
+        return adapter
+
+    def index(
+        self, row: int, column: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()
+    ) -> QtCore.QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            index = QtCore.QModelIndex()
+        elif not parent.isValid():
+            index = self._get_top_level_index(row)
+        elif self._is_tag_index(parent):
+            child_row = self.store.get_child_row(parent.internalId(), row)
+            index = self.createIndex(row, 0, child_row)
+        else:
+            parent_adapter = self._adapters[self._get_adapter_position(parent)]
+            index = self.createIndex(row, 0, parent_adapter.children[row].internal_id)
+        if column != 0 and index.isValid():
+            index = self.createIndex(row, column, index.internalId())
+        return index
+
+    def _get_top_level_index(self, row: int) -> QtCore.QModelIndex:
+        before_count = len(self._adapters_before_tags)
+        root_count = self.store.get_children_count(ROOT_ROW)
+        if row < before_count:
+            adapter = self._adapters_before_tags[row]
+            index = self.createIndex(row, 0, adapter.internal_id)
+        elif row < before_count + root_count:
+            tag_row = self.store.get_child_row(ROOT_ROW, row - before_count)
+            index = self.createIndex(row, 0, tag_row)
+        else:
+            adapter = self._adapters_after_tags[row - before_count - root_count]
+            index = self.createIndex(row, 0, adapter.internal_id)
+        return index
+
+    def parent(  # type: ignore  # pylint: disable=arguments-differ
+        self, index: Optional[QtCore.QModelIndex] = None
+    ) -> QtCore.QModelIndex:
+        if index is None:
+            # QObject.parent, hidden by the one of the item model.
+            return super().parent()
+        if not index.isValid():
+            parent_index = QtCore.QModelIndex()
+        elif self._is_tag_index(index):
+            parent_row = self.store.get_parent_row(index.internalId())
+            parent_index = self._get_tag_index(parent_row)
+        else:
+            adapter = self._adapters[self._get_adapter_position(index)]
+            parent_index = self.get_index(adapter.parent_adapter)
+        return parent_index
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.column() > 0:
+            row_count = 0
+        elif not parent.isValid():
+            row_count = (
+                len(self._adapters_before_tags)
+                + self.store.get_children_count(ROOT_ROW)
+                + len(self._adapters_after_tags)
+            )
+        elif self._is_tag_index(parent):
+            row_count = self.store.get_children_count(parent.internalId())
+        else:
+            row_count = len(self._adapters[self._get_adapter_position(parent)].children)
+        return row_count
+
+    def columnCount(
+        self, unused_parent: QtCore.QModelIndex = QtCore.QModelIndex()
+    ) -> int:
+        return 2
+
+    def data(
+        self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole
+    ) -> Any:
+        if not index.isValid():
+            value = None
+        elif index.column() == COUNTS_COLUMN:
+            value = self._get_counts_data(index, role)
+        elif role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            value = self._get_name(index)
+        elif role == QtCore.Qt.DecorationRole and self._is_folder(index):
+            value = self._folder_icon
+        else:
+            value = None
+        return value
+
+    def _get_counts_data(self, index: QtCore.QModelIndex, role: int) -> Any:
+        if role == QtCore.Qt.DisplayRole:
+            value = self._get_counts_text(index)
+        elif role == QtCore.Qt.TextAlignmentRole:
+            value = int(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+        else:
+            value = None
+        return value
+
+    def _get_counts_text(self, index: QtCore.QModelIndex) -> str:
+        # The counts are read without creating the adapters of the tags.
+        tag_counts = self._tag_tree_view.models.tag_counts
+        if self._is_tag_index(index):
+            tag_id = self.store.get_id(index.internalId())
+            counts_text = get_counts_text(tag_counts.get_counts(tag_id))
+        else:
+            adapter = self._adapters[self._get_adapter_position(index)]
+            rating_count = None
+            if isinstance(adapter, WidgetItemAdapterRating):
+                rating_count = tag_counts.get_rating_count(adapter.rating)
+            counts_text = "" if rating_count is None else str(rating_count)
+        return counts_text
+
+    def _get_name(self, index: QtCore.QModelIndex) -> str:
+        if self._is_tag_index(index):
+            name = self.store.get_name(index.internalId())
+        else:
+            name = self._adapters[self._get_adapter_position(index)].name
+        return name
+
+    def _is_folder(self, index: QtCore.QModelIndex) -> bool:
+        if self._is_tag_index(index):
+            is_folder = self.store.get_type(index.internalId()) == "folder"
+        else:
+            adapter = self._adapters[self._get_adapter_position(index)]
+            is_folder = isinstance(adapter, WidgetItemAdapterFolder)
+        return is_folder
+
+    def flags(self, index: QtCore.QModelIndex) -> QtCore.Qt.ItemFlags:
+        if not index.isValid():
+            flags = QtCore.Qt.NoItemFlags
+        else:
+            flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+            flags |= QtCore.Qt.ItemIsDragEnabled
+            if index.column() == 0 and self._is_renamable(index):
+                flags |= QtCore.Qt.ItemIsEditable
+        return flags
+
+    def _is_renamable(self, index: QtCore.QModelIndex) -> bool:
+        # The tags can always be renamed, without creating their adapter.
+        if self._is_tag_index(index):
+            is_renamable = True
+        else:
+            adapter = self._adapters[self._get_adapter_position(index)]
+            is_renamable = hasattr(adapter, "rename")
+        return is_renamable
+
+    def setData(
+        self, index: QtCore.QModelIndex, value: Any, role: int = QtCore.Qt.EditRole
+    ) -> bool:
+        widget_item = self.get_widget_item(index) if index.isValid() else None
+        is_renamed = role == QtCore.Qt.EditRole and hasattr(widget_item, "rename")
+        if is_renamed:
+            assert widget_item is not None
+            self.rename_widget_item(widget_item, str(value))
+        return is_renamed
+
+    @staticmethod
+    def _is_tag_index(index: QtCore.QModelIndex) -> bool:
+        return index.internalId() < ADAPTER_INTERNAL_ID_BASE
+
+    @staticmethod
+    def _get_adapter_position(index: QtCore.QModelIndex) -> int:
+        return index.internalId() - ADAPTER_INTERNAL_ID_BASE
+
+    def _get_tag_index(self, row: int) -> QtCore.QModelIndex:
+        if row == ROOT_ROW:
+            index = QtCore.QModelIndex()
+        else:
+            position = self.store.get_position(row)
+            position += self._get_position_offset(self.store.get_parent_row(row))
+            index = self.createIndex(position, 0, row)
+        return index
+
+    def _get_position_offset(self, parent_row: int) -> int:
+        # The tags at the root come after the "All" item.
+        offset = len(self._adapters_before_tags) if parent_row == ROOT_ROW else 0
+        return offset
+
+    def get_index(self, widget_item: Optional[WidgetItemAdapter]) -> QtCore.QModelIndex:
+        """
+        The index of the widget item, an invalid index for None.
+
+        Parameters
+        ----------
+        widget_item
+
+        """
+        if widget_item is None:
+            index = QtCore.QModelIndex()
+        elif isinstance(widget_item, WidgetItemAdapterTagBase):
+            index = self._get_tag_index(widget_item.row)
+        else:
+            index = self.createIndex(
+                self._get_adapter_row(widget_item), 0, widget_item.internal_id
+            )
+        return index
+
+    def _get_adapter_row(self, adapter: WidgetItemAdapter) -> int:
+        if adapter.parent_adapter is not None:
+            row = adapter.parent_adapter.children.index(adapter)
+        elif adapter in self._adapters_before_tags:
+            row = self._adapters_before_tags.index(adapter)
+        else:
+            row = (
+                len(self._adapters_before_tags)
+                + self.store.get_children_count(ROOT_ROW)
+                + self._adapters_after_tags.index(adapter)
+            )
+        return row
+
+    def get_widget_item(self, index: QtCore.QModelIndex) -> WidgetItemAdapter:
+        """
+        The adapter of the item at the index, created if needed.
+
+        Parameters
+        ----------
+        index
+
+        """
+        if self._is_tag_index(index):
+            widget_item = self.widget_items[str(self.store.get_id(index.internalId()))]
+        else:
+            widget_item = self._adapters[self._get_adapter_position(index)]
+        return widget_item
+
+    def insert_tag(self, tag: Tag) -> WidgetItemAdapter:
+        """
+        Inserts a new tag at its place among its siblings, and returns its adapter.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        store = self.store
+        parent_row = ROOT_ROW if tag.parent_id is None else store.get_row(tag.parent_id)
+        assert parent_row is not None
+        position = store.find_position(parent_row, tag.name)
+        row_inserted = position + self._get_position_offset(parent_row)
+        parent_index = self._get_tag_index(parent_row)
+        self.beginInsertRows(parent_index, row_inserted, row_inserted)
+        store.insert_tag(tag.id, parent_row, position, tag.name, tag.type)
+        self.endInsertRows()
+        widget_item = self.widget_items[str(tag.id)]
+        # The tag is already known, and doesn't need to be read again.
+        widget_item.tag = tag
+        return widget_item
+
+    def insert_adapter(
+        self, adapter: WidgetItemAdapter, parent_adapter: WidgetItemAdapter
+    ) -> None:
+        """
+        Appends the adapter of a new item, other than a tag, to the parent adapter.
+
+        Parameters
+        ----------
+        adapter
+        parent_adapter
+
+        """
+        row_inserted = len(parent_adapter.children)
+        parent_index = self.get_index(parent_adapter)
+        self.beginInsertRows(parent_index, row_inserted, row_inserted)
+        parent_adapter.children.append(self._register_adapter(adapter, parent_adapter))
+        self.endInsertRows()
+
+    def remove_widget_item(self, widget_item: WidgetItemAdapter) -> None:
+        """
+        Removes the item and all the items below it.
+
+        Parameters
+        ----------
+        widget_item
+
+        """
+        index = self.get_index(widget_item)
+        self.beginRemoveRows(index.parent(), index.row(), index.row())
+        if isinstance(widget_item, WidgetItemAdapterTagBase):
+            store = self.store
+            for row in store.get_subtree_rows(widget_item.row):
+                self.widget_items.pop(str(store.get_id(row)), None)
+            store.remove_tag(widget_item.row)
+        else:
+            assert widget_item.parent_adapter is not None
+            widget_item.parent_adapter.children.remove(widget_item)
+            self.widget_items.pop(widget_item.widget_item_id, None)
+        self.endRemoveRows()
+
+    def rename_widget_item(self, widget_item: WidgetItemAdapter, name: str) -> None:
+        """
+        Renames the item, and moves it to its new place among its siblings if they
+        are sorted by name.
+
+        Parameters
+        ----------
+        widget_item
+        name
+
+        """
+        widget_item.rename(name)  # type: ignore
+        if isinstance(widget_item, WidgetItemAdapterTagBase):
+            self._move_tag(widget_item.row, name)
+        index = self.get_index(widget_item)
+        self.dataChanged.emit(index, index)  # pylint: disable=no-member
+
+    def _move_tag(self, row: int, name: str) -> None:
+        store = self.store
+        parent_row = store.get_parent_row(row)
+        position_old = store.get_position(row)
+        position_new = store.find_position(parent_row, name, row)
+        if position_new == position_old:
+            store.rename_tag(row, name, position_new)
+            return
+        offset = self._get_position_offset(parent_row)
+        # Qt expects the destination as a row of the parent before the move.
+        destination = position_new + 1 if position_new > position_old else position_new
+        parent_index = self._get_tag_index(parent_row)
+        self.beginMoveRows(
+            parent_index,
+            position_old + offset,
+            position_old + offset,
+            parent_index,
+            destination + offset,
+        )
+        store.rename_tag(row, name, position_new)
+        self.endMoveRows()
+
+    def show_counts(self) -> None:
+        """Shows the counts of all items, once they have been loaded."""
+        # The counts of any item may have changed, the items themselves haven't.
+        self.layoutAboutToBeChanged.emit()  # pylint: disable=no-member
+        self.layoutChanged.emit()  # pylint: disable=no-member
+
+    def refresh_counts_after_drop(self, widget_item: WidgetItemAdapter) -> None:
+        """
+        Shows the counts updated by a drop on the item : its counts and the ones of
+        its ancestors, and the ones of the other ratings when rating my_objects.
+
+        Parameters
+        ----------
+        widget_item
+
+        """
+        index = self.get_index(widget_item)
+        parent_index = index.parent()
+        if isinstance(widget_item, WidgetItemAdapterRating):
+            first_row, last_row = 0, self.rowCount(parent_index) - 1
+        else:
+            first_row, last_row = index.row(), index.row()
+        self.dataChanged.emit(  # pylint: disable=no-member
+            self.index(first_row, COUNTS_COLUMN, parent_index),
+            self.index(last_row, COUNTS_COLUMN, parent_index),
+        )
+        while parent_index.isValid():
+            counts_index = parent_index.siblingAtColumn(COUNTS_COLUMN)
+            self.dataChanged.emit(  # pylint: disable=no-member
+                counts_index, counts_index
+            )
+            parent_index = parent_index.parent()
+
+
+class TagTreeDelegate(QtWidgets.QStyledItemDelegate):
+
+    """
+    Paints the items of a TagTreeView, highlighting the one hovered during a drag.
+
+    Parameters
+    ----------
+    config
+    tag_tree_view
+
+    """
+
+    def __init__(self, config: ConfigGallery, tag_tree_view: TagTreeView) -> None:
+        super().__init__(tag_tree_view)
+        self._tag_tree_view: TagTreeView = tag_tree_view
+        self._hovered_brush: QtGui.QBrush = QtGui.QBrush(
+            QtGui.QColor(config.hovered_background_color)
+        )
+
+    def paint(
+        self,
+        painter: QtGui.QPainter,
+        option: QtWidgets.QStyleOptionViewItem,
+        index: QtCore.QModelIndex,
+    ) -> None:
+        if index.siblingAtColumn(0) == self._tag_tree_view.hovered_index:
+            painter.fillRect(option.rect, self._hovered_brush)
+        super().paint(painter, option, index)
+
+
+# The QTreeView already has 8 ancestors itself, but not subclassing it is not an
+# option here...
+class TagTreeView(
+    TagTreeCountsMixin, QtWidgets.QTreeView, MyCustomGalleryWidget
+):  # pylint: disable = too-many-ancestors
+
+    """
+    The tag tree, as a QTreeView over a TagTreeModel.
+
+    It offers the same interface as the TagTreeWidget, its items being adapters with
+    the same interface as the widget items, and can be used instead of it by setting
+    the "tag_tree_engine" option to "view".
+
+    Attributes
+    ----------
+    tag_tree_model
+    hovered_index
+        The index of the item hovered during a drag, painted by the delegate.
+
+    Properties
+    ----------
+    widget_items
+
+    Methods
+    -------
+    redraw_tree
+    insert_widget_item_tag
+    insert_widget_item_view
+    remove_widget_item
+    rename_widget_item
+    start_rename_tag
+    refresh_counts
+    selectedItems
+
+    """
+
+    config: ConfigGallery
+
+    def __init__(self, parent: QtWidgets.QWidget) -> None:
+        super().__init__(parent)
+        self.tag_tree_model: TagTreeModel
+        self.hovered_index: QtCore.QPersistentModelIndex = (
+            QtCore.QPersistentModelIndex()
+        )
+
+    @classmethod
+    def create_tag_tree_widget(cls, parent: QtWidgets.QWidget) -> TagTreeView:
+        """
+        Factory method to create tag tree views.
+
+        Parameters
+        ----------
+        parent
+
+        """
+        # create_tag_tree_widget is a factory method, and should therefore be allowed
+        # to access protected members of the class.
+        # pylint: disable = protected-access
+        tag_tree_view = cls.create_widget(parent)
+        assert isinstance(tag_tree_view, cls)
+        tag_tree_view.tag_tree_model = TagTreeModel(tag_tree_view)
+        tag_tree_view.setModel(tag_tree_view.tag_tree_model)
+        tag_tree_view.setItemDelegate(
+            TagTreeDelegate(tag_tree_view.config, tag_tree_view)
+        )
+        tag_tree_view._init_columns()
+        tag_tree_view._init_tag_counts_runner(tag_tree_view.tag_tree_model.show_counts)
+        tag_tree_view.setEditTriggers(
+            QtWidgets.QAbstractItemView.DoubleClicked
+            | QtWidgets.QAbstractItemView.EditKeyPressed
+        )
+        tag_tree_view.redraw_tree()
+        return tag_tree_view
+
+    @property
+    def widget_items(self) -> WidgetItems:
+        """A dictionary mapping widget_item_id to their corresponding adapter."""
+        return self.tag_tree_model.widget_items
+
+    def redraw_tree(self) -> None:
+        """Reloads all the tags and views."""
+        self._set_hovered_index(QtCore.QModelIndex())
+        self.tag_tree_model.reload()
+        self._reload_counts()
+
+    def insert_widget_item_tag(self, tag: Tag) -> WidgetItemAdapter:
+        """
+        Inserts the item of a new tag among its siblings.
+
+        Parameters
+        ----------
+        tag
+
+        """
+        widget_item = self.tag_tree_model.insert_tag(tag)
+        return widget_item
+
+    def insert_widget_item_view(self, view: View) -> WidgetItemAdapter:
+        """
+        Inserts the item of a new view in the views folder.
+
+        Parameters
+        ----------
+        view
+
+        """
+        widget_item = WidgetItemAdapterView(self, view)
+        views_folder = self.widget_items["folder_Views"]
+        self.tag_tree_model.insert_adapter(widget_item, views_folder)
+        return widget_item
+
+    def remove_widget_item(self, widget_item: WidgetItemAdapter) -> None:
+        """
+        Removes the item and the items below it. The item must have been deleted
+        beforehand with its my_delete method.
+
+        Parameters
+        ----------
+        widget_item
+
+        """
+        self._set_hovered_index(QtCore.QModelIndex())
+        self.tag_tree_model.remove_widget_item(widget_item)
+        # Deleting a tag invalidates the counts.
+        self.refresh_counts()
+
+    def rename_widget_item(self, widget_item: WidgetItemAdapter, name: str) -> None:
+        """
+        Renames the item, and moves it to its new place among its siblings.
+
+        Parameters
+        ----------
+        widget_item
+        name
+
+        """
+        self.tag_tree_model.rename_widget_item(widget_item, name)
+
+    def start_rename_tag(self, widget_item: WidgetItemAdapter) -> None:
+        """
+        Opens the editor of the item, the renaming taking place when it is closed.
+
+        Parameters
+        ----------
+        widget_item
+
+        """
+        if hasattr(widget_item, "rename"):
+            index = self.tag_tree_model.get_index(widget_item)
+            self.scrollTo(index)
+            self.edit(index)
+
+    def selectedItems(self) -> List[WidgetItemAdapter]:
+        """The adapters of the items selected, named after QTreeWidget's method."""
+        tag_tree_model = self.tag_tree_model
+        # The rows are selected as a whole, with their counts.
+        selected_items = [
+            tag_tree_model.get_widget_item(index)
+            for index in self.selectedIndexes()
+            if index.column() == 0
+        ]
+        return selected_items
+
+    def _get_widget_item_at(
+        self, position: QtCore.QPoint
+    ) -> Optional[WidgetItemAdapter]:
+        index = self.indexAt(position)
+        if index.isValid():
+            widget_item = self.tag_tree_model.get_widget_item(index)
+        else:
+            widget_item = None
+        return widget_item
+
+    def contextMenuEvent(self, event: QtGui.QContextMenuEvent) -> None:
+        widget_item_hovered = self._get_widget_item_at(event.pos())
+        menu = TagMenu(self, widget_item_hovered)  # type: ignore
+        menu.exec_(self.mapToGlobal(event.pos()))
+
+    def startDrag(self, _: QtCore.Qt.DropActions) -> None:
+        drag_object = drag.DragFromTree(self)
+        drag_object.exec_()
+
+    def dragEnterEvent(  # pylint: disable=no-self-use
+        self, event: QtGui.QDragEnterEvent
+    ) -> None:
+        event.accept()
+
+    def dragMoveEvent(self, event: QtGui.QDragMoveEvent) -> None:
+        drag_object = self._get_drag_object()
+        assert drag_object is not None
+        drag_object.handle_move_on_tree(event)
+        # The whole row is hovered, whatever the column under the cursor.
+        self._set_hovered_index(self.indexAt(event.pos()).siblingAtColumn(0))
+
+    def dragLeaveEvent(self, event: QtGui.QDragLeaveEvent) -> None:
+        self._set_hovered_index(QtCore.QModelIndex())
+        super().dragLeaveEvent(event)
+
+    def dropEvent(self, _: QtGui.QDropEvent) -> None:
+        if self.hovered_index.isValid():
+            widget_item_hovered = self.tag_tree_model.get_widget_item(
+                QtCore.QModelIndex(self.hovered_index)
+            )
+            drag_object = self._get_drag_object()
+            assert drag_object is not None
+            drag_object.handle_drop_on_tree(widget_item_hovered)
+            self.tag_tree_model.refresh_counts_after_drop(widget_item_hovered)
+            self.refresh_counts()
+        self._set_hovered_index(QtCore.QModelIndex())
+
+    def _set_hovered_index(self, index: QtCore.QModelIndex) -> None:
+        # Only the items hovered before and after are repainted.
+        if index == self.hovered_index:
+            return
+        old_index = QtCore.QModelIndex(self.hovered_index)
+        self.hovered_index = QtCore.QPersistentModelIndex(index)
+        for index_changed in (old_index, index):
+            if index_changed.isValid():
+                self.viewport().update(self.visualRect(index_changed))
+                counts_index = index_changed.siblingAtColumn(COUNTS_COLUMN)
+                self.viewport().update(self.visualRect(counts_index))
+
+    def get_main_widget(self) -> main_widget.MainWidget:
+        """Gets the main widget."""
+        return self.get_ancestor_by_class(main_widget.MainWidget)
+
+    def _get_drag_object(self) -> drag.MyDrag:
+        my_main_widget = self.get_main_widget()
+        drag_object = my_main_widget.drag_object
+        return drag_object
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The ThumbnailCache class, a process-wide LRU cache of the thumbnails already scaled
+ to a cell dimension, and its associated CacheStatistics.
+
+ The get_thumbnail_cache function, giving access to the process-wide cache.
+
+ The ThumbnailDiskCache class, a persistent cache of the thumbnails pre-scaled for
+ each cell dimension, filled as the thumbnails are loaded.
+
+ The get_thumbnail_disk_cache function, giving access to the process-wide disk cache.
+
+The memory cache is bounded by a byte budget rather than by a number of thumbnails,
+since the memory used by a thumbnail depends on the cell dimension. Thumbnails are
+keyed by (path, cell dimension), so that a lookup never touches the disk, the cache
+being looked up each time a cell is painted. A thumbnail modified on disk is only
+picked up when it is loaded again, the source being checked by the worker threads.
+
+The disk cache stores one small PNG file per source thumbnail and cell size, in a
+folder per cell size. The mtime and size of the source are written in the PNG
+metadata, and a cached file is only used if they still match the source. The disk
+cache is bounded by a byte budget as well : the least recently written files are
+removed on the first write of a session, and then each time a fraction of the budget
+has been written.
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PySide6 import QtCore, QtGui
+
+from gallery.config_gallery.config_gallery import CellDimension, ConfigGallery
+
+CacheKey = Tuple[str, CellDimension]
+
+BYTES_PER_MEGABYTE: int = 1024 * 1024
+
+DISK_EVICTION_FRACTION: int = 10
+"""The disk cache is trimmed each time 1/DISK_EVICTION_FRACTION of its byte budget has
+been written."""
+
+TEMPORARY_SUFFIX: str = ".tmp.png"
+"""The suffix of the files of the disk cache being written."""
+
+SOURCE_MTIME_KEY: str = "source_mtime"
+SOURCE_SIZE_KEY: str = "source_size"
+"""The PNG metadata keys used to validate the files of the disk cache."""
+
+_thumbnail_cache: Optional[ThumbnailCache] = None  # pylint: disable=invalid-name
+
+_thumbnail_disk_cache: Optional[ThumbnailDiskCache] = None  # pylint: disable=invalid-name
+
+
+def get_thumbnail_cache(byte_budget: int) -> ThumbnailCache:
+    """
+    Returns the process-wide thumbnail cache, creating it if needed.
+
+    The cache is shared by all tabs of all main widgets. If the cache already exists,
+    its byte budget is updated.
+
+    Parameters
+    ----------
+    byte_budget
+        The maximum number of bytes used by the thumbnails in the cache.
+
+    """
+    global _thumbnail_cache  # pylint: disable=global-statement
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache(byte_budget)
+    else:
+        _thumbnail_cache.set_byte_budget(byte_budget)
+    return _thumbnail_cache
+
+
+@dataclass(frozen=True)
+class CacheStatistics:
+
+    """
+    Statistics about the use of the ThumbnailCache.
+
+    Attributes
+    ----------
+    hits
+    misses
+    thumbnails_qty
+    bytes_used
+    byte_budget
+
+    """
+
+    hits: int
+    misses: int
+    thumbnails_qty: int
+    bytes_used: int
+    byte_budget: int
+
+    @property
+    def hit_rate(self) -> float:
+        """The proportion of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        megabytes_used = self.bytes_used / BYTES_PER_MEGABYTE
+        megabytes_budget = self.byte_budget / BYTES_PER_MEGABYTE
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%}), "
+            f"{self.thumbnails_qty} thumbnails, "
+            f"{megabytes_used:.1f}/{megabytes_budget:.1f} MB"
+        )
+
+
+class ThumbnailCache:
+
+    """
+    LRU cache of the thumbnails, scaled to a cell dimension, bounded by a byte budget.
+
+    Parameters
+    ----------
+    byte_budget
+
+    Methods
+    -------
+    get
+    contains
+    put
+    set_byte_budget
+    clear
+    get_statistics
+
+    Warning
+    -------
+    QPixmap can only be used in the GUI thread, and so can the cache.
+
+    """
+
+    def __init__(self, byte_budget: int) -> None:
+        self._byte_budget: int = byte_budget
+        self._bytes_used: int = 0
+        self._pixmaps: OrderedDict[CacheKey, QtGui.QPixmap] = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def get(self, path: Path, cell_dimension: CellDimension) -> Optional[QtGui.QPixmap]:
+        """
+        Returns the thumbnail at path for the cell dimension, None if it isn't cached.
+
+        Parameters
+        ----------
+        path
+        cell_dimension
+
+        """
+        key = _get_key(path, cell_dimension)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._hits += 1
+            self._pixmaps.move_to_end(key)
+        else:
+            self._misses += 1
+        return pixmap
+
+    def contains(self, path: Path, cell_dimension: CellDimension) -> bool:
+        """
+        Whether the thumbnail at path for the cell dimension is cached, without
+        counting it as a hit or a miss, nor marking it as recently used.
+
+        Parameters
+        ----------
+        path
+        cell_dimension
+
+        """
+        key = _get_key(path, cell_dimension)
+        return key in self._pixmaps
+
+    def put(
+        self, path: Path, cell_dimension: CellDimension, pixmap: QtGui.QPixmap
+    ) -> None:
+        """
+        Adds the thumbnail at path for the cell dimension, replacing the previous one,
+        and evicting the least recently used thumbnails if the byte budget is exceeded.
+
+        Parameters
+        ----------
+        path
+        cell_dimension
+        pixmap
+
+        """
+        if pixmap.isNull():
+            return
+        key = _get_key(path, cell_dimension)
+        self._remove(key)
+        self._pixmaps[key] = pixmap
+        self._bytes_used += _get_pixmap_bytes(pixmap)
+        self._evict()
+
+    def set_byte_budget(self, byte_budget: int) -> None:
+        """Changes the byte budget, evicting thumbnails if needed."""
+        self._byte_budget = byte_budget
+        self._evict()
+
+    def clear(self) -> None:
+        """Removes all thumbnails from the cache, and resets the statistics."""
+        self._pixmaps.clear()
+        self._bytes_used = 0
+        self._hits = 0
+        self._misses = 0
+
+    def get_statistics(self) -> CacheStatistics:
+        """Returns the hit/miss statistics and the memory used by the cache."""
+        statistics = CacheStatistics(
+            hits=self._hits,
+            misses=self._misses,
+            thumbnails_qty=len(self._pixmaps),
+            bytes_used=self._bytes_used,
+            byte_budget=self._byte_budget,
+        )
+        return statistics
+
+    def _remove(self, key: CacheKey) -> None:
+        pixmap = self._pixmaps.pop(key, None)
+        if pixmap is not None:
+            self._bytes_used -= _get_pixmap_bytes(pixmap)
+
+    def _evict(self) -> None:
+        while self._pixmaps and self._bytes_used > self._byte_budget:
+            unused_key, pixmap = self._pixmaps.popitem(last=False)
+            self._bytes_used -= _get_pixmap_bytes(pixmap)
+
+
+def _get_key(path: Path, cell_dimension: CellDimension) -> CacheKey:
+    key = (str(path), cell_dimension)
+    return key
+
+
+def _get_pixmap_bytes(pixmap: QtGui.QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class ThumbnailDiskCache:
+
+    """
+    Persistent cache of the thumbnails, pre-scaled to the size of the cells.
+
+    The cache can be used from the worker threads loading the thumbnails : files are
+    written under a temporary name, then renamed, so that a file is never read while
+    partially written.
+
+    Parameters
+    ----------
+    folder
+    byte_budget
+
+    Attributes
+    ----------
+    folder
+    byte_budget
+
+    Methods
+    -------
+    read
+    write
+    evict
+
+    """
+
+    def __init__(self, folder: Path, byte_budget: int) -> None:
+        self.folder: Path = folder
+        self.byte_budget: int = byte_budget
+        # Counted as a whole budget, so that the first write trims the files left by
+        # the previous sessions.
+        self._bytes_written: int = byte_budget
+        self._lock: threading.Lock = threading.Lock()
+
+    def read(self, path: Path, size: QtCore.QSize) -> QtGui.QImage:
+        """
+        Returns the cached thumbnail of the source at path for the cell size, a null
+        QImage if there is none or if the source has changed since it was cached.
+
+        Parameters
+        ----------
+        path
+        size
+
+        """
+        cache_path = self._get_cache_path(path, size)
+        reader = QtGui.QImageReader(str(cache_path))
+        source_stamp = _get_source_stamp(path)
+        is_valid = source_stamp is not None and source_stamp == (
+            reader.text(SOURCE_MTIME_KEY),
+            reader.text(SOURCE_SIZE_KEY),
+        )
+        thumbnail = reader.read() if is_valid else QtGui.QImage()
+        return thumbnail
+
+    def write(self, path: Path, size: QtCore.QSize, thumbnail: QtGui.QImage) -> None:
+        """
+        Stores the thumbnail of the source at path, scaled for the cell size, and
+        removes the least recently written thumbnails if needed.
+
+        Parameters
+        ----------
+        path
+        size
+        thumbnail
+
+        """
+        source_stamp = _get_source_stamp(path)
+        if source_stamp is None or thumbnail.isNull():
+            return
+        cache_path = self._get_cache_path(path, size)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = cache_path.with_name(
+            f"{cache_path.stem}.{threading.get_ident()}{TEMPORARY_SUFFIX}"
+        )
+        thumbnail = QtGui.QImage(thumbnail)
+        thumbnail.setText(SOURCE_MTIME_KEY, source_stamp[0])
+        thumbnail.setText(SOURCE_SIZE_KEY, source_stamp[1])
+        if thumbnail.save(str(temporary_path), "PNG"):
+            bytes_written = temporary_path.stat().st_size
+            os.replace(temporary_path, cache_path)
+            self._count_bytes_written(bytes_written)
+
+    def _count_bytes_written(self, bytes_written: int) -> None:
+        with self._lock:
+            self._bytes_written += bytes_written
+            is_eviction_needed = (
+                self._bytes_written * DISK_EVICTION_FRACTION >= self.byte_budget
+            )
+            if is_eviction_needed:
+                self._bytes_written = 0
+        if is_eviction_needed:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Removes the least recently written thumbnails, until the cache fits in its
+        byte budget. Returns the number of thumbnails removed.
+
+        The whole folder is scanned, which should be done off the GUI thread.
+
+        """
+        cache_files = []
+        for cache_path in self.folder.glob("*/*/*.png"):
+            if cache_path.name.endswith(TEMPORARY_SUFFIX):
+                continue
+            try:
+                stat = cache_path.stat()
+            except OSError:
+                # Removed in the meantime, for instance by another eviction.
+                continue
+            cache_files.append((stat.st_mtime_ns, stat.st_size, cache_path))
+        cache_files.sort()
+        bytes_used = sum(size for unused_mtime, size, unused_path in cache_files)
+        removed = 0
+        for unused_mtime, size, cache_path in cache_files:
+            if bytes_used <= self.byte_budget:
+                break
+            try:
+                cache_path.unlink()
+            except OSError:
+                continue
+            bytes_used -= size
+            removed += 1
+        return removed
+
+    def _get_cache_path(self, path: Path, size: QtCore.QSize) -> Path:
+        path_hash = hashlib.sha1(str(path.absolute()).encode()).hexdigest()
+        size_folder = f"{size.width()}x{size.height()}"
+        return self.folder / size_folder / path_hash[:2] / f"{path_hash}.png"
+
+
+def _get_source_stamp(path: Path) -> Optional[Tuple[str, str]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        source_stamp = None
+    else:
+        source_stamp = (str(stat.st_mtime_ns), str(stat.st_size))
+    return source_stamp
+
+
+def get_thumbnail_disk_cache(config: ConfigGallery) -> Optional[ThumbnailDiskCache]:
+    """
+    Returns the process-wide disk cache configured, None if it is disabled.
+
+    The disk cache is shared by all tabs of all main widgets, so that they share its
+    byte budget. If the cache already exists in the configured folder, its byte
+    budget is updated.
+
+    Parameters
+    ----------
+    config
+
+    """
+    global _thumbnail_disk_cache  # pylint: disable=global-statement
+    folder = config.thumbnail_disk_cache_folder
+    byte_budget = config.thumbnail_disk_cache_bytes
+    if folder is None:
+        disk_cache = None
+    elif _thumbnail_disk_cache is None or _thumbnail_disk_cache.folder != folder:
+        _thumbnail_disk_cache = ThumbnailDiskCache(folder, byte_budget)
+        disk_cache = _thumbnail_disk_cache
+    else:
+        _thumbnail_disk_cache.byte_budget = byte_budget
+        disk_cache = _thumbnail_disk_cache
+    return disk_cache
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The ThumbnailLoader class, and its associated ThumbnailLoaderSignals.
+
+ The ThumbnailJob class, decoding a single thumbnail on a worker thread, and its
+ associated ThumbnailJobSignals.
+
+Thumbnails are decoded as QImage (QPixmap can only be used in the GUI thread) on the
+global QThreadPool, at the size of the cell they are displayed in, thanks to
+QImageReader.setScaledSize. The result is sent back to the GUI thread through a signal.
+
+When a ThumbnailDiskCache is given, thumbnails already pre-scaled for the cell size are
+read from it, and the ones decoded from the source are added to it.
+
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Optional, Set
+
+from PySide6 import QtCore, QtGui
+
+from gallery.widgets.thumbnail_cache import ThumbnailDiskCache
+
+PRIORITY_VISIBLE: int = 1
+"""The thread pool priority of the thumbnails displayed."""
+
+PRIORITY_PREFETCH: int = 0
+"""The thread pool priority of the thumbnails prefetched, about to be displayed."""
+
+
+class ThumbnailLoader(QtCore.QObject):
+
+    """
+    Loads thumbnails asynchronously, and allows to cancel the loadings that are not
+    needed anymore.
+
+    Each request is identified by a key (typically the id of the my_object), and the
+    thumbnail is delivered through the signals.loaded signal.
+
+    Parameters
+    ----------
+    parent
+    disk_cache
+
+    Attributes
+    ----------
+    signals
+
+    Methods
+    -------
+    request
+    is_pending
+    cancel
+    cancel_all_except
+    cancel_all
+
+    """
+
+    def __init__(
+        self,
+        parent: QtCore.QObject,
+        disk_cache: Optional[ThumbnailDiskCache] = None,
+    ) -> None:
+        super().__init__(parent)
+        self.signals: ThumbnailLoaderSignals = ThumbnailLoaderSignals()
+        self._disk_cache: Optional[ThumbnailDiskCache] = disk_cache
+        self._thread_pool: QtCore.QThreadPool = QtCore.QThreadPool.globalInstance()
+        self._jobs: Dict[Hashable, ThumbnailJob] = {}
+        self._jobs_alive: Set[ThumbnailJob] = set()
+        """All jobs not finished yet, including the cancelled ones still running,
+        which must not be garbage collected."""
+        self._jobs_signals: ThumbnailJobSignals = ThumbnailJobSignals()
+        self._jobs_signals.done.connect(self._handle_job_done)  # type: ignore
+
+    def request(
+        self,
+        key: Hashable,
+        path: Path,
+        size: QtCore.QSize,
+        priority: int = PRIORITY_VISIBLE,
+    ) -> None:
+        """
+        Starts loading the thumbnail at path, scaled to fit in size.
+
+        If a loading with the same key and size is already pending, it is only given
+        the higher priority if it hasn't started yet.
+
+        Parameters
+        ----------
+        key
+        path
+        size
+        priority
+
+        """
+        job = self._jobs.get(key)
+        if job is not None and job.size == size:
+            self._raise_priority(job, priority)
+            return
+        self.cancel(key)
+        job = ThumbnailJob(key, path, size, self._jobs_signals, self._disk_cache)
+        job.priority = priority
+        self._jobs[key] = job
+        self._jobs_alive.add(job)
+        self._thread_pool.start(job, priority)
+
+    def _raise_priority(self, job: ThumbnailJob, priority: int) -> None:
+        if priority > job.priority and self._thread_pool.tryTake(job):
+            job.priority = priority
+            self._thread_pool.start(job, priority)
+
+    def is_pending(self, key: Hashable) -> bool:
+        """Whether a loading is pending for the key."""
+        return key in self._jobs
+
+    def cancel(self, key: Hashable) -> None:
+        """Cancels the loading for the key, if there is one."""
+        job = self._jobs.pop(key, None)
+        if job is not None:
+            # A job that has already started can't be taken back from the pool, and
+            # is only forgotten once done.
+            job.is_cancelled = True
+            if self._thread_pool.tryTake(job):
+                self._jobs_alive.discard(job)
+
+    def cancel_all_except(self, keys_to_keep: Iterable[Hashable]) -> None:
+        """Cancels all loadings, except the ones for the keys to keep."""
+        keys_to_keep = set(keys_to_keep)
+        keys_to_cancel = [key for key in self._jobs if key not in keys_to_keep]
+        for key in keys_to_cancel:
+            self.cancel(key)
+
+    def cancel_all(self) -> None:
+        """Cancels all loadings."""
+        self.cancel_all_except(())
+
+    def _handle_job_done(self, job: ThumbnailJob, thumbnail: QtGui.QImage) -> None:
+        self._jobs_alive.discard(job)
+        if not job.is_cancelled:
+            del self._jobs[job.key]
+            self.signals.loaded.emit(job.key, job.size, thumbnail)  # type: ignore
+
+
+class ThumbnailJob(QtCore.QRunnable):
+
+    """
+    Decodes a single thumbnail, directly at the size needed.
+
+    Parameters
+    ----------
+    key
+    path
+    size
+    signals
+    disk_cache
+
+    Attributes
+    ----------
+    key
+    path
+    size
+    priority
+    is_cancelled
+
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        path: Path,
+        size: QtCore.QSize,
+        signals: ThumbnailJobSignals,
+        disk_cache: Optional[ThumbnailDiskCache] = None,
+    ) -> None:
+        super().__init__()
+        # The loader keeps track of the job, and must be the one to delete it.
+        self.setAutoDelete(False)
+        self.key: Hashable = key
+        self.path: Path = path
+        self.size: QtCore.QSize = size
+        self.priority: int = PRIORITY_VISIBLE
+        self.is_cancelled: bool = False
+        self._signals: ThumbnailJobSignals = signals
+        self._disk_cache: Optional[ThumbnailDiskCache] = disk_cache
+
+    def run(self) -> None:
+        if self.is_cancelled:
+            thumbnail = QtGui.QImage()
+        else:
+            thumbnail = read_thumbnail(self.path, self.size, self._disk_cache)
+        self._signals.done.emit(self, thumbnail)  # type: ignore
+
+
+def read_thumbnail(
+    path: Path, size: QtCore.QSize, disk_cache: Optional[ThumbnailDiskCache] = None
+) -> QtGui.QImage:
+    """
+    Reads the thumbnail at path for the cell size, from the disk cache if possible.
+
+    The disk cache is filled with the thumbnails it doesn't hold yet. A null QImage is
+    returned if the file can't be read.
+
+    Parameters
+    ----------
+    path
+    size
+    disk_cache
+
+    """
+    thumbnail = disk_cache.read(path, size) if disk_cache else QtGui.QImage()
+    if thumbnail.isNull():
+        thumbnail = read_scaled_image(path, size)
+        if disk_cache is not None:
+            disk_cache.write(path, size, thumbnail)
+    return thumbnail
+
+
+def read_scaled_image(path: Path, size: QtCore.QSize) -> QtGui.QImage:
+    """
+    Reads the image at path, scaled to fit in size while keeping its aspect ratio.
+
+    When the image format allows it, the image is decoded directly at the reduced size,
+    instead of being decoded at full size and scaled afterwards. A null QImage is
+    returned if the file can't be read.
+
+    Parameters
+    ----------
+    path
+    size
+
+    """
+    reader = QtGui.QImageReader(str(path))
+    reader.setAutoTransform(True)
+    original_size = reader.size()
+    if original_size.isValid():
+        reader.setScaledSize(original_size.scaled(size, QtCore.Qt.KeepAspectRatio))
+    thumbnail = reader.read()
+    if not original_size.isValid() and not thumbnail.isNull():
+        thumbnail = thumbnail.scaled(size, QtCore.Qt.KeepAspectRatio)
+    return thumbnail
+
+
+class ThumbnailLoaderSignals(QtCore.QObject):  # pylint: disable=too-few-public-methods
+
+    """
+    Collection of signals used by the ThumbnailLoader.
+
+    Class Attributes
+    ----------------
+    loaded
+
+    """
+
+    loaded: QtCore.Signal = QtCore.Signal(object, QtCore.QSize, QtGui.QImage)
+    """A signal emitted when a thumbnail has been loaded. The parameters are
+    (key, size, thumbnail). The thumbnail is a null QImage if it couldn't be read."""
+
+
+class ThumbnailJobSignals(QtCore.QObject):  # pylint: disable=too-few-public-methods
+
+    # Only a QObject can hold signals, which is why we need a QObject subclass as an
+    # intermediate attribute of the QRunnable to which we want to attach those signals.
+
+    """
+    Collection of signals used by the ThumbnailJob.
+
+    Class Attributes
+    ----------------
+    done
+
+    """
+
+    done: QtCore.Signal = QtCore.Signal(object, QtGui.QImage)
+    """A signal emitted from the worker thread when a job is done, cancelled or not.
+    The parameters are (job, thumbnail)."""
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The WidgetItemMixin base class, and its derived classes WidgetItemTagMixin,
+ WidgetItemTagDropMixin, WidgetItemRatingMixin, WidgetItemAllMixin and
+ WidgetItemViewMixin.
+
+The mixins hold the behaviour of the widget items which doesn't depend on how the tag
+tree is drawn : the my_objects of the item, what a drop on it does, renaming and
+deleting it. They are shared by the widget items of the TagTreeWidget and by the
+adapters of the TagTreeView, which only add how they are displayed.
+
+"""
+
+from __future__ import annotations
+
+from typing import Hashable, List, Optional
+
+import peewee
+
+import gallery.types as types
+from gallery.models.gallery_models import GalleryModels
+from gallery.models.tags import Tag
+from gallery.models.views import View
+from gallery.widgets.query import QueryParameters
+
+
+class WidgetItemMixin:
+
+    """
+    Base class of the mixins of the widget items.
+
+    Instance Attributes
+    -------------------
+    widget_item_id
+    name
+    models
+    accepts_drop
+    is_droppable
+
+    """
+
+    widget_item_id: types.WidgetItemId
+    name: str
+    models: GalleryModels
+
+    @property
+    def is_droppable(self) -> bool:
+        """Whether the widget item can be dropped on the grid."""
+        is_droppable = hasattr(self, "get_my_objects")
+        return is_droppable
+
+    @property
+    def accepts_drop(self) -> bool:
+        """Whether the widget item accepts a drop from the grid."""
+        accepts_drop = hasattr(self, "handle_drop_on_self")
+        return accepts_drop
+
+
+class WidgetItemTagMixin(WidgetItemMixin):
+
+    """
+    Behaviour of the widget items based on a tag (either a "real" tag or a folder).
+
+    Instance Attributes
+    -------------------
+    tag
+
+    """
+
+    tag: Tag
+
+    def get_my_objects(self) -> types.MyObjectSet:
+        """Gets the objects tagged with the widget item tag."""
+        my_objects = self.tag.get_my_objects_with_descendants()
+        return my_objects
+
+    def select_my_objects_ids(self) -> peewee.Select:
+        """A query returning the ids of the objects tagged with the widget item tag."""
+        my_objects_ids = self.tag.select_my_objects_ids_with_descendants()
+        return my_objects_ids
+
+    def get_my_objects_ids_among(
+        self, my_objects_ids: types.MyObjectIdSet
+    ) -> types.MyObjectIdSet:
+        """The ids of the objects tagged with the widget item tag among the given ones."""
+        MyObjectTag = self.models.MyObjectTag
+        my_objects_ids_among = self.models.get_my_objects_ids_among(
+            my_objects_ids,
+            lambda batch: self.select_my_objects_ids().where(
+                MyObjectTag.my_object.in_(batch)
+            ),
+        )
+        return my_objects_ids_among
+
+    def rename(self, name: str) -> None:
+        """
+        Renames the widget item and its tag.
+
+        Parameters
+        ----------
+        name
+
+        """
+        self.name = name
+        self.tag.name = name
+        self.tag.save()
+
+    def my_delete(self) -> None:
+        """Deletes the tag and all its descendants."""
+        self.tag.delete_self_and_children()
+
+
+class WidgetItemTagDropMixin(WidgetItemTagMixin):
+
+    """Behaviour of the widget items based on a "real" tag, which accept drops."""
+
+    def handle_drop_on_self(
+        self, my_objects_ids: List[types.MyObjectId], remove: bool
+    ) -> None:
+        """
+        Adds or removes a tag from the my_objects with the ids my_objects_ids.
+
+        Whether the tag is added or removed is based on whether the Shift key is
+        being pressed at the moment of the drop. All my_objects are tagged or untagged
+        in a single transaction.
+
+        Parameters
+        ----------
+        my_objects_ids
+        remove
+
+        """
+        if remove:
+            self.tag.remove_my_objects(my_objects_ids)
+        else:
+            self.tag.add_my_objects(my_objects_ids)
+
+
+class WidgetItemRatingMixin(WidgetItemMixin):
+
+    """
+    Behaviour of the widget items based on a rating.
+
+    Instance Attributes
+    -------------------
+    rating
+
+    """
+
+    rating: int
+
+    @staticmethod
+    def _get_name_from_rating(rating: int) -> str:
+        name = WidgetItemRatingMixin._get_base_name_from_rating(rating)
+        name = WidgetItemRatingMixin._add_s_to_plural(name, rating)
+        return name
+
+    @staticmethod
+    def _get_base_name_from_rating(rating: int) -> str:
+        if rating == 0:
+            name = "Non noté"
+        else:
+            name = f"{rating} étoile"
+        return name
+
+    @staticmethod
+    def _add_s_to_plural(name: str, rating: int) -> str:
+        if rating > 1:
+            name += "s"
+        return name
+
+    def get_my_objects(self) -> types.MyObjectSet:
+        """Gets all objects rated with its rating."""
+        MyObject = self.models.MyObject
+        my_objects = set(MyObject.select().where(MyObject.rating == self.rating))
+        return my_objects
+
+    def select_my_objects_ids(self) -> peewee.Select:
+        """A query returning the ids of all objects rated with its rating."""
+        MyObject = self.models.MyObject
+        my_objects_ids = MyObject.select(MyObject.id).where(
+            MyObject.rating == self.rating
+        )
+        return my_objects_ids
+
+    def get_my_objects_ids_among(
+        self, my_objects_ids: types.MyObjectIdSet
+    ) -> types.MyObjectIdSet:
+        """The ids of the objects rated with its rating among the given ones."""
+        MyObject = self.models.MyObject
+        my_objects_ids_among = self.models.get_my_objects_ids_among(
+            my_objects_ids,
+            lambda batch: self.select_my_objects_ids().where(MyObject.id.in_(batch)),
+        )
+        return my_objects_ids_among
+
+    def handle_drop_on_self(
+        self, my_objects_ids: List[types.MyObjectId], unused_remove: bool
+    ) -> None:
+        """
+        Rates the my_objects with its rating.
+
+        The remove parameter is not used. To "unrate" a my_object, it must instead be
+        dropped on the widget item corresponding to the rating 0.
+
+        """
+        self.models.rate_my_objects(my_objects_ids, self.rating)
+
+
+class WidgetItemAllMixin(WidgetItemMixin):
+
+    """Behaviour of the widget items associated with all objects in the database."""
+
+    def get_my_objects(self) -> types.MyObjectSet:
+        """Gets all objects from the database."""
+        my_objects = set(self.models.MyObject.select())
+        return my_objects
+
+    def select_my_objects_ids(self) -> peewee.Select:
+        """A query returning the ids of all objects from the database."""
+        MyObject = self.models.MyObject
+        my_objects_ids = MyObject.select(MyObject.id)
+        return my_objects_ids
+
+    def get_my_objects_ids_among(
+        self, my_objects_ids: types.MyObjectIdSet
+    ) -> types.MyObjectIdSet:
+        """The ids among the given ones still present in the database."""
+        MyObject = self.models.MyObject
+        my_objects_ids_among = self.models.get_my_objects_ids_among(
+            my_objects_ids,
+            lambda batch: self.select_my_objects_ids().where(MyObject.id.in_(batch)),
+        )
+        return my_objects_ids_among
+
+
+class WidgetItemViewMixin(WidgetItemMixin):
+
+    """
+    Behaviour of the widget items associated with a view.
+
+    The widget items must define a treeWidget method, returning the tag tree holding
+    them, from which the query parameters of the view are created.
+
+    Instance Attributes
+    -------------------
+    view
+
+    """
+
+    view: View
+    _query_parameters: QueryParameters
+
+    @staticmethod
+    def get_id(view: View) -> str:
+        """The view's id is view_{view.id}."""
+        return f"view_{view.id}"
+
+    def _create_query_parameters(self) -> QueryParameters:
+        tag_tree_widget = self.treeWidget()  # type: ignore  # pylint: disable=no-member
+        query_string = self.view.query_string
+        query_parameters = QueryParameters.create_from_string(
+            query_string, tag_tree_widget
+        )
+        return query_parameters
+
+    def _get_query_parameters(self) -> QueryParameters:
+        if not hasattr(self, "_query_parameters"):
+            self._set_query_parameters()
+        return self._query_parameters
+
+    def _set_query_parameters(self) -> None:
+        query_parameters = self._create_query_parameters()
+        query_parameters.refresh_my_objects()
+        self._query_parameters = query_parameters
+
+    def get_my_objects(self) -> types.MyObjectSet:
+        """Gets objects associated with the view's query parameters."""
+        my_objects_ids = self.get_my_objects_ids()
+        my_objects_by_ids = self.models.get_my_objects_by_ids(my_objects_ids)
+        my_objects = set(my_objects_by_ids.values())
+        return my_objects
+
+    def get_my_objects_ids(self) -> types.MyObjectIdSet:
+        """Gets the ids of the objects associated with the view's query parameters."""
+        # The result is served from the result cache unless something has been
+        # written since the last evaluation.
+        query_parameters = self._get_query_parameters()
+        my_objects_ids = set(query_parameters.get_my_objects_ids())
+        return my_objects_ids
+
+    def get_my_objects_ids_among(
+        self, my_objects_ids: types.MyObjectIdSet
+    ) -> types.MyObjectIdSet:
+        """
+        The ids of the objects associated with the view's query parameters, among the
+        given ones.
+        """
+        query_parameters = self._get_query_parameters()
+        my_objects_ids_among = query_parameters.get_my_objects_ids_among(my_objects_ids)
+        return my_objects_ids_among
+
+    def select_my_objects_ids(self) -> Optional[peewee.Select]:
+        """
+        A query returning the ids of the objects associated with the view's query
+        parameters, or None if one of those parameters can't be compiled into SQL.
+        """
+        query_parameters = self._create_query_parameters()
+        my_objects_ids = query_parameters.compile_query()
+        return my_objects_ids
+
+    def get_result_dependencies(self) -> List[Hashable]:
+        """
+        The keys of the result of the view's query parameters, and of the results it
+        depends on.
+        """
+        # The result of the query parameters isn't cached when they are compiled
+        # into the SQL of another query, hence the widget items they depend on.
+        query_parameters = self._get_query_parameters()
+        dependencies = [query_parameters.get_result_key()]
+        dependencies += query_parameters.get_result_dependencies()
+        return dependencies
+
+    def rename(self, name: str) -> None:
+        """Rename the view."""
+        self.name = name
+        self.view.name = name
+        self.view.save()
+
+    def my_delete(self) -> None:
+        """Deletes the view."""
+        self.view.delete_instance()
+        self.models.write_notifier.notify_view_deleted(self.widget_item_id)
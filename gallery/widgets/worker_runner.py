@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+Defines :
+ The WorkerRunner base class, running a single job at a time on the global
+ QThreadPool.
+
+ The WorkerJob base class, computing a result on a worker thread, and its associated
+ WorkerJobSignals.
+
+A new job supersedes the pending one : the pending job is taken back from the pool if
+it hasn't started yet, or cancelled and its result ignored otherwise. The result of the
+job is sent back to the GUI thread through a signal, along with the write generation
+of the data when the job was created, for the runner to compute it again if the data
+was written to in the meantime.
+
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional, Set
+
+from PySide6 import QtCore
+
+
+class WorkerRunner(QtCore.QObject):
+
+    """
+    Runs the jobs of its derived class one at a time, keeping the ones still running
+    alive until they are done.
+
+    Derived classes create the jobs with the jobs_signals of the runner, start them
+    with _start_job, and handle their results in _handle_result.
+
+    Parameters
+    ----------
+    parent
+
+    Methods
+    -------
+    cancel
+
+    """
+
+    def __init__(self, parent: QtCore.QObject) -> None:
+        super().__init__(parent)
+        self._thread_pool: QtCore.QThreadPool = QtCore.QThreadPool.globalInstance()
+        self._job: Optional[WorkerJob] = None
+        self._jobs_alive: Set[WorkerJob] = set()
+        """All jobs not finished yet, including the cancelled ones still running,
+        which must not be garbage collected."""
+        self._jobs_signals: WorkerJobSignals = WorkerJobSignals()
+        self._jobs_signals.done.connect(self._handle_job_done)  # type: ignore
+
+    def _start_job(self, job: WorkerJob, priority: int) -> None:
+        self._job = job
+        self._jobs_alive.add(job)
+        self._thread_pool.start(job, priority)
+
+    def cancel(self) -> None:
+        """Cancels the pending job, if there is one."""
+        job, self._job = self._job, None
+        if job is not None:
+            job.cancel()
+            if self._thread_pool.tryTake(job):
+                self._jobs_alive.discard(job)
+
+    def _handle_job_done(self, job: WorkerJob, result: Any) -> None:
+        self._jobs_alive.discard(job)
+        if job is not self._job:
+            return
+        self._job = None
+        self._handle_result(job, result)
+
+    def _handle_result(self, job: WorkerJob, result: Any) -> None:
+        """
+        Handles the result of the pending job, None if it failed.
+
+        Parameters
+        ----------
+        job
+        result
+
+        """
+        raise NotImplementedError
+
+
+class WorkerJob(QtCore.QRunnable):
+
+    """
+    Computes the result of its derived class on a worker thread.
+
+    Parameters
+    ----------
+    write_generation
+        The write generation of the data when the job was created.
+    signals
+
+    Attributes
+    ----------
+    write_generation
+    is_cancelled
+
+    Methods
+    -------
+    cancel
+
+    """
+
+    def __init__(self, write_generation: int, signals: WorkerJobSignals) -> None:
+        super().__init__()
+        # The runner keeps track of the job, and must be the one to delete it.
+        self.setAutoDelete(False)
+        self.write_generation: int = write_generation
+        self.is_cancelled: bool = False
+        self._signals: WorkerJobSignals = signals
+
+    def run(self) -> None:
+        result = None if self.is_cancelled else self._compute()
+        self._signals.done.emit(self, result)  # type: ignore
+
+    def _compute(self) -> Any:
+        """Computes the result of the job, None if it can't be computed."""
+        raise NotImplementedError
+
+    def cancel(self) -> None:
+        """Discards the result of the job."""
+        self.is_cancelled = True
+
+
+class WorkerJobSignals(QtCore.QObject):  # pylint: disable=too-few-public-methods
+
+    # Only a QObject can hold signals, which is why we need a QObject subclass as an
+    # intermediate attribute of the QRunnable to which we want to attach those signals.
+
+    """
+    Collection of signals used by the WorkerJob.
+
+    Class Attributes
+    ----------------
+    done
+
+    """
+
+    done: QtCore.Signal = QtCore.Signal(object, object)
+    """A signal emitted from the worker thread when a job is done, cancelled or not.
+    The parameters are (job, result), result being None if the job was cancelled or
+    failed."""
@@ -15,6 +15,7 @@ setuptools.setup(
     package_data={"gallery": ["py.typed"]},
     packages=setuptools.find_packages(include=["gallery", "gallery.*"]),
     include_package_data=True,
+    install_requires=["peewee>=3.8", "PySide6"],
     classifiers=[
         "Programming Language :: Python :: 3",
         "License",
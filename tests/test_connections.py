@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests the performance profile of the ConnectionManager, and its read-only connections
+to the database file.
+
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Iterator, List, Tuple
+
+import peewee
+import pytest
+
+from gallery.models.connections import ConnectionManager
+
+
+class Item(peewee.Model):  # pylint: disable=too-few-public-methods
+    """A model bound to the database of each test."""
+
+    name = peewee.CharField()
+
+
+@pytest.fixture(name="database")
+def fixture_database(tmp_path) -> Iterator[peewee.SqliteDatabase]:
+    database = peewee.SqliteDatabase(str(tmp_path / "gallery.db"))
+    Item.bind(database)
+    database.create_tables([Item])
+    yield database
+    database.close()
+
+
+def test_profile_is_opt_in(database):
+    ConnectionManager(database)
+    assert database.journal_mode == "delete"
+    ConnectionManager(database).apply_profile()
+    assert database.journal_mode == "wal"
+    assert database.synchronous == 1
+
+
+def test_profile_applies_to_new_connections(database):
+    ConnectionManager(database).apply_profile({"cache_size": -1024})
+    database.close()
+    database.connect()
+    assert database.cache_size == -1024
+
+
+def test_read_connection_reads_committed_rows(database):
+    connections = ConnectionManager(database)
+    connections.apply_profile()
+    Item.create(name="a")
+    rows: List[Tuple] = []
+    # Each worker thread has its own read-only connection.
+    thread = threading.Thread(
+        target=lambda: rows.extend(connections.execute_read(Item.select(Item.name)))
+    )
+    thread.start()
+    thread.join()
+    assert rows == [("a",)]
+    assert connections.execute_read(Item.select(Item.name)) == [("a",)]
+
+
+def test_read_connection_is_read_only(database):
+    connections = ConnectionManager(database)
+    with pytest.raises(peewee.OperationalError):
+        connections.execute_read(Item.insert(name="a"))
+    assert not list(Item.select())
+
+
+def test_in_memory_database_has_no_read_connection():
+    connections = ConnectionManager(peewee.SqliteDatabase(":memory:"))
+    assert connections.read_database is None
+    with pytest.raises(RuntimeError):
+        connections.execute_read(Item.select())
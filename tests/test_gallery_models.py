@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""Tests the GalleryModels, on an in-memory database."""
+
+from __future__ import annotations
+
+import logging
+from typing import Type
+
+import peewee
+import pytest
+
+from gallery.models.gallery_models import SQLITE_IDS_BATCH_SIZE, GalleryModels
+
+
+def _create_my_object_class(database: peewee.Database) -> Type[peewee.Model]:
+    class MyObject(peewee.Model):
+        name = peewee.CharField()
+        rating = peewee.IntegerField(default=0)
+
+        class Meta:  # pylint: disable=too-few-public-methods
+            database = None
+
+    MyObject.bind(database)
+    return MyObject
+
+
+@pytest.fixture(name="models")
+def fixture_models() -> GalleryModels:
+    database = peewee.SqliteDatabase(":memory:")
+    models = GalleryModels(database, _create_my_object_class(database))
+    return models
+
+
+def test_rate_more_my_objects_than_a_batch(models):
+    MyObject = models.MyObject
+    with models.database.atomic():
+        for index in range(SQLITE_IDS_BATCH_SIZE * 2 + 1):
+            MyObject.create(name=str(index), rating=index % 2)
+    my_objects_ids = [row[0] for row in MyObject.select(MyObject.id).tuples()]
+    models.rate_my_objects(my_objects_ids[1:], 5)
+    ratings = [row[0] for row in MyObject.select(MyObject.rating).tuples()]
+    assert ratings == [0] + [5] * (len(my_objects_ids) - 1)
+
+
+def test_rate_my_objects_updates_the_loaded_counts(models):
+    MyObject = models.MyObject
+    my_objects_ids = [
+        MyObject.create(name=str(index), rating=index % 3).id for index in range(9)
+    ]
+    models.tag_counts.load(
+        models.database, models.MyObject, models.MyTag, models.MyObjectTag
+    )
+    models.rate_my_objects(my_objects_ids[:4], 2)
+    rating_counts = [models.tag_counts.get_rating_count(rating) for rating in range(3)]
+    assert rating_counts == [1, 2, 6]
+
+
+def test_schema_is_created_once(caplog):
+    database = peewee.SqliteDatabase(":memory:")
+    MyObject = _create_my_object_class(database)
+    with caplog.at_level(logging.INFO, logger="gallery.models.gallery_models"):
+        models = GalleryModels(database, MyObject)
+    assert models.indexes_added
+    assert ", ".join(models.indexes_added) in caplog.text
+    for model in (MyObject, models.MyTag, models.MyObjectTag, models.MyView):
+        assert model.table_exists()
+    # The statistics of the query planner are gathered with the indexes.
+    assert database.table_exists("sqlite_stat1")
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="gallery.models.gallery_models"):
+        models_again = GalleryModels(database, MyObject)
+    assert not models_again.indexes_added
+    assert not caplog.text
+
+
+def test_missing_index_is_created_again(models):
+    index_name = models.indexes_added[0]
+    models.database.execute_sql(f'DROP INDEX "{index_name}"')
+    assert models.ensure_schema() == [index_name]
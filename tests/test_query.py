@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests that refreshing the results of query parameters for a few my_objects only, after
+a write on them, gives the same results as refreshing them as a whole.
+
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, Set
+
+from gallery.models.result_cache import ResultCache
+from gallery.widgets.query import QueryParameters
+
+MY_OBJECTS_IDS = range(100)
+
+
+class FakeModels:  # pylint: disable=too-few-public-methods
+    """Holds the result cache, as the GalleryModels."""
+
+    def __init__(self) -> None:
+        self.result_cache = ResultCache()
+
+
+class FakeWidgetItem:  # pylint: disable=too-few-public-methods
+    """A widget item whose my_objects ids are set by the tests."""
+
+    def __init__(self, widget_item_id: str, models: FakeModels) -> None:
+        self.widget_item_id = widget_item_id
+        self.name = widget_item_id
+        self.models = models
+        self.my_objects_ids: Set[int] = set()
+
+    def get_my_objects_ids(self) -> Set[int]:
+        return set(self.my_objects_ids)
+
+
+class FakeTagTreeWidget:  # pylint: disable=too-few-public-methods
+    """Holds the widget items and the models, as the TagTreeWidget."""
+
+    def __init__(self, widget_items_ids: str) -> None:
+        self.models = FakeModels()
+        self.widget_items: Dict[str, FakeWidgetItem] = {
+            widget_item_id: FakeWidgetItem(widget_item_id, self.models)
+            for widget_item_id in widget_items_ids
+        }
+
+    def tag(self, widget_item_id: str, my_objects_ids: Set[int]) -> int:
+        # A write through the gallery, returning the write generation before it.
+        write_generation = self.models.result_cache.write_generation
+        self.widget_items[widget_item_id].my_objects_ids |= my_objects_ids
+        self.models.result_cache.bump_write_generation()
+        return write_generation
+
+
+def _create_query_parameters(tag_tree_widget: FakeTagTreeWidget) -> QueryParameters:
+    # a - b + c ∩ d
+    query_parameters = QueryParameters(tag_tree_widget)  # type: ignore
+    query_parameters.base("a")  # type: ignore  # pylint: disable = no-member
+    query_parameters.remove("b")  # type: ignore  # pylint: disable = no-member
+    query_parameters.add("c")  # type: ignore  # pylint: disable = no-member
+    query_parameters.filter("d")  # type: ignore  # pylint: disable = no-member
+    return query_parameters
+
+
+def _get_expected_ids(tag_tree_widget: FakeTagTreeWidget) -> Set[int]:
+    widget_items = tag_tree_widget.widget_items
+    expected_ids = (
+        widget_items["a"].my_objects_ids - widget_items["b"].my_objects_ids
+        | widget_items["c"].my_objects_ids
+    ) & widget_items["d"].my_objects_ids
+    return expected_ids
+
+
+def test_refresh_my_objects_among_matches_refresh_my_objects():
+    generator = random.Random(0)
+    tag_tree_widget = FakeTagTreeWidget("abcd")
+    for widget_item in tag_tree_widget.widget_items.values():
+        widget_item.my_objects_ids = set(generator.sample(MY_OBJECTS_IDS, 50))
+    query_parameters = _create_query_parameters(tag_tree_widget)
+    query_parameters.refresh_my_objects()
+    for _ in range(100):
+        my_objects_ids = set(generator.sample(MY_OBJECTS_IDS, 5))
+        widget_item_id = generator.choice("abcd")
+        write_generation = tag_tree_widget.tag(widget_item_id, my_objects_ids)
+        assert query_parameters.refresh_my_objects_among(
+            my_objects_ids, write_generation
+        )
+        my_objects_ids_refreshed = query_parameters.snapshot.my_objects_ids
+        assert list(my_objects_ids_refreshed) == sorted(
+            _get_expected_ids(tag_tree_widget)
+        )
+        # The refreshed results are put back into the cache.
+        assert query_parameters.get_my_objects_ids() is my_objects_ids_refreshed
+
+
+def test_refresh_my_objects_among_records_modification():
+    tag_tree_widget = FakeTagTreeWidget("abcd")
+    tag_tree_widget.widget_items["d"].my_objects_ids = {1, 2, 3}
+    query_parameters = _create_query_parameters(tag_tree_widget)
+    query_parameters.refresh_my_objects()
+    query_parameters.reset_has_changed_attribute()
+    version = query_parameters.snapshot.version
+    write_generation = tag_tree_widget.tag("b", {4})
+    assert query_parameters.refresh_my_objects_among({4}, write_generation)
+    assert not query_parameters.has_changed
+    assert query_parameters.snapshot.version == version
+    write_generation = tag_tree_widget.tag("a", {2})
+    assert query_parameters.refresh_my_objects_among({2}, write_generation)
+    assert query_parameters.has_changed
+    assert list(query_parameters.snapshot.my_objects_ids) == [2]
+
+
+def test_refresh_my_objects_among_refuses_outdated_results():
+    tag_tree_widget = FakeTagTreeWidget("abcd")
+    tag_tree_widget.widget_items["d"].my_objects_ids = {1, 2, 3}
+    query_parameters = _create_query_parameters(tag_tree_widget)
+    query_parameters.refresh_my_objects()
+    # A first write which isn't refreshed, then a second one.
+    tag_tree_widget.tag("a", {1})
+    write_generation = tag_tree_widget.tag("a", {2})
+    assert not query_parameters.refresh_my_objects_among({2}, write_generation)
+    assert not query_parameters.snapshot.my_objects_ids
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests that the sequences of query parameters compiled into a single SQL statement give
+the same results as the set operations applied in Python, one parameter at a time.
+
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, List
+
+import peewee
+import pytest
+
+from gallery.models.gallery_models import GalleryModels
+from gallery.widgets.query import QueryParameters
+from gallery.widgets.widget_item_mixins import (
+    WidgetItemAllMixin,
+    WidgetItemMixin,
+    WidgetItemRatingMixin,
+    WidgetItemTagMixin,
+)
+
+RATINGS = range(6)
+PARAMETERS_METHODS = ["add", "remove", "filter"]
+
+
+class WidgetItemTag(WidgetItemTagMixin):  # pylint: disable=too-few-public-methods
+    """A widget item of a tag, without any widget."""
+
+    def __init__(self, tag: peewee.Model, models: GalleryModels) -> None:
+        self.widget_item_id = tag.id
+        self.name = tag.name
+        self.tag = tag
+        self.models = models
+
+
+class WidgetItemRating(WidgetItemRatingMixin):  # pylint: disable=too-few-public-methods
+    """A widget item of a rating, without any widget."""
+
+    def __init__(self, rating: int, models: GalleryModels) -> None:
+        self.widget_item_id = f"rating_{rating}"
+        self.name = self._get_name_from_rating(rating)
+        self.rating = rating
+        self.models = models
+
+
+class WidgetItemAll(WidgetItemAllMixin):  # pylint: disable=too-few-public-methods
+    """The widget item of all my_objects, without any widget."""
+
+    def __init__(self, models: GalleryModels) -> None:
+        self.widget_item_id = "all"
+        self.name = "Tout"
+        self.models = models
+
+
+class FakeTagTreeWidget:  # pylint: disable=too-few-public-methods
+    """Holds the widget items and the models, as the TagTreeWidget."""
+
+    def __init__(self, models: GalleryModels) -> None:
+        self.models = models
+        widget_items: List[WidgetItemMixin] = [WidgetItemAll(models)]
+        widget_items += [WidgetItemRating(rating, models) for rating in RATINGS]
+        widget_items += [WidgetItemTag(tag, models) for tag in models.MyTag.select()]
+        self.widget_items: Dict[object, WidgetItemMixin] = {
+            widget_item.widget_item_id: widget_item for widget_item in widget_items
+        }
+
+
+@pytest.fixture(name="models", params=[False, True], ids=["parents", "closure"])
+def fixture_models(request) -> GalleryModels:
+    database = peewee.SqliteDatabase(":memory:")
+
+    class MyObject(peewee.Model):
+        name = peewee.CharField()
+        rating = peewee.IntegerField(default=0)
+
+        class Meta:  # pylint: disable=too-few-public-methods
+            database = None
+
+    MyObject.bind(database)
+    models = GalleryModels(database, MyObject, use_tag_closure_table=request.param)
+    generator = random.Random(0)
+    for index in range(50):
+        MyObject.create(name=str(index), rating=generator.choice(RATINGS))
+    my_objects_ids = [my_object.id for my_object in MyObject.select()]
+    tags: List[peewee.Model] = []
+    for index in range(15):
+        parent = generator.choice(tags) if tags and index % 3 else None
+        tag = models.MyTag.create(name=f"tag_{index}", parent=parent, type="tag")
+        tag.add_my_objects(generator.sample(my_objects_ids, 10))
+        tags.append(tag)
+    return models
+
+
+def _create_query_parameters(
+    tag_tree_widget: FakeTagTreeWidget, generator: random.Random
+) -> QueryParameters:
+    # A base parameter followed by up to 3 other parameters, on random widget items.
+    query_parameters = QueryParameters(tag_tree_widget)  # type: ignore
+    widget_items_ids = list(tag_tree_widget.widget_items)
+    methods_names = ["base"]
+    methods_names += generator.choices(PARAMETERS_METHODS, k=generator.randrange(4))
+    for method_name in methods_names:
+        method = getattr(query_parameters, method_name)
+        method(generator.choice(widget_items_ids))
+    return query_parameters
+
+
+def test_compiled_query_matches_python_set_operations(models):
+    generator = random.Random(1)
+    tag_tree_widget = FakeTagTreeWidget(models)
+    for _ in range(200):
+        query_parameters = _create_query_parameters(tag_tree_widget, generator)
+        query = query_parameters.select_my_objects_ids_sorted()
+        assert query is not None
+        my_objects_ids = [row[0] for row in query.tuples()]
+        # pylint: disable = protected-access
+        assert my_objects_ids == list(query_parameters._get_my_objects_ids_in_python())
+
+
+def test_compiled_query_among_matches_python_set_operations(models):
+    generator = random.Random(2)
+    tag_tree_widget = FakeTagTreeWidget(models)
+    my_objects_ids = [my_object.id for my_object in models.MyObject.select()]
+    for _ in range(50):
+        query_parameters = _create_query_parameters(tag_tree_widget, generator)
+        among = set(generator.sample(my_objects_ids, 10))
+        # pylint: disable = protected-access
+        my_objects_ids_expected = set(query_parameters._get_my_objects_ids_in_python())
+        assert query_parameters.get_my_objects_ids_among(among) == (
+            my_objects_ids_expected & among
+        )
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests that the results cached are computed once until a write invalidates them, and
+that the writes done through the gallery invalidate the results they can modify.
+
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import peewee
+import pytest
+
+from gallery.models.gallery_models import GalleryModels
+from gallery.models.result_cache import (
+    ResultCache,
+    get_query_key,
+    get_tag_key,
+    get_widget_item_key,
+)
+
+
+class Computation:  # pylint: disable=too-few-public-methods
+    """Counts the computations of a result."""
+
+    def __init__(self, result: object) -> None:
+        self.result = result
+        self.calls = 0
+
+    def __call__(self) -> object:
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture(name="models", params=[False, True], ids=["parents", "closure"])
+def fixture_models(request) -> GalleryModels:
+    database = peewee.SqliteDatabase(":memory:")
+
+    class MyObject(peewee.Model):
+        name = peewee.CharField()
+        rating = peewee.IntegerField(default=0)
+
+        class Meta:  # pylint: disable=too-few-public-methods
+            database = None
+
+    MyObject.bind(database)
+    models = GalleryModels(database, MyObject, use_tag_closure_table=request.param)
+    for index in range(5):
+        MyObject.create(name=str(index))
+    return models
+
+
+def _cache_results(result_cache: ResultCache, keys: List[object]) -> None:
+    for key in keys:
+        result_cache.put(key, frozenset())
+
+
+def test_result_is_computed_once():
+    result_cache = ResultCache()
+    compute = Computation(frozenset({1, 2}))
+    key = get_widget_item_key("all")
+    assert result_cache.get_or_compute(key, compute) == {1, 2}
+    assert result_cache.get_or_compute(key, compute) == {1, 2}
+    assert compute.calls == 1
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+
+
+def test_bump_write_generation_invalidates_all_results():
+    result_cache = ResultCache()
+    compute = Computation(frozenset({1}))
+    key = get_widget_item_key("all")
+    result_cache.get_or_compute(key, compute)
+    write_generation = result_cache.write_generation
+    result_cache.bump_write_generation()
+    assert result_cache.write_generation > write_generation
+    assert result_cache.get(key) is None
+    result_cache.get_or_compute(key, compute)
+    assert compute.calls == 2
+
+
+def test_invalidate_follows_dependencies():
+    result_cache = ResultCache()
+    tag_key, view_key = get_tag_key(1), get_widget_item_key("view_1")
+    query_key, other_key = get_query_key("view_1"), get_tag_key(2)
+    result_cache.put(tag_key, frozenset())
+    result_cache.put(view_key, frozenset(), [tag_key])
+    result_cache.put(query_key, frozenset(), [view_key])
+    result_cache.put(other_key, frozenset())
+    write_generation = result_cache.write_generation
+    result_cache.invalidate([tag_key])
+    assert result_cache.write_generation > write_generation
+    for key in (tag_key, view_key, query_key):
+        assert result_cache.get(key) is None
+    assert result_cache.get(other_key) is not None
+
+
+def test_invalidate_ends_on_circular_dependencies():
+    result_cache = ResultCache()
+    key_a, key_b = get_widget_item_key("view_1"), get_widget_item_key("view_2")
+    result_cache.put(key_a, frozenset(), [key_b])
+    result_cache.put(key_b, frozenset(), [key_a])
+    result_cache.invalidate([key_a])
+    assert result_cache.get(key_a) is None
+    assert result_cache.get(key_b) is None
+
+
+def test_tagging_invalidates_all_results(models):
+    tag = models.MyTag.create(name="a", type="tag")
+    result_cache = models.result_cache
+    _cache_results(result_cache, [get_tag_key(tag.id), get_query_key("all")])
+    tag.add_my_objects([1, 2])
+    assert result_cache.get(get_query_key("all")) is None
+    _cache_results(result_cache, [get_query_key("all")])
+    tag.remove_my_objects([1])
+    assert result_cache.get(get_query_key("all")) is None
+    _cache_results(result_cache, [get_query_key("all")])
+    models.rate_my_objects([1], 3)
+    assert result_cache.get(get_query_key("all")) is None
+
+
+def test_deleting_a_tag_keeps_unrelated_results(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", parent=tag_a, type="folder")
+    tag_c = MyTag.create(name="c", parent=tag_b, type="tag")
+    tag_d = MyTag.create(name="d", type="tag")
+    result_cache = models.result_cache
+    keys = [get_tag_key(tag.id) for tag in (tag_a, tag_b, tag_c, tag_d)]
+    _cache_results(result_cache, keys)
+    tag_b.delete_self_and_children()
+    # The ancestors of the deleted tags are invalidated too.
+    assert [result_cache.get(key) is None for key in keys] == [True, True, True, False]
+
+
+def test_moving_a_tag_invalidates_all_results(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", type="tag")
+    result_cache = models.result_cache
+    _cache_results(result_cache, [get_tag_key(tag_a.id)])
+    tag_b.name = "bb"
+    tag_b.save()
+    assert result_cache.get(get_tag_key(tag_a.id)) is not None
+    tag_b.parent = tag_a
+    tag_b.save()
+    assert result_cache.get(get_tag_key(tag_a.id)) is None
+
+
+def test_external_write_invalidates_all_results(models):
+    result_cache = models.result_cache
+    _cache_results(result_cache, [get_query_key("all")])
+    models.bump_write_generation()
+    assert result_cache.get(get_query_key("all")) is None
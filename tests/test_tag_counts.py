@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests that the counts of the tags and ratings, once loaded, are kept up to date by the
+tagging and rating methods of the gallery, by comparing them to freshly loaded ones.
+
+"""
+
+from __future__ import annotations
+
+import random
+
+import peewee
+import pytest
+
+from gallery.models.gallery_models import GalleryModels
+from gallery.models.tag_counts import TagCounts
+
+RATINGS = range(6)
+
+
+@pytest.fixture(name="models")
+def fixture_models() -> GalleryModels:
+    database = peewee.SqliteDatabase(":memory:")
+
+    class MyObject(peewee.Model):
+        name = peewee.CharField()
+        rating = peewee.IntegerField(default=0)
+
+        class Meta:  # pylint: disable=too-few-public-methods
+            database = None
+
+    MyObject.bind(database)
+    database.create_tables([MyObject])
+    models = GalleryModels(database, MyObject)
+    database.create_tables([models.MyTag, models.MyObjectTag, models.MyView])
+    for index in range(20):
+        MyObject.create(name=str(index), rating=index % len(RATINGS))
+    return models
+
+
+def _load_tag_counts(models: GalleryModels) -> TagCounts:
+    tag_counts = TagCounts()
+    tag_counts.load(
+        models.database, models.MyObject, models.MyTag, models.MyObjectTag
+    )
+    return tag_counts
+
+
+def _assert_counts_match_database(models: GalleryModels) -> None:
+    tag_counts_expected = _load_tag_counts(models)
+    for tag in models.MyTag.select():
+        assert models.tag_counts.get_counts(tag.id) == tag_counts_expected.get_counts(
+            tag.id
+        )
+    for rating in RATINGS:
+        assert models.tag_counts.get_rating_count(
+            rating
+        ) == tag_counts_expected.get_rating_count(rating)
+
+
+def test_counts_are_none_until_loaded(models):
+    tag = models.MyTag.create(name="a", type="tag")
+    assert models.tag_counts.get_counts(tag.id) is None
+    assert models.tag_counts.get_rating_count(0) is None
+
+
+def test_ancestors_count_my_objects_once(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", parent=tag_a, type="tag")
+    tag_c = MyTag.create(name="c", parent=tag_a, type="tag")
+    models.tag_counts.replace_with(_load_tag_counts(models))
+    tag_b.add_my_objects([1, 2])
+    tag_c.add_my_objects([2, 3])
+    assert models.tag_counts.get_counts(tag_a.id) == (0, 3)
+    assert models.tag_counts.get_counts(tag_b.id) == (2, 2)
+    tag_b.remove_my_objects([2])
+    assert models.tag_counts.get_counts(tag_a.id) == (0, 3)
+    tag_c.remove_my_objects([2])
+    assert models.tag_counts.get_counts(tag_a.id) == (0, 2)
+
+
+def test_incremental_updates_match_fresh_load(models):
+    MyTag = models.MyTag
+    generator = random.Random(0)
+    tags = [MyTag.create(name="root", type="folder")]
+    models.tag_counts.replace_with(_load_tag_counts(models))
+    my_objects_ids = [my_object.id for my_object in models.MyObject.select()]
+    for _ in range(100):
+        action = generator.randrange(4)
+        my_objects_ids_sample = generator.sample(my_objects_ids, 5)
+        if action == 0:
+            # A new tag is recorded without any my_object.
+            parent = generator.choice(tags)
+            tag = MyTag.create(name=f"tag_{len(tags)}", parent=parent, type="tag")
+            tags.append(tag)
+        elif action == 1:
+            generator.choice(tags).add_my_objects(my_objects_ids_sample)
+        elif action == 2:
+            generator.choice(tags).remove_my_objects(my_objects_ids_sample)
+        else:
+            models.rate_my_objects(my_objects_ids_sample, generator.choice(RATINGS))
+        assert models.tag_counts.is_loaded
+        _assert_counts_match_database(models)
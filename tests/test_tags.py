@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests that the closure table indexing the hierarchy of tags holds exactly one row per
+tag and ancestor, at the right depth, after the tags are created, moved and deleted.
+
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, Optional, Set, Tuple
+
+import peewee
+import pytest
+
+from gallery.models.gallery_models import GalleryModels
+from gallery.models.tags import SQLITE_MAX_VARIABLES
+
+
+@pytest.fixture(name="models")
+def fixture_models() -> GalleryModels:
+    database = peewee.SqliteDatabase(":memory:")
+
+    class MyObject(peewee.Model):
+        name = peewee.CharField()
+        rating = peewee.IntegerField(default=0)
+
+        class Meta:  # pylint: disable=too-few-public-methods
+            database = None
+
+    MyObject.bind(database)
+    models = GalleryModels(database, MyObject, use_tag_closure_table=True)
+    return models
+
+
+def _get_closure_rows(models: GalleryModels) -> Set[Tuple[int, int, int]]:
+    closure_table = models.MyTag.closure_table
+    rows = set(
+        closure_table.select(
+            closure_table.ancestor, closure_table.descendant, closure_table.depth
+        ).tuples()
+    )
+    return rows
+
+
+def _get_expected_closure_rows(models: GalleryModels) -> Set[Tuple[int, int, int]]:
+    # Walks up the parent foreign keys from each tag.
+    parents_ids: Dict[int, Optional[int]] = dict(
+        models.MyTag.select(models.MyTag.id, models.MyTag.parent).tuples()
+    )
+    rows = set()
+    for tag_id in parents_ids:
+        ancestor_id: Optional[int] = tag_id
+        depth = 0
+        while ancestor_id is not None:
+            rows.add((ancestor_id, tag_id, depth))
+            ancestor_id = parents_ids[ancestor_id]
+            depth += 1
+    return rows
+
+
+def _is_in_subtree(models: GalleryModels, tag_id: int, root_id: int) -> bool:
+    # Read from the parent foreign keys, rather than from the closure table tested.
+    is_in_subtree = any(
+        (ancestor_id, descendant_id) == (root_id, tag_id)
+        for ancestor_id, descendant_id, _ in _get_expected_closure_rows(models)
+    )
+    return is_in_subtree
+
+
+def test_closure_table_follows_creations(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", parent=tag_a, type="folder")
+    MyTag.create(name="c", parent=tag_b, type="tag")
+    assert _get_closure_rows(models) == _get_expected_closure_rows(models)
+    assert len(_get_closure_rows(models)) == 6
+
+
+def test_closure_table_follows_moves(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", parent=tag_a, type="folder")
+    MyTag.create(name="c", parent=tag_b, type="tag")
+    tag_d = MyTag.create(name="d", type="folder")
+    tag_b.parent = tag_d
+    tag_b.save()
+    assert _get_closure_rows(models) == _get_expected_closure_rows(models)
+    tag_b.parent = None
+    tag_b.save()
+    assert _get_closure_rows(models) == _get_expected_closure_rows(models)
+
+
+def test_closure_table_follows_deletions(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", parent=tag_a, type="folder")
+    MyTag.create(name="c", parent=tag_b, type="tag")
+    MyTag.create(name="d", parent=tag_a, type="tag")
+    tag_b.delete_self_and_children()
+    assert [tag.name for tag in MyTag.select().order_by(MyTag.name)] == ["a", "d"]
+    assert _get_closure_rows(models) == _get_expected_closure_rows(models)
+
+
+def test_closure_table_follows_random_writes(models):
+    MyTag = models.MyTag
+    generator = random.Random(0)
+    tags_ids = []
+    for index in range(300):
+        action = generator.randrange(3) if len(tags_ids) > 5 else 0
+        if action == 0:
+            parent_id = generator.choice(tags_ids + [None])
+            tag = MyTag.create(name=f"tag_{index}", parent=parent_id, type="tag")
+            tags_ids.append(tag.id)
+        elif action == 1:
+            tag = MyTag.get_by_id(generator.choice(tags_ids))
+            parent_id = generator.choice(tags_ids + [None])
+            # A tag can't be moved under itself or one of its descendants.
+            if parent_id is None or not _is_in_subtree(models, parent_id, tag.id):
+                tag.parent = parent_id
+                tag.save()
+        else:
+            tag = MyTag.get_by_id(generator.choice(tags_ids))
+            tag.delete_self_and_children()
+            tags_ids = [row[0] for row in MyTag.select(MyTag.id).tuples()]
+        assert _get_closure_rows(models) == _get_expected_closure_rows(models)
+
+
+def test_rebuilt_closure_table_matches_maintained_one(models):
+    MyTag = models.MyTag
+    tag_a = MyTag.create(name="a", type="folder")
+    tag_b = MyTag.create(name="b", parent=tag_a, type="folder")
+    MyTag.create(name="c", parent=tag_b, type="tag")
+    closure_rows = _get_closure_rows(models)
+    MyTag.rebuild_closure_table()
+    assert _get_closure_rows(models) == closure_rows
+
+
+def _get_tagged_ids(models: GalleryModels, tag: peewee.Model) -> Set[int]:
+    MyObjectTag = models.MyObjectTag
+    tagged_ids = {
+        row[0]
+        for row in MyObjectTag.select(MyObjectTag.my_object)
+        .where(MyObjectTag.tag == tag.id)
+        .tuples()
+    }
+    return tagged_ids
+
+
+def test_add_and_remove_more_my_objects_than_sqlite_parameters(models):
+    MyObject = models.MyObject
+    with models.database.atomic():
+        for index in range(SQLITE_MAX_VARIABLES * 2):
+            MyObject.create(name=str(index))
+    my_objects_ids = [row[0] for row in MyObject.select(MyObject.id).tuples()]
+    tag = models.MyTag.create(name="a", type="tag")
+    tag.add_my_objects(my_objects_ids)
+    assert _get_tagged_ids(models, tag) == set(my_objects_ids)
+    tag.remove_my_objects(my_objects_ids[1:])
+    assert _get_tagged_ids(models, tag) == {my_objects_ids[0]}
+
+
+def test_add_and_remove_ignore_unmodified_links(models):
+    MyObject = models.MyObject
+    my_objects_ids = [MyObject.create(name=str(index)).id for index in range(4)]
+    tag = models.MyTag.create(name="a", type="tag")
+    tag.add_my_objects(my_objects_ids[:2])
+    # The my_objects already tagged are ignored.
+    tag.add_my_objects(my_objects_ids[1:3])
+    assert _get_tagged_ids(models, tag) == set(my_objects_ids[:3])
+    assert models.MyObjectTag.select().count() == 3
+    # The my_objects not tagged are ignored.
+    tag.remove_my_objects(my_objects_ids[2:])
+    assert _get_tagged_ids(models, tag) == set(my_objects_ids[:2])
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests the compute_geometry function against the layout of the former TabParameters
+class, which read the dimensions from the widgets themselves.
+
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from gallery.widgets.widget_parameters import LayoutInputs, compute_geometry
+
+TAG_TREE_MIN_WIDTH = 150
+SCROLLBAR_WIDTH = 20
+GRID_VERTICAL_MARGIN = 50
+
+
+
+def _get_inputs(**values: int) -> LayoutInputs:
+    # The constants of the application are the same in all cases.
+    inputs = LayoutInputs(
+        tag_tree_min_width=TAG_TREE_MIN_WIDTH,
+        scrollbar_width=SCROLLBAR_WIDTH,
+        grid_vertical_margin=GRID_VERTICAL_MARGIN,
+        **values,
+    )
+    return inputs
+
+
+# The expected values are the ones TabParameters gave for the same inputs.
+CASES = [
+    (
+        _get_inputs(
+            main_widget_width=1600,
+            main_widget_height=900,
+            cell_width=270,
+            cell_height=180,
+            cells_qty=1000,
+            scroll_offset=0,
+        ),
+        {
+            "scroll_area_width": 1370,
+            "scroll_area_height": 850,
+            "grid_container_columns": 5,
+            "grid_container_rows": 200,
+            "grid_container_width": 1350,
+            "grid_container_height": 36000,
+            "grid_columns": 5,
+            "grid_rows": 6,
+            "grid_width": 1350,
+            "grid_height": 1080,
+            "tab_width": 1379,
+            "rows_displayed_first": 0,
+            "cells_displayed_first": 0,
+            "cells_displayed_last": 29,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=1600,
+            main_widget_height=900,
+            cell_width=270,
+            cell_height=180,
+            cells_qty=1000,
+            scroll_offset=5000,
+        ),
+        {
+            "scroll_area_width": 1370,
+            "scroll_area_height": 850,
+            "grid_container_columns": 5,
+            "grid_container_rows": 200,
+            "grid_container_width": 1350,
+            "grid_container_height": 36000,
+            "grid_columns": 5,
+            "grid_rows": 6,
+            "grid_width": 1350,
+            "grid_height": 1080,
+            "tab_width": 1379,
+            "rows_displayed_first": 27,
+            "cells_displayed_first": 135,
+            "cells_displayed_last": 164,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=1600,
+            main_widget_height=900,
+            cell_width=270,
+            cell_height=180,
+            cells_qty=1000,
+            scroll_offset=1000000,
+        ),
+        {
+            "scroll_area_width": 1370,
+            "scroll_area_height": 850,
+            "grid_container_columns": 5,
+            "grid_container_rows": 200,
+            "grid_container_width": 1350,
+            "grid_container_height": 36000,
+            "grid_columns": 5,
+            "grid_rows": 6,
+            "grid_width": 1350,
+            "grid_height": 1080,
+            "tab_width": 1379,
+            "rows_displayed_first": 194,
+            "cells_displayed_first": 970,
+            "cells_displayed_last": 999,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=1600,
+            main_widget_height=900,
+            cell_width=270,
+            cell_height=180,
+            cells_qty=3,
+            scroll_offset=0,
+        ),
+        {
+            "scroll_area_width": 1370,
+            "scroll_area_height": 850,
+            "grid_container_columns": 5,
+            "grid_container_rows": 1,
+            "grid_container_width": 1350,
+            "grid_container_height": 180,
+            "grid_columns": 3,
+            "grid_rows": 1,
+            "grid_width": 810,
+            "grid_height": 180,
+            "tab_width": 1379,
+            "rows_displayed_first": 0,
+            "cells_displayed_first": 0,
+            "cells_displayed_last": 2,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=1600,
+            main_widget_height=900,
+            cell_width=270,
+            cell_height=180,
+            cells_qty=1000,
+            scroll_offset=-40,
+        ),
+        {
+            "scroll_area_width": 1370,
+            "scroll_area_height": 850,
+            "grid_container_columns": 5,
+            "grid_container_rows": 200,
+            "grid_container_width": 1350,
+            "grid_container_height": 36000,
+            "grid_columns": 5,
+            "grid_rows": 6,
+            "grid_width": 1350,
+            "grid_height": 1080,
+            "tab_width": 1379,
+            "rows_displayed_first": 0,
+            "cells_displayed_first": 0,
+            "cells_displayed_last": 29,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=300,
+            main_widget_height=600,
+            cell_width=405,
+            cell_height=270,
+            cells_qty=50,
+            scroll_offset=700,
+        ),
+        {
+            "scroll_area_width": 425,
+            "scroll_area_height": 550,
+            "grid_container_columns": 1,
+            "grid_container_rows": 50,
+            "grid_container_width": 405,
+            "grid_container_height": 13500,
+            "grid_columns": 1,
+            "grid_rows": 4,
+            "grid_width": 405,
+            "grid_height": 1080,
+            "tab_width": 434,
+            "rows_displayed_first": 2,
+            "cells_displayed_first": 2,
+            "cells_displayed_last": 5,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=2560,
+            main_widget_height=1440,
+            cell_width=202,
+            cell_height=135,
+            cells_qty=12345,
+            scroll_offset=123456,
+        ),
+        {
+            "scroll_area_width": 2242,
+            "scroll_area_height": 1390,
+            "grid_container_columns": 11,
+            "grid_container_rows": 1123,
+            "grid_container_width": 2222,
+            "grid_container_height": 151605,
+            "grid_columns": 11,
+            "grid_rows": 12,
+            "grid_width": 2222,
+            "grid_height": 1620,
+            "tab_width": 2251,
+            "rows_displayed_first": 914,
+            "cells_displayed_first": 10054,
+            "cells_displayed_last": 10185,
+        },
+    ),
+    (
+        _get_inputs(
+            main_widget_width=1000,
+            main_widget_height=200,
+            cell_width=337,
+            cell_height=225,
+            cells_qty=7,
+            scroll_offset=100,
+        ),
+        {
+            "scroll_area_width": 694,
+            "scroll_area_height": 150,
+            "grid_container_columns": 2,
+            "grid_container_rows": 4,
+            "grid_container_width": 674,
+            "grid_container_height": 900,
+            "grid_columns": 2,
+            "grid_rows": 2,
+            "grid_width": 674,
+            "grid_height": 450,
+            "tab_width": 703,
+            "rows_displayed_first": 0,
+            "cells_displayed_first": 0,
+            "cells_displayed_last": 3,
+        },
+    ),
+]
+
+
+@pytest.mark.parametrize("inputs, expected", CASES)
+def test_compute_geometry_matches_tab_parameters(inputs, expected):
+    geometry = compute_geometry(inputs)
+    assert {name: getattr(geometry, name) for name in expected} == expected
+
+
+@pytest.mark.parametrize("inputs, unused_expected", CASES)
+def test_empty_cells_fill_the_grid_container(inputs, unused_expected):
+    geometry = compute_geometry(inputs)
+    assert (
+        geometry.empty_cells_top_height
+        + geometry.grid_height
+        + geometry.empty_cells_bottom_height
+        == geometry.grid_container_height
+    )
+    assert geometry.empty_cells_bottom_height >= 0
+    assert len(geometry.cell_range) <= geometry.grid_rows * geometry.grid_columns